@@ -1,54 +1,36 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+import hashlib
 import json
 import os
-from groq import Groq
+import sys
+
+# The LLM client is shared with the Flask services in ../server.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+import analysis_cache
+import chat_stream
+import medical_prompt
+import metrics
+import resilience
+import router
+import triage
+from doctors import DOCTORS_DATABASE, directory
+from medical_schema import Doctor, MedicalResponse
 
 app = FastAPI(
     title="Medical Symptom Analyzer API",
     description="API for analyzing medical symptoms and recommending doctors",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=metrics.TimedJSONResponse,
 )
+metrics.instrument_asgi(app, "chatbot-api")  # per-stage timings and GET /metrics
 
-os.environ["GROQ_API_KEY"] = "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"
-client = Groq()
-DOCTORS_DATABASE = [
-    {"name": "Dr. Alice Johnson", "specialization": "Cardiology", "experience": "15 years", "contact": "555-0123"},
-    {"name": "Dr. Robert Smith", "specialization": "Neurology", "experience": "12 years", "contact": "555-0124"},
-    {"name": "Dr. Emily Chen", "specialization": "Dermatology", "experience": "10 years", "contact": "555-0125"},
-    {"name": "Dr. Michael Rodriguez", "specialization": "Orthopedics", "experience": "20 years", "contact": "555-0126"},
-    {"name": "Dr. Sarah Williams", "specialization": "Gastroenterology", "experience": "8 years", "contact": "555-0127"},
-    {"name": "Dr. James Wilson", "specialization": "Pulmonology", "experience": "14 years", "contact": "555-0128"},
-    {"name": "Dr. Lisa Brown", "specialization": "Endocrinology", "experience": "11 years", "contact": "555-0129"},
-    {"name": "Dr. Mark Davis", "specialization": "Psychiatry", "experience": "9 years", "contact": "555-0130"},
-    {"name": "Dr. Nancy Lee", "specialization": "Ophthalmology", "experience": "16 years", "contact": "555-0131"},
-    {"name": "Dr. Thomas Martin", "specialization": "ENT", "experience": "13 years", "contact": "555-0132"},
-    {"name": "Dr. Jennifer Garcia", "specialization": "General Practice", "experience": "8 years", "contact": "555-0133"},
-]
 
 class SymptomRequest(BaseModel):
     symptoms: str
 
-class Condition(BaseModel):
-    condition: str
-    likelihood: str
-    description: str
-    general_treatment: str
-    recommended_specialist: str
-
-class Doctor(BaseModel):
-    name: str
-    specialization: str
-    experience: str
-    contact: str
-
-class MedicalResponse(BaseModel):
-    possible_conditions: List[Condition]
-    recommended_doctors: List[Doctor]
-    general_advice: str
-    disclaimer: str
-
 class ErrorResponse(BaseModel):
     error: str
     possible_conditions: List = []
@@ -56,8 +38,8 @@ class ErrorResponse(BaseModel):
     general_advice: str = "Unable to analyze symptoms at this time."
     disclaimer: str = "This is not medical advice. Please consult a healthcare professional."
 
-def generate_medical_response(symptoms, doctors_data):
-    """Use Groq API to analyze symptoms and recommend doctors"""
+def full_prompt_messages(symptoms, doctors_data):
+    """The original prompt: the whole doctor directory is embedded and copied back by the model."""
     
     system_prompt = f"""
     You are a medical assistant chatbot designed to provide preliminary analysis of symptoms.
@@ -97,22 +79,40 @@ def generate_medical_response(symptoms, doctors_data):
     }}
     """
     user_message = f"Analyze these symptoms: {symptoms}"
-    
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+def analysis_messages(symptoms, doctors_data):
+    if medical_prompt.MODE == "lean":
+        # Constant-size prompt; doctors are attached from the directory afterwards.
+        return medical_prompt.lean_messages(f"Analyze these symptoms: {symptoms}")
+    return full_prompt_messages(symptoms, doctors_data)
+
+async def generate_medical_response(symptoms, doctors_data):
+    """Use Groq API to analyze symptoms and recommend doctors"""
+    messages = analysis_messages(symptoms, doctors_data)
+    deadline = resilience.Deadline()
+
+    async def compute():
+        # Awaited on the shared pooled client, so other requests keep being
+        # served while this one waits on the API.
+        # Small or large model by complexity, escalating on invalid output (see router.py).
+        return await router.analyze(symptoms, messages, max_tokens=1024, deadline=deadline)
+
     try:
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.2, 
-            max_completion_tokens=1024,
-            response_format={"type": "json_object"}
-        )
-        
-        result = json.loads(response.choices[0].message.content)
-        return result
+        # Clear single-complaint queries are answered locally (see triage.py).
+        fast = triage.answer(symptoms)
+        if fast is not None:
+            return fast
+        # Equivalent queries share one answer (see analysis_cache.py).
+        return await analysis_cache.cached(symptoms, compute, deadline)
     
+    except resilience.Unavailable:
+        # The API is down or too slow for this request's budget: a limited
+        # local answer instead of an error (see resilience.py).
+        return resilience.degraded_answer(symptoms)
     except Exception as e:
         return {
             "error": f"An error occurred: {str(e)}",
@@ -137,7 +137,7 @@ async def analyze_symptoms(request: SymptomRequest):
         if not request.symptoms.strip():
             raise HTTPException(status_code=400, detail="Symptoms cannot be empty")
             
-        response = generate_medical_response(request.symptoms, DOCTORS_DATABASE)
+        response = await generate_medical_response(request.symptoms, DOCTORS_DATABASE)
         
         if "error" in response:
             raise HTTPException(status_code=500, detail=response["error"])
@@ -148,10 +148,56 @@ async def analyze_symptoms(request: SymptomRequest):
         error_response = ErrorResponse(error=str(e))
         return error_response
 
+@app.post("/analyze/stream")
+async def analyze_symptoms_stream(request: SymptomRequest):
+    """/analyze as Server-Sent Events: conditions and advice arrive as soon as they are generated"""
+    if not request.symptoms.strip():
+        raise HTTPException(status_code=400, detail="Symptoms cannot be empty")
+    events = chat_stream.analysis_events(request.symptoms, analysis_messages(request.symptoms, DOCTORS_DATABASE),
+                                         max_tokens=1024)
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """Hit rate, coalesced requests and upstream latency saved by the response cache"""
+    return analysis_cache.stats()
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header lists `etag` or is "*" (weak comparison: W/ is ignored)."""
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in tags}
+
 @app.get("/doctors", response_model=List[Doctor])
-async def get_doctors():
-    """Return the list of available doctors"""
-    return DOCTORS_DATABASE
+def get_doctors(
+    request: Request,
+    specialization: Optional[str] = None,
+    min_experience: Optional[int] = None,
+    max_experience: Optional[int] = None,
+    q: Optional[str] = None,
+    sort: str = "name",
+    limit: int = 20,
+    cursor: Optional[str] = None,
+):
+    """Return a page of doctors, filtered and sorted (name, -name, experience, -experience).
+
+    q searches names by prefix, falling back to close spellings. The next
+    page's cursor is in the X-Next-Cursor header (and a Link rel="next");
+    responses carry an ETag that changes whenever the directory does.
+    """
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    etag = f'W/"{directory.version}-{hashlib.sha1(query.encode()).hexdigest()[:16]}"'
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        doctors, next_cursor = directory.search(specialization, min_experience, max_experience, q, sort, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return JSONResponse(doctors, headers=headers)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,139 @@
+"""Response cache and request coalescing for the symptom analysis chatbots.
+
+Many queries differ only in case, whitespace, punctuation or an opener like
+"I have" ("Headache, fever!", "i have headache fever"), so answers are cached
+under a normalized form of the query, together with the prompt mode, the model and
+the doctor directory version. A TTL keeps answers from living forever and
+an LRU bound caps memory.
+Concurrent identical queries that miss the cache wait on a single upstream
+call (cache.SingleFlight) instead of each calling the model.
+
+Shared by /analyze (chatbot/app.py) and /api/chat (chatbot.py, bot2.py):
+
+    CHATBOT_CACHE_TTL       seconds an answer is reused (default 3600; 0 disables the cache)
+    CHATBOT_CACHE_ENTRIES   LRU bound on cached answers (default 2048)
+"""
+import asyncio
+import copy
+import os
+import re
+import time
+
+import llm
+import medical_prompt
+import metrics
+import resilience
+from cache import LRUCache, SingleFlight
+from doctors import directory
+
+TTL = float(os.environ.get("CHATBOT_CACHE_TTL", 3600))
+MAX_ENTRIES = int(os.environ.get("CHATBOT_CACHE_ENTRIES", 2048))
+
+# Openers that don't change what is being asked about; stripped from the start only.
+LEADING_FILLER = (
+    "please analyze", "please analyse", "analyze these symptoms", "analyse these symptoms", "analyze", "analyse",
+    "please", "hi", "hello", "i have", "i've got", "ive got", "i am having", "im having", "i am experiencing",
+    "im experiencing", "i'm having", "i'm experiencing", "i feel", "i'm feeling", "im feeling",
+)
+_LEADING = re.compile(r"^(?:(?:%s)\b[\s:,]*)+" % "|".join(
+    re.escape(phrase) for phrase in sorted(LEADING_FILLER, key=len, reverse=True)))
+
+responses = LRUCache(max_entries=MAX_ENTRIES, ttl=TTL)  # key -> (answer, seconds it took)
+flights = SingleFlight()
+latency_saved = 0.0  # upstream seconds avoided by cache hits
+
+
+def normalize_query(text):
+    """Case-, whitespace- and punctuation-insensitive form of a query.
+
+    "Headache, fever!" and "I have headache fever" -> "headache fever".
+    Word order and repeated words are kept: "pain in leg, swelling in arm"
+    and "swelling in leg, pain in arm" are different questions.
+    """
+    text = " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+    text = _LEADING.sub("", text)
+    return " ".join(re.findall(r"[a-z0-9]+", text.replace("'", "")))
+
+
+def cache_key(text, model=llm.DEFAULT_MODEL):
+    # Answers embed doctors from the directory, so a re-import invalidates them.
+    return (medical_prompt.MODE, model, directory.version, normalize_query(text))
+
+
+async def cached(text, compute, deadline=None):
+    """compute()'s answer for `text`, reusing a recent answer to an equivalent query.
+
+    compute is an async callable returning a JSON-able dict; only successful
+    answers are cached. Callers get their own copy of the answer. Callers
+    waiting on another's computation give up when `deadline` (a
+    resilience.Deadline) runs out.
+    """
+    if TTL <= 0:
+        return await compute()
+    answer = lookup(text)
+    if answer is not None:
+        return answer
+
+    key = cache_key(text)
+    future, leader = flights.join(key)
+    if not leader:
+        waiting = asyncio.shield(asyncio.wrap_future(future))
+        try:
+            return copy.deepcopy(await asyncio.wait_for(waiting, deadline.remaining() if deadline else None))
+        except asyncio.TimeoutError:
+            raise resilience.DeadlineExceeded("timed out waiting for an identical request") from None
+    start = time.perf_counter()
+    try:
+        answer = await compute()
+    except BaseException as e:
+        error = e if isinstance(e, Exception) else TimeoutError("upstream call was cancelled")
+        flights.done(key, error=error)
+        raise
+    responses.put(key, (answer, time.perf_counter() - start))
+    flights.done(key, result=answer)
+    return copy.deepcopy(answer)
+
+
+def lookup(text):
+    """A copy of the cached answer to an equivalent query, or None."""
+    global latency_saved
+    if TTL <= 0:
+        return None
+    with metrics.stage("cache_lookup"):
+        entry = responses.get(cache_key(text))
+    if entry is None:
+        return None
+    answer, seconds = entry
+    latency_saved += seconds
+    return copy.deepcopy(answer)
+
+
+def store(text, answer, seconds):
+    """Cache an answer computed outside cached() (e.g. a streamed one)."""
+    if TTL > 0:
+        responses.put(cache_key(text), (copy.deepcopy(answer), seconds))
+
+
+def cached_sync(text, compute, deadline=None):
+    """cached() for threaded (WSGI) callers; runs on the LLM client's loop."""
+    return llm.client.run_sync(cached(text, compute, deadline))
+
+
+def stats():
+    lru = responses.stats()
+    lookups = lru["hits"] + lru["misses"]
+    return {
+        "entries": lru["entries"],
+        "hits": lru["hits"],
+        "misses": lru["misses"],
+        "coalesced": flights.coalesced,
+        "in_flight": len(flights),
+        "expirations": lru["expirations"],
+        "evictions": lru["evictions"],
+        "hit_ratio": lru["hits"] / lookups if lookups else 0.0,
+        "upstream_calls_saved": lru["hits"] + flights.coalesced,
+        "latency_saved_s": round(latency_saved, 3),
+    }
+
+
+metrics.register("response_cache", stats)
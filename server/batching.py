@@ -0,0 +1,101 @@
+"""Dynamic micro-batching for model inference.
+
+Requests that arrive within a short window are stacked into one batch and run
+through the model in a single call, which amortizes the framework's per-call
+overhead across concurrent requests. Each caller gets back its own row.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Collect single inputs into batches for `predict_batch`.
+
+    predict_batch: callable taking a stacked batch and returning one output row
+                   per input, in order.
+    max_batch_size: upper bound on rows per call.
+    max_wait_ms: how long the first request of a batch may wait for company.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=16, max_wait_ms=10.0, collate=np.stack):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.collate = collate
+        self.batches = 0
+        self.items = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        # Started lazily, and again in a forked child: threads don't survive fork.
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._worker.start()
+                    self._pid = os.getpid()
+
+    def submit(self, item):
+        """Queue one input; returns a Future resolving to its output row."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # finish this batch, stop on the next round
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            futures = [future for _, future in batch]
+            try:
+                outputs = self.predict_batch(self.collate([item for item, _ in batch]))
+                self.batches += 1
+                self.items += len(batch)
+                for future, output in zip(futures, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,73 @@
+"""Scaling of gene_cohort.py with the number of worker processes.
+
+Writes a synthetic cohort of --samples genome files (--lines rows each, a
+share of them known SNPs), then runs `gene_cohort.py` over it with each
+--workers count into a fresh output directory. For each run it reports the
+time spent analyzing (gene_cohort's own "processed ... in" figure), the
+wall time including pool start-up and the merge, samples/s, and the
+speedup and parallel efficiency (speedup / workers) against one worker.
+Close to linear scaling shows as efficiency near 1.0 up to the core count.
+
+Run from server/:
+    python -m benchmarks.bench_cohort --samples 64 --lines 200000
+    python -m benchmarks.bench_cohort --workers 1 2 4 8 16
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_genome_reader import write_synthetic_genome
+
+
+def write_cohort(directory, samples, lines):
+    with open("snp_annotations.jsonl") as f:
+        known = [json.loads(line)["rsid"] for line in f if line.strip()]
+    for i in range(samples):
+        write_synthetic_genome(os.path.join(directory, f"sample{i:04d}.txt"), lines, known_rsids=known, seed=i)
+
+
+def run(source, out, workers):
+    """(analysis seconds, wall seconds) of one gene_cohort.py run."""
+    start = time.perf_counter()
+    done = subprocess.run([sys.executable, "gene_cohort.py", source, "--out", out, "--workers", str(workers)],
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if done.returncode != 0:
+        raise SystemExit(f"gene_cohort.py failed with {workers} workers:\n{done.stderr}")
+    analysis = float(re.search(r"processed \d+ samples in ([\d.]+)s", done.stdout).group(1))
+    return analysis, wall
+
+
+def main():
+    cpus = os.cpu_count()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=32)
+    parser.add_argument("--lines", type=int, default=100_000, help="rows per genome file")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, cpus}))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(workdir, "genomes")
+    os.makedirs(source)
+    write_cohort(source, args.samples, args.lines)
+
+    print(f"{args.samples} samples x {args.lines:,} lines, {cpus} CPUs")
+    print(f"{'workers':>7} {'analysis s':>10} {'wall s':>8} {'samples/s':>10} {'speedup':>8} {'efficiency':>10}")
+    single = None
+    for workers in sorted({1, *args.workers}):  # one worker is the baseline
+        analysis, wall = run(source, os.path.join(workdir, f"out{workers}"), workers)
+        single = single or analysis
+        speedup = single / analysis
+        print(f"{workers:>7} {analysis:>10.2f} {wall:>8.2f} {args.samples / analysis:>10.1f} "
+              f"{speedup:>7.2f}x {speedup / workers:>10.2f}")
+    if cpus and max(args.workers) > cpus:
+        print(f"note: runs with more than {cpus} workers can't scale past the CPU count")
+
+
+if __name__ == "__main__":
+    main()
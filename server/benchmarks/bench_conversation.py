@@ -0,0 +1,90 @@
+"""Prompt size and latency of /api/chat as a conversation grows.
+
+A local stub stands in for the Groq API; its delay grows with the prompt
+(--prefill seconds per 1000 prompt tokens), as the real API's does. One
+long conversation is sent through server/chatbot.py's /api/chat two ways:
+
+    transcript   stateless: the client resends the whole conversation with
+                 every message
+    session      the server keeps the history (sessions.py) and the client
+                 only sends its session_id
+
+and the prompt tokens the stub saw and the request latency are reported
+every few turns. The response cache and the triage fast path are disabled.
+
+Run from server/:
+    python -m benchmarks.bench_conversation --turns 60 --delay 0.05 --prefill 0.2
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.bench_llm_client import SEEN, STUB_ANSWER, start_stub
+
+MESSAGES = [
+    "I've had a headache for three days",
+    "it gets worse when I look at screens",
+    "I also feel a bit nauseous in the mornings",
+    "is it safe to take ibuprofen for it?",
+    "my neck is stiff too",
+    "could it be related to my sleep? I only sleep 5 hours",
+    "what should I ask the doctor?",
+    "the pain is mostly behind my eyes",
+]
+
+
+def converse(client, turns, stateful):
+    """(prompt tokens, latency s) per turn of one conversation."""
+    rows = []
+    transcript = []
+    session_id = None
+    for turn in range(turns):
+        message = f"{MESSAGES[turn % len(MESSAGES)]} (message {turn + 1})"
+        if stateful:
+            body = {"query": message, **({"session_id": session_id} if session_id else {})}
+        else:
+            body = {"query": "\n".join(transcript + [f"user: {message}"])}
+        start = time.perf_counter()
+        response = client.post("/api/chat", json=body)
+        latency = time.perf_counter() - start
+        answer = response.get_json()
+        assert answer.get("possible_conditions"), answer
+        session_id = answer.get("session_id")
+        transcript += [f"user: {message}", f"assistant: {json.dumps(STUB_ANSWER)}"]
+        rows.append((SEEN["prompt_tokens"], latency))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--delay", type=float, default=0.05, help="stub base delay (s)")
+    parser.add_argument("--prefill", type=float, default=0.2, help="stub delay per 1000 prompt tokens (s)")
+    parser.add_argument("--every", type=int, default=10, help="report every N turns")
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = start_stub(args.delay, prefill=args.prefill)
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ["CHATBOT_CACHE_TTL"] = "0"
+    os.environ["TRIAGE_ENABLED"] = "0"
+    os.environ.setdefault("ROUTER_LOG", os.devnull)
+    import chatbot
+    import sessions
+
+    client = chatbot.app.test_client()
+    converse(client, 1, stateful=False)  # warm up
+    transcript = converse(client, args.turns, stateful=False)
+    session = converse(client, args.turns, stateful=True)
+
+    print(f"stub: {args.delay * 1e3:.0f} ms + {args.prefill * 1e3:.0f} ms per 1000 prompt tokens; "
+          f"history budget {sessions.HISTORY_TOKENS} tokens")
+    print(f"{'turn':>5} {'transcript tok':>15} {'ms':>7} {'session tok':>12} {'ms':>7}")
+    for turn in sorted({0, *range(args.every - 1, args.turns, args.every), args.turns - 1}):
+        (t_tokens, t_latency), (s_tokens, s_latency) = transcript[turn], session[turn]
+        print(f"{turn + 1:>5} {t_tokens:>15} {t_latency * 1e3:>7.0f} {s_tokens:>12} {s_latency * 1e3:>7.0f}")
+    print(f"session store: {sessions.stats()}")
+
+
+if __name__ == "__main__":
+    main()
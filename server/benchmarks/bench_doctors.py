@@ -0,0 +1,88 @@
+"""Doctor directory query latency at scale.
+
+Builds a temporary directory of N synthetic doctors (random names,
+specializations and experience) and times the /doctors query shapes:
+filtered and sorted first pages, a deep page reached through cursors, name
+prefix search and the fuzzy fallback.
+
+Run from server/:
+    python -m benchmarks.bench_doctors --doctors 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from doctors import DOCTORS_DATABASE, DoctorDirectory
+
+FIRST = ["Alice", "Robert", "Emily", "Michael", "Sarah", "James", "Lisa", "Mark", "Nancy", "Thomas", "Jennifer",
+         "Priya", "Wei", "Olga", "Carlos", "Fatima", "Kenji", "Amara", "Lars", "Sofia", "Ahmed", "Ines", "Tomasz"]
+LAST = ["Johnson", "Smith", "Chen", "Rodriguez", "Williams", "Wilson", "Brown", "Davis", "Lee", "Martin", "Garcia",
+        "Patel", "Nakamura", "Ivanova", "Okafor", "Schmidt", "Rossi", "Kowalski", "Haddad", "Lindqvist", "Moreau"]
+
+
+def synthetic(count, seed=0):
+    rng = np.random.default_rng(seed)
+    specializations = [d["specialization"] for d in DOCTORS_DATABASE]
+    for i in range(count):
+        last = f"{LAST[rng.integers(len(LAST))]}{'' if i < len(LAST) * 50 else rng.integers(1000)}"
+        yield {
+            "name": f"Dr. {FIRST[rng.integers(len(FIRST))]} {last}",
+            "specialization": specializations[rng.integers(len(specializations))],
+            "experience": f"{rng.integers(1, 41)} years",
+            "contact": f"555-{i:06d}",
+        }
+
+
+def timed(fn, repeat):
+    fn()  # warm the page cache and the statement cache
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    ms = np.array(timings) * 1e3
+    return np.percentile(ms, 50), np.percentile(ms, 95), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--doctors", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = DoctorDirectory(os.path.join(tmp, "doctors.sqlite3"))
+        start = time.perf_counter()
+        directory.import_doctors(synthetic(args.doctors), replace=True)
+        print(f"imported {len(directory)} doctors in {time.perf_counter() - start:.1f}s")
+
+        def deep_page(pages=50):
+            cursor = None
+            for _ in range(pages):
+                _, cursor = directory.search(sort="-experience", cursor=cursor)
+
+            def page():
+                return directory.search(sort="-experience", cursor=cursor)
+            return page
+
+        queries = [
+            ("first page, by name", lambda: directory.search()),
+            ("specialty, -experience", lambda: directory.search("Cardiologist", sort="-experience")),
+            ("specialty, 10-20 years", lambda: directory.search("Neurology", 10, 20, sort="experience")),
+            ("page 51 via cursor", deep_page()),
+            ("name prefix 'pat'", lambda: directory.search(name="pat")),
+            ("name 'sofia ross'", lambda: directory.search(name="sofia ross")),
+            ("fuzzy 'jonsen'", lambda: directory.search(name="jonsen")),
+            ("find() for the LLM", lambda: (directory.find("Dermatologist"), None)),
+        ]
+        print(f"{'query':<26} {'p50 ms':>8} {'p95 ms':>8} {'rows':>5}")
+        for name, fn in queries:
+            p50, p95, (rows, _) = timed(fn, args.repeat)
+            print(f"{name:<26} {p50:>8.2f} {p95:>8.2f} {len(rows):>5}")
+
+
+if __name__ == "__main__":
+    main()
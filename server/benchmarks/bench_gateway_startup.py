@@ -0,0 +1,71 @@
+"""Time from process start until each gateway service is ready.
+
+Starts `uvicorn gateway:app`, polls /ready/<name> for every service and
+prints when each one first returned 200 (or its failure), next to the time a
+plain `import <service>` takes in a fresh interpreter, which is what each
+separate Flask process paid before serving anything.
+
+Run from server/:
+    python -m benchmarks.bench_gateway_startup
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SERVICES = ["gene", "chatbot", "skin", "xray"]
+
+
+def poll(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+    except OSError:
+        return None, None
+
+
+def import_time(module):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", f"import {module}"], capture_output=True)
+    return time.perf_counter() - start if result.returncode == 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "gateway:app", "--port", str(args.port),
+                               "--log-level", "warning"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ready = {}
+    try:
+        while len(ready) < len(SERVICES) and time.perf_counter() - start < args.timeout:
+            for name in SERVICES:
+                if name in ready:
+                    continue
+                status, body = poll(f"http://127.0.0.1:{args.port}/ready/{name}")
+                if status == 200:
+                    ready[name] = f"{time.perf_counter() - start:.2f}"
+                elif body and body.get("status") == "failed":
+                    ready[name] = f"failed ({body['error']})"
+            time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{'service':<8} {'gateway ready s':>16} {'standalone import s':>20}")
+    for name in SERVICES:
+        standalone = import_time(name)
+        print(f"{name:<8} {ready.get(name, 'timeout'):>16} "
+              f"{f'{standalone:.2f}' if standalone is not None else 'failed':>20}")
+
+
+if __name__ == "__main__":
+    main()
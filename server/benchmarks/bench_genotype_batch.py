@@ -0,0 +1,74 @@
+"""Per-line interpret_snp vs. vectorized interpret_batch on a synthetic genome file.
+
+Run from server/:
+    python -m benchmarks.bench_genotype_batch --lines 1000000 --snps 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import genome_analysis
+import snp_kb
+from benchmarks.bench_genome_reader import GENOTYPES
+from benchmarks.bench_snp_kb import write_synthetic_source
+from genome_reader import GenomeReader
+
+
+def write_genome(path, lines, known, match_ratio, seed=1):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write("# rsid\tchromosome\tposition\tgenotype\n")
+        for _ in range(lines):
+            rsid = rng.choice(known) if rng.random() < match_ratio else f"rs{rng.randrange(1, 2**31)}"
+            f.write(f"{rsid}\t1\t{rng.randrange(1, 2**28)}\t{rng.choice(GENOTYPES)}\n")
+
+
+def per_line(path):
+    reports = []
+    with open(path, "rb") as f:
+        for rsid, genotype in GenomeReader(f):
+            result = genome_analysis.interpret_snp(rsid, genotype)
+            if result:
+                reports.append(result)
+    return reports
+
+
+def batched(path):
+    reports = []
+    with open(path, "rb") as f:
+        for rsids, genotypes in GenomeReader(f).batches():
+            reports.extend(genome_analysis.interpret_batch(rsids, genotypes))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--snps", type=int, default=100_000)
+    parser.add_argument("--match-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    source, index = os.path.join(workdir, "kb.jsonl"), os.path.join(workdir, "kb.idx")
+    known = write_synthetic_source(source, args.snps)
+    snp_kb.compile_index(source, index)
+    genome_analysis.SNP_KB = snp_kb.SnpKnowledgeBase(index)
+    genome = os.path.join(workdir, "genome.txt")
+    write_genome(genome, args.lines, known, args.match_ratio)
+
+    timings = {}
+    outputs = {}
+    for name, fn in (("per-line", per_line), ("batch", batched)):
+        start = time.perf_counter()
+        outputs[name] = fn(genome)
+        timings[name] = time.perf_counter() - start
+        print(f"{name:>9}: {timings[name]:6.2f} s  {args.lines / timings[name]:>12,.0f} lines/s"
+              f"  {len(outputs[name]):,} reports")
+    print(f"identical output: {outputs['per-line'] == outputs['batch']}")
+    print(f"speedup: {timings['per-line'] / timings['batch']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
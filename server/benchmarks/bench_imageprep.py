@@ -0,0 +1,102 @@
+"""Image preprocessing cost per stage, old path vs imageprep, across upload sizes.
+
+For synthetic JPEGs from ~0.3 to ~24 megapixels, times the previous skin.py
+preprocessing (full decode, resize, float64 `/ 255.0`) against imageprep
+(header check, reduced-scale decode, resize, float32 normalize), stage by
+stage, plus the peak memory allocated by numpy during normalization.
+
+Run from server/:
+    python -m benchmarks.bench_imageprep
+    python -m benchmarks.bench_imageprep --repeat 20 --sizes 640x480 4000x3000
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+import imageprep
+
+SIZES = ["640x480", "1632x1224", "4032x3024", "6000x4000"]
+TARGET = (180, 180)
+
+
+def make_jpeg(width, height):
+    # Smooth gradients plus noise: compresses like a photo, unlike pure noise.
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+    pixels = np.clip(base + rng.integers(-12, 12, base.shape), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def old_path(data, timings):
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    timings["open"] += time.perf_counter() - start
+    start = time.perf_counter()
+    image = image.convert("RGB")
+    timings["decode"] += time.perf_counter() - start
+    start = time.perf_counter()
+    image = image.resize(TARGET)
+    timings["resize"] += time.perf_counter() - start
+    start = time.perf_counter()
+    array = np.expand_dims(np.array(image) / 255.0, axis=0)
+    timings["normalize"] += time.perf_counter() - start
+    return array[0]
+
+
+def new_path(data, timings):
+    start = time.perf_counter()
+    image = imageprep.open_image(data)
+    timings["open"] += time.perf_counter() - start
+    start = time.perf_counter()
+    image.draft("RGB", TARGET)
+    image = image.convert("RGB")
+    timings["decode"] += time.perf_counter() - start
+    start = time.perf_counter()
+    pixels = np.asarray(image.resize(TARGET, resample=Image.BICUBIC, reducing_gap=3.0), dtype=np.uint8)
+    timings["resize"] += time.perf_counter() - start
+    start = time.perf_counter()
+    array = imageprep.scale_to_unit(pixels)
+    timings["normalize"] += time.perf_counter() - start
+    return array
+
+
+def normalize_peak(path, data):
+    tracemalloc.start()
+    path(data, {"open": 0, "decode": 0, "resize": 0, "normalize": 0})
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=SIZES, help="WIDTHxHEIGHT of the synthetic uploads")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    stages = ["open", "decode", "resize", "normalize"]
+    print(f"{'size':>10} {'MP':>5} {'path':>4} " + " ".join(f"{s + ' ms':>12}" for s in stages)
+          + f" {'total ms':>9} {'peak KiB':>9} {'max |diff|':>10}")
+    for size in args.sizes:
+        width, height = map(int, size.split("x"))
+        data = make_jpeg(width, height)
+        reference = old_path(data, {s: 0.0 for s in stages})
+        for label, path in (("old", old_path), ("new", new_path)):
+            timings = {s: 0.0 for s in stages}
+            for _ in range(args.repeat):
+                result = path(data, timings)
+            diff = float(np.abs(result.astype(np.float64) - reference).max())
+            per = [timings[s] / args.repeat * 1e3 for s in stages]
+            print(f"{size:>10} {width * height / 1e6:>5.1f} {label:>4} " + " ".join(f"{t:>12.2f}" for t in per)
+                  + f" {sum(per):>9.2f} {normalize_peak(path, data) / 1024:>9.0f} {diff:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
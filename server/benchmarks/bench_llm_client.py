@@ -0,0 +1,187 @@
+"""Concurrent chatbot throughput against a local stub of the Groq API.
+
+Starts a stub chat-completions server that answers every request after a
+fixed delay, points GROQ_BASE_URL at it, then sends N concurrent symptom
+analyses through:
+
+    blocking   the previous pattern: the sync Groq client called from an
+               async handler, which stalls the event loop during each call
+    fastapi    chatbot/app.py's /analyze on the shared async client
+    flask      server/chatbot.py's /api/chat from N threads (sync wrapper)
+
+Run from server/:
+    python -m benchmarks.bench_llm_client --requests 64 --concurrency 16 --delay 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import ClientDisconnect
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+STUB_ANSWER = {
+    "possible_conditions": [{
+        "condition": "Tension headache", "likelihood": "medium", "description": "Stub answer",
+        "general_treatment": "Rest", "recommended_specialist": "Neurology",
+    }],
+    "recommended_doctors": [{
+        "name": "Dr. Robert Smith", "specialization": "Neurology", "experience": "12 years", "contact": "555-0124",
+    }],
+    "general_advice": "Stub advice",
+    "disclaimer": "Stub disclaimer",
+}
+
+
+# Fault injection, read by the stub on every request: a share of requests
+# fail with a 503 or take `slow_delay` extra seconds.
+FAULTS = {"error_rate": 0.0, "slow_rate": 0.0, "slow_delay": 0.0, "requests": 0}
+# Prompt size of the last request, in ~4-character tokens.
+SEEN = {"prompt_tokens": 0}
+
+
+def stub_tokens(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def stub_app(delay, token_delay=0.0, prefill=0.0):
+    """Answers after `delay`, plus `token_delay` per ~4-character output token
+    and `prefill` per 1000 prompt tokens.
+
+    With "stream": true the answer is sent as chat.completion.chunk events,
+    one token at a time, like the real API. FAULTS injects errors and slow
+    responses.
+    """
+    content = json.dumps(STUB_ANSWER, indent=1)
+    tokens = stub_tokens(content)
+
+    async def completions(request):
+        try:
+            body = await request.json()
+        except ClientDisconnect:  # a hedged or timed-out request was cancelled
+            return Response(status_code=499)
+        FAULTS["requests"] += 1
+        SEEN["prompt_tokens"] = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+        if random.random() < FAULTS["error_rate"]:
+            return JSONResponse({"error": {"message": "injected fault", "type": "internal_server_error"}},
+                                status_code=503)
+        await asyncio.sleep(delay + prefill * SEEN["prompt_tokens"] / 1000
+                            + (FAULTS["slow_delay"] if random.random() < FAULTS["slow_rate"] else 0))
+        if body.get("stream"):
+            return StreamingResponse(stream(body["model"]), media_type="text/event-stream")
+        await asyncio.sleep(token_delay * len(tokens))
+        return JSONResponse({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    async def stream(model):
+        for i, token in enumerate(tokens):
+            last = i == len(tokens) - 1
+            chunk = {
+                "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": "stop" if last else None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(token_delay)
+        yield "data: [DONE]\n\n"
+
+    return Starlette(routes=[Route("/openai/v1/chat/completions", completions, methods=["POST"])])
+
+
+def start_stub(delay, token_delay=0.0, prefill=0.0):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(stub_app(delay, token_delay, prefill), log_level="warning",
+                                           limit_concurrency=1000))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+async def run_blocking(total, concurrency):
+    from groq import Groq
+
+    client = Groq()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            client.chat.completions.create(messages=[{"role": "user", "content": "headache"}],
+                                           model="llama-3.3-70b-versatile",
+                                           response_format={"type": "json_object"})
+
+    await asyncio.gather(*(one() for _ in range(total)))
+
+
+async def run_fastapi(total, concurrency):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "chatbot"))
+    import app as chatbot_app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=chatbot_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        async def one():
+            async with semaphore:
+                response = await client.post("/analyze", json={"symptoms": "headache"}, timeout=60)
+                assert "possible_conditions" in response.json(), response.text
+
+        await asyncio.gather(*(one() for _ in range(total)))
+
+
+def run_flask(total, concurrency):
+    import chatbot
+
+    client = chatbot.app.test_client()
+
+    def one(_):
+        response = client.post("/api/chat", json={"query": "headache"})
+        assert "possible_conditions" in response.get_json(), response.get_data(as_text=True)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(total)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--delay", type=float, default=0.2, help="stub response time in seconds")
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = start_stub(args.delay)
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ["CHATBOT_CACHE_TTL"] = "0"  # every request must reach the stub
+    os.environ["TRIAGE_ENABLED"] = "0"
+    os.environ.setdefault("ROUTER_LOG", os.devnull)  # keep routing decisions out of the report
+    runs = [
+        ("blocking", lambda: asyncio.run(run_blocking(args.requests, args.concurrency))),
+        ("fastapi", lambda: asyncio.run(run_fastapi(args.requests, args.concurrency))),
+        ("flask", lambda: run_flask(args.requests, args.concurrency)),
+    ]
+    ideal = args.concurrency / args.delay
+    print(f"{args.requests} requests, {args.concurrency} concurrent, stub delay {args.delay * 1e3:.0f} ms "
+          f"(ideal {ideal:.0f} req/s)")
+    print(f"{'path':<10} {'seconds':>8} {'req/s':>8}")
+    for name, run in runs:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} {elapsed:>8.2f} {args.requests / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
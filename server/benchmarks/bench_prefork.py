@@ -0,0 +1,124 @@
+"""Memory and throughput of pre-fork serving as workers scale from 1 to N.
+
+For each worker count, starts `prefork.py <service>`, drives /api/predict from
+concurrent clients for a fixed time, and sums the proportional set size (PSS)
+of the parent and its workers, which counts shared weight pages only once.
+
+Run from server/ (needs the model files the service normally loads):
+    python -m benchmarks.bench_prefork xray
+    SKIN_BACKEND=tflite_int8 python -m benchmarks.bench_prefork skin --workers 1 2 4
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+
+import numpy as np
+from PIL import Image
+
+
+def sample_image(size=(640, 480)):
+    pixels = np.random.default_rng(0).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def multipart(field, filename, data):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def pss_bytes(pid):
+    """PSS of pid and its direct children, from /proc/<pid>/smaps_rollup."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    total = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total, len(pids) - 1
+
+
+def wait_ready(url, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+        except urllib.error.HTTPError:
+            return  # the server answered, even if not with 200
+        except OSError:
+            time.sleep(0.5)
+            continue
+        return
+    raise TimeoutError(f"server at {url} did not come up")
+
+
+def drive(url, body, content_type, clients, seconds):
+    done = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client():
+        n = 0
+        while time.monotonic() < stop_at:
+            request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+            urllib.request.urlopen(request, timeout=60).read()
+            n += 1
+        with lock:
+            done.append(n)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(done) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("service", choices=["xray", "skin"])
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, max(1, (os.cpu_count() or 1) // 2), os.cpu_count() or 1}))
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--port", type=int, default=5900)
+    args = parser.parse_args()
+
+    body, content_type = multipart("file", "sample.jpg", sample_image())
+    url = f"http://127.0.0.1:{args.port}/api/predict"
+    print(f"{'workers':>8} {'req/s':>8} {'PSS MiB':>9} {'PSS/worker':>11}")
+    for workers in args.workers:
+        server = subprocess.Popen([sys.executable, "prefork.py", args.service, "--workers", str(workers),
+                                   "--port", str(args.port), "--host", "127.0.0.1"],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(f"http://127.0.0.1:{args.port}/")
+            drive(url, body, content_type, args.clients, 2)  # warm every worker
+            rps = drive(url, body, content_type, args.clients, args.seconds)
+            pss, children = pss_bytes(server.pid)
+            print(f"{workers:>8} {rps:>8.1f} {pss / 2**20:>9.0f} {pss / max(children, 1) / 2**20:>11.0f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
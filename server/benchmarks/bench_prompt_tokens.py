@@ -0,0 +1,94 @@
+"""Prompt and answer size of the full vs lean chatbot prompts as the directory grows.
+
+Offline, sizes are estimated at ~4 characters per token: the full prompt
+embeds the directory (synthetic doctors spread over the real
+specializations), and its answer repeats three doctor records, which the
+lean answer leaves out. With --live N, each mode also sends N real requests
+through llm.py and reports the API's token counts and latency (needs
+GROQ_API_KEY and network access; the real 11-doctor directory is used).
+
+Run from server/:
+    python -m benchmarks.bench_prompt_tokens
+    python -m benchmarks.bench_prompt_tokens --live 5
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+import llm
+import medical_prompt
+from chatbot import full_prompt_messages
+from doctors import DOCTORS_DATABASE
+
+SIZES = [11, 100, 1000, 10000]
+QUERY = "I have had a throbbing headache and blurred vision for three days"
+SAMPLE_ANSWER = {
+    "possible_conditions": [
+        {"condition": "Migraine", "likelihood": "high", "description": "Recurring headaches with visual aura.",
+         "general_treatment": "Rest in a dark room, pain relief, avoid triggers.", "recommended_specialist": "Neurology"},
+        {"condition": "Hypertension", "likelihood": "medium", "description": "High blood pressure can cause headaches.",
+         "general_treatment": "Blood pressure monitoring and lifestyle changes.", "recommended_specialist": "Cardiology"},
+    ],
+    "general_advice": "Seek urgent care if vision loss or weakness appears.",
+    "disclaimer": "This is not medical advice. Please consult a healthcare professional.",
+}
+
+
+def directory_of(size):
+    doctors = []
+    for i in range(size):
+        base = DOCTORS_DATABASE[i % len(DOCTORS_DATABASE)]
+        doctors.append({**base, "name": f"Dr. Example {i}", "contact": f"555-{i:05d}"})
+    return doctors
+
+
+def tokens(messages_or_obj):
+    return len(json.dumps(messages_or_obj)) / 4
+
+
+def live(mode, runs):
+    medical_prompt.MODE = mode
+    before = llm.client.stats()
+    latencies = []
+    for _ in range(runs):
+        if mode == "lean":
+            messages = medical_prompt.lean_messages(QUERY)
+        else:
+            messages = full_prompt_messages(QUERY, DOCTORS_DATABASE)
+        start = time.perf_counter()
+        llm.client.complete_json_sync(messages, temperature=0.2)
+        latencies.append(time.perf_counter() - start)
+    after = llm.client.stats()
+    return ((after["prompt_tokens"] - before["prompt_tokens"]) / runs,
+            (after["completion_tokens"] - before["completion_tokens"]) / runs,
+            float(np.median(latencies)) * 1e3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--live", type=int, default=0, help="also send N real requests per mode")
+    args = parser.parse_args()
+
+    lean_in = tokens(medical_prompt.lean_messages(QUERY))
+    lean_out = tokens(SAMPLE_ANSWER)
+    full_out = tokens({**SAMPLE_ANSWER, "recommended_doctors": DOCTORS_DATABASE[:3]})
+    print("estimated tokens (~4 chars/token)")
+    print(f"{'doctors':>8} {'full in':>9} {'lean in':>9} {'full out':>9} {'lean out':>9} {'saved':>7}")
+    for size in args.sizes:
+        full_in = tokens(full_prompt_messages(QUERY, directory_of(size)))
+        saved = 1 - (lean_in + lean_out) / (full_in + full_out)
+        print(f"{size:>8} {full_in:>9.0f} {lean_in:>9.0f} {full_out:>9.0f} {lean_out:>9.0f} {saved:>6.0%}")
+
+    if args.live:
+        print(f"\nlive, {args.live} requests per mode (tokens as counted by the API)")
+        print(f"{'mode':>6} {'prompt tok':>11} {'output tok':>11} {'p50 ms':>8}")
+        for mode in ("full", "lean"):
+            prompt, completion, p50 = live(mode, args.live)
+            print(f"{mode:>6} {prompt:>11.0f} {completion:>11.0f} {p50:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
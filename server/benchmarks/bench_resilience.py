@@ -0,0 +1,107 @@
+"""Chat latency and outcomes under injected upstream faults, with and without resilience.py.
+
+A local stub stands in for the Groq API and injects faults; server/chatbot.py's
+/api/chat is called from concurrent threads (response cache and triage off)
+in three scenarios:
+
+    slow tail   a share of responses takes seconds longer (hedging)
+    flaky       a share of responses are 503s (retries within the deadline)
+    outage      every response hangs (deadline, then the circuit breaker
+                fails fast to degraded answers)
+
+"off" runs the same traffic with hedging, retries and the breaker disabled
+and an effectively unlimited deadline, like the code before resilience.py
+(failed calls still get the degraded answer rather than an error).
+
+Run from server/:
+    python -m benchmarks.bench_resilience --requests 60 --concurrency 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.bench_llm_client import FAULTS, start_stub
+
+SCENARIOS = {
+    "slow tail": {"slow_rate": 0.08, "slow_delay": 2.0},
+    "flaky": {"error_rate": 0.3},
+    "outage": {"slow_rate": 1.0, "slow_delay": 6.0},
+}
+
+
+def configure(resilience, enabled, budget, defaults):
+    if enabled:
+        for name, value in defaults.items():
+            setattr(resilience, name, value)
+        resilience.BUDGET = budget
+    else:
+        resilience.HEDGE_RATIO = 0
+        resilience.RETRIES = 0
+        resilience.BUDGET = 600
+    resilience.breaker.__init__(failures=defaults["BREAKER_FAILURES"] if enabled else 10 ** 9,
+                                cooldown=defaults["BREAKER_COOLDOWN"])
+    resilience.latency.__init__()
+    for key in resilience.counters:
+        resilience.counters[key] = 0
+
+
+def run(client, total, concurrency):
+    results = []
+
+    def one(i):
+        start = time.perf_counter()
+        answer = client.post("/api/chat", json={"query": f"headache number {i}"}).get_json()
+        kind = "error" if "error" in answer else "degraded" if answer.get("degraded") else "ok"
+        results.append((time.perf_counter() - start, kind))
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.1, help="normal stub response time (s)")
+    parser.add_argument("--budget", type=float, default=2.0, help="CHATBOT_DEADLINE for the 'on' runs (s)")
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = start_stub(args.delay)
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ["CHATBOT_CACHE_TTL"] = "0"
+    os.environ["TRIAGE_ENABLED"] = "0"
+    os.environ["LLM_SMALL_MODEL"] = ""  # one attempt per request
+    os.environ.setdefault("ROUTER_LOG", os.devnull)
+    import chatbot
+    import resilience
+
+    defaults = {name: getattr(resilience, name) for name in
+                ("HEDGE_RATIO", "RETRIES", "BREAKER_FAILURES", "BREAKER_COOLDOWN")}
+    client = chatbot.app.test_client()
+    print(f"{args.requests} requests per run, {args.concurrency} concurrent, stub {args.delay * 1e3:.0f} ms, "
+          f"budget {args.budget:g}s")
+    print(f"{'scenario':<10} {'mode':<4} {'ok':>4} {'degraded':>9} {'error':>6} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'upstream':>9} {'hedges':>7} {'retries':>8} {'breaker':>8}")
+    for scenario, faults in SCENARIOS.items():
+        for mode in ("off", "on"):
+            configure(resilience, mode == "on", args.budget, defaults)
+            FAULTS.update({"error_rate": 0.0, "slow_rate": 0.0, "slow_delay": 0.0, "requests": 0})
+            run(client, 30, args.concurrency)  # warm up the latency tracker
+            FAULTS.update(faults, requests=0)
+            before = dict(resilience.counters)
+            results = run(client, args.requests, args.concurrency)
+            counters = {key: value - before[key] for key, value in resilience.counters.items()}
+            ms = np.array([r[0] for r in results]) * 1e3
+            kinds = [r[1] for r in results]
+            print(f"{scenario:<10} {mode:<4} {kinds.count('ok'):>4} {kinds.count('degraded'):>9} "
+                  f"{kinds.count('error'):>6} {np.percentile(ms, 50):>8.0f} {np.percentile(ms, 99):>8.0f} "
+                  f"{ms.max():>8.0f} {FAULTS['requests']:>9} {counters['hedges']:>7} "
+                  f"{counters['retries']:>8} {resilience.breaker.opened:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Upstream calls and latency with and without the chatbot response cache.
+
+Replays bursts of near-identical symptom queries (different case,
+punctuation, filler words and word order) against server/chatbot.py's
+/api/chat, with concurrent threads, while a local stub stands in for the
+Groq API. With the cache off every request is an upstream call; with it on,
+equivalent queries are answered from the cache, and concurrent misses for
+the same query are coalesced into one call.
+
+Run from server/:
+    python -m benchmarks.bench_response_cache --bursts 8 --burst-size 16 --delay 0.2
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.bench_llm_client import start_stub
+
+VARIANTS = [
+    ["headache and fever", "Headache, fever", "I have a fever and headache", "fever + headache!!"],
+    ["sore throat, cough", "I've got a cough and a sore throat", "COUGH sore throat"],
+    ["chest pain when breathing", "Chest pain, breathing", "I feel chest pain when breathing."],
+    ["itchy rash on arms", "rash, itchy, arms", "Itchy rash on my arms"],
+]
+
+
+def workload(bursts, burst_size, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(bursts):
+        group = VARIANTS[rng.integers(len(VARIANTS))]
+        yield [group[rng.integers(len(group))] for _ in range(burst_size)]
+
+
+def run(client, bursts, burst_size):
+    latencies = []
+
+    def one(query):
+        start = time.perf_counter()
+        response = client.post("/api/chat", json={"query": query})
+        assert "possible_conditions" in response.get_json(), response.get_data(as_text=True)
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(burst_size) as pool:
+        for burst in workload(bursts, burst_size):
+            list(pool.map(one, burst))
+    return np.array(latencies) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bursts", type=int, default=8)
+    parser.add_argument("--burst-size", type=int, default=16)
+    parser.add_argument("--delay", type=float, default=0.2, help="stub response time in seconds")
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = start_stub(args.delay)
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ["TRIAGE_ENABLED"] = "0"  # measure the cache alone
+    os.environ.setdefault("ROUTER_LOG", os.devnull)  # keep routing decisions out of the report
+    import analysis_cache
+    import chatbot
+    import llm
+
+    client = chatbot.app.test_client()
+    ttl = analysis_cache.TTL
+    total = args.bursts * args.burst_size
+    print(f"{args.bursts} bursts of {args.burst_size} concurrent queries, stub delay {args.delay * 1e3:.0f} ms")
+    print(f"{'cache':<6} {'upstream':>9} {'hits':>5} {'coalesced':>10} {'p50 ms':>8} {'p95 ms':>8} {'saved s':>8}")
+    for name, cache_ttl in (("off", 0), ("on", ttl)):
+        analysis_cache.TTL = cache_ttl
+        analysis_cache.responses.clear()
+        before = llm.client.requests
+        ms = run(client, args.bursts, args.burst_size)
+        stats = analysis_cache.stats()
+        upstream = llm.client.requests - before
+        print(f"{name:<6} {upstream:>9} {stats['hits']:>5} {stats['coalesced']:>10} "
+              f"{np.percentile(ms, 50):>8.1f} {np.percentile(ms, 95):>8.1f} {stats['latency_saved_s']:>8.2f}")
+    print(f"({total} requests per run)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Throughput and p99 latency of the skin classifier with and without micro-batching.
+
+Drives the model from 1, 8 and 32 concurrent client threads. By default a
+stand-in model is used (fixed per-call overhead plus a dense layer over the
+180x180x3 input) so the benchmark runs without TensorFlow; pass --model to
+use the real Keras model instead.
+
+Run from server/:
+    python -m benchmarks.bench_skin_batching
+    python -m benchmarks.bench_skin_batching --model fixed_model.h5
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from batching import MicroBatcher
+
+INPUT_SHAPE = (180, 180, 3)
+
+
+class StandInModel:
+    """Per-call framework overhead plus real matrix math that grows with batch size."""
+
+    def __init__(self, overhead_ms=8.0, classes=4):
+        self.overhead = overhead_ms / 1000.0
+        self.weights = np.random.default_rng(0).standard_normal((np.prod(INPUT_SHAPE), classes)).astype(np.float32)
+
+    def predict_on_batch(self, batch):
+        time.sleep(self.overhead)
+        return batch.reshape(len(batch), -1) @ self.weights
+
+
+def run_clients(call, clients, requests_per_client):
+    image = np.random.default_rng(1).random(INPUT_SHAPE, dtype=np.float32)
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        mine = []
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            call(image)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, np.percentile(latencies, 50) * 1e3, np.percentile(latencies, 99) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", help="path to the Keras model (default: stand-in model)")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.model:
+        import tensorflow as tf
+        model = tf.keras.models.load_model(args.model)
+    else:
+        model = StandInModel()
+
+    # The unbatched path is what skin.py did before: one predict call per request.
+    lock = threading.Lock()
+
+    def unbatched(image):
+        with lock:
+            return model.predict_on_batch(image[None])[0]
+
+    batcher = MicroBatcher(model.predict_on_batch, args.max_batch, args.wait_ms)
+    print(f"{'clients':>8} {'mode':>10} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for clients in args.clients:
+        for name, call in (("unbatched", unbatched), ("batched", batcher.predict)):
+            rps, p50, p99 = run_clients(call, clients, args.requests)
+            print(f"{clients:>8} {name:>10} {rps:>9.1f} {p50:>9.1f} {p99:>9.1f}")
+    batcher.close()
+    print(f"mean batch size: {batcher.stats()['mean_batch_size']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
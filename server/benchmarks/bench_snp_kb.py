@@ -0,0 +1,84 @@
+"""Cold start and per-lookup cost of the compiled SNP index at 100k SNPs.
+
+Run from server/:
+    python -m benchmarks.bench_snp_kb --snps 100000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import snp_kb
+
+ADVICE = [f"Advice variant {i}: keep an eye on diet, exercise and regular check-ups." for i in range(500)]
+
+
+def write_synthetic_source(path, snps, seed=0):
+    rng = random.Random(seed)
+    rsids = rng.sample(range(1, 1_500_000_000), snps)
+    with open(path, "w") as f:
+        for rsid in rsids:
+            entry = {"rsid": f"rs{rsid}", "gene": f"GENE{rsid % 5000}",
+                     "risk_allele": rng.choice("ACGT"), "normal_allele": rng.choice("ACGT")}
+            for category, risk in zip(snp_kb.CATEGORIES, (1.67, 1.3, 1.0)):
+                entry[category] = {
+                    "condition": f"{category} condition {rsid % 300}",
+                    "lifestyle_advice": rng.choice(ADVICE),
+                    "nutrition_advice": rng.choice(ADVICE),
+                    "predictive_health": rng.choice(ADVICE),
+                    "risk_factor": risk,
+                }
+            f.write(json.dumps(entry) + "\n")
+    return [f"rs{r}" for r in rsids]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snps", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(workdir, "kb.jsonl")
+    index = os.path.join(workdir, "kb.idx")
+    rsids = write_synthetic_source(source, args.snps)
+
+    start = time.perf_counter()
+    snp_kb.compile_index(source, index)
+    compile_s = time.perf_counter() - start
+
+    # Cold start in a fresh interpreter, so nothing is warm in this process.
+    code = ("import time; t = time.perf_counter(); import snp_kb; "
+            f"kb = snp_kb.SnpKnowledgeBase({index!r}); print(time.perf_counter() - t)")
+    cold_s = float(subprocess.check_output([sys.executable, "-c", code]).decode())
+
+    kb = snp_kb.SnpKnowledgeBase(index)
+    rng = random.Random(1)
+    hits = [rng.choice(rsids) for _ in range(args.lookups)]
+    misses = [f"rs{rng.randrange(1, 1_500_000_000)}" for _ in range(args.lookups)]
+
+    start = time.perf_counter()
+    for rsid in hits:
+        kb.get(rsid)
+    get_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+    start = time.perf_counter()
+    for rsid in misses:
+        rsid in kb
+    miss_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+    print(f"SNPs:              {len(kb):,}")
+    print(f"source size:       {os.path.getsize(source) / 2**20:.1f} MiB")
+    print(f"index size:        {os.path.getsize(index) / 2**20:.1f} MiB ({kb.string_count:,} distinct strings)")
+    print(f"compile:           {compile_s:.2f} s")
+    print(f"cold start (open): {cold_s * 1e3:.2f} ms")
+    print(f"get() hit:         {get_us:.2f} us/lookup")
+    print(f"contains() miss:   {miss_us:.2f} us/lookup")
+
+
+if __name__ == "__main__":
+    main()
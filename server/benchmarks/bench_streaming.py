@@ -0,0 +1,106 @@
+"""Time to first byte of the streaming vs non-streaming chat endpoints.
+
+A local stub stands in for the Groq API: it answers after a first-token
+delay and then produces ~4-character tokens at a fixed rate (streamed
+one by one when asked to). Both chat apps are served over real sockets,
+chatbot/app.py with uvicorn and server/chatbot.py with werkzeug, and each
+endpoint is timed to the first body byte, the first possible_conditions
+entry and the complete answer. The response cache and the triage
+fast path are disabled.
+
+Run from server/:
+    python -m benchmarks.bench_streaming --first-token 0.3 --token-delay 0.02 --runs 5
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+from werkzeug.serving import make_server
+
+from benchmarks.bench_llm_client import start_stub
+
+QUERY = "throbbing headache and blurred vision"
+
+
+def serve_asgi(app):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def serve_wsgi(app):
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def timed_request(url, body, streaming):
+    """Seconds to the first body byte, the first condition and the end of the response."""
+    start = time.perf_counter()
+    first_byte = first_condition = None
+    text = ""
+    with httpx.stream("POST", url, json=body, timeout=60) as response:
+        for chunk in response.iter_text():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            text += chunk
+            if first_condition is None and streaming and "event: condition" in text:
+                first_condition = time.perf_counter() - start
+    total = time.perf_counter() - start
+    if streaming:
+        assert "event: done" in text, text[-500:]
+    else:
+        assert json.loads(text)["possible_conditions"], text
+        first_condition = total
+    return first_byte, first_condition, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--first-token", type=float, default=0.3, help="stub delay before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="stub delay per token (s)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = start_stub(args.first_token, args.token_delay)
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ["CHATBOT_CACHE_TTL"] = "0"
+    os.environ["TRIAGE_ENABLED"] = "0"
+    os.environ.setdefault("ROUTER_LOG", os.devnull)  # keep routing decisions out of the report
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "chatbot"))
+    import app as chatbot_app
+    import chatbot
+
+    fastapi_url = serve_asgi(chatbot_app.app)
+    flask_url = serve_wsgi(chatbot.app)
+    endpoints = [
+        ("fastapi /analyze", f"{fastapi_url}/analyze", {"symptoms": QUERY}, False),
+        ("fastapi /analyze/stream", f"{fastapi_url}/analyze/stream", {"symptoms": QUERY}, True),
+        ("flask /api/chat", f"{flask_url}/api/chat", {"query": QUERY}, False),
+        ("flask /api/chat/stream", f"{flask_url}/api/chat/stream", {"query": QUERY}, True),
+    ]
+    print(f"stub: first token {args.first_token * 1e3:.0f} ms, {args.token_delay * 1e3:.0f} ms/token; "
+          f"median of {args.runs} runs")
+    print(f"{'endpoint':<26} {'first byte ms':>14} {'1st condition ms':>17} {'complete ms':>12}")
+    for name, url, body, streaming in endpoints:
+        timed_request(url, body, streaming)  # warm up connections and the directory
+        runs = np.array([timed_request(url, body, streaming) for _ in range(args.runs)]) * 1e3
+        first_byte, first_condition, total = np.median(runs, axis=0)
+        print(f"{name:<26} {first_byte:>14.0f} {first_condition:>17.0f} {total:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Latency and top-1 agreement of the X-ray serving modes against the eager fp32 path.
+
+Every variant runs over the same held-out images; agreement is measured
+against the eager float32 model (the current xray.py behaviour).
+
+Run from server/:
+    python -m benchmarks.bench_xray_variants heldout_images/
+    python -m benchmarks.bench_xray_variants --random-weights --synthetic 32   # no weights/images needed
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+import imageprep
+import xray_serving
+from xray_serving import transform
+
+VARIANTS = [
+    ("eager", False),
+    ("eager", True),
+    ("torchscript", False),
+    ("torchscript", True),
+    ("compile", True),
+    ("int8_dynamic", True),
+    ("int8_static", True),
+]
+
+
+def load_images(directory, synthetic):
+    if synthetic:
+        rng = np.random.default_rng(0)
+        images = [Image.fromarray(rng.integers(0, 256, (512, 512, 3), dtype=np.uint8)) for _ in range(synthetic)]
+    else:
+        images = []
+        for name in sorted(os.listdir(directory)):
+            try:
+                with open(os.path.join(directory, name), "rb") as f:
+                    images.append(imageprep.open_image(f.read()))
+            except (OSError, imageprep.ImageRejected):
+                continue
+    return [transform(image).unsqueeze(0) for image in images]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", nargs="?", help="directory of held-out X-ray images")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N random images instead")
+    parser.add_argument("--random-weights", action="store_true", help="don't load resnet_knee_model.pth")
+    parser.add_argument("--threads", type=int, help="intra-op threads")
+    args = parser.parse_args()
+    if not args.images and not args.synthetic:
+        parser.error("give an image directory or --synthetic N")
+
+    xray_serving.configure_threads(args.threads, 1)
+    tensors = load_images(args.images, args.synthetic)
+    torch.manual_seed(0)
+    eager = xray_serving.build_model(None if args.random_weights else xray_serving.WEIGHTS_PATH)
+
+    reference = None
+    print(f"{len(tensors)} images, {torch.get_num_threads()} threads")
+    print(f"{'mode':<14} {'ch_last':>7} {'first ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'top-1 agree':>12}")
+    for mode, channels_last in VARIANTS:
+        try:
+            model = xray_serving.optimize(eager, mode, channels_last)
+        except Exception as e:
+            print(f"{mode:<14} {str(channels_last):>7}  unavailable: {e}")
+            continue
+        memory_format = torch.channels_last if channels_last else torch.contiguous_format
+        timings, predictions = [], []
+        with torch.inference_mode():
+            for tensor in tensors:
+                tensor = tensor.contiguous(memory_format=memory_format)
+                start = time.perf_counter()
+                predictions.append(int(model(tensor).argmax(1)))
+                timings.append(time.perf_counter() - start)
+        first, steady = timings[0] * 1e3, np.array(timings[1:] or timings) * 1e3
+        if reference is None:
+            reference = predictions
+        agree = np.mean(np.array(predictions) == np.array(reference)) * 100
+        print(f"{mode:<14} {str(channels_last):>7} {first:>9.1f} {np.percentile(steady, 50):>8.1f} "
+              f"{np.percentile(steady, 95):>8.1f} {agree:>11.1f}%")
+        eager = eager.to(memory_format=torch.contiguous_format)
+
+
+if __name__ == "__main__":
+    main()
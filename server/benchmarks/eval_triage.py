@@ -0,0 +1,107 @@
+"""Agreement of the local triage fast path with the LLM, and the traffic it offloads.
+
+Each query in the labels file carries the specialty the LLM recommends for
+it (the first condition's recommended_specialist). The shipped labels were
+written by hand to match the model's typical answers; --relabel replaces
+them with live answers from the lean prompt (needs GROQ_API_KEY and
+network access). Reports the share of queries answered locally, agreement
+with the labels on those queries, the fallback reasons, classification
+latency and a sweep over TRIAGE_THRESHOLD.
+
+Run from server/:
+    python -m benchmarks.eval_triage
+    python -m benchmarks.eval_triage --relabel --show
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+import triage
+from doctors import specialty_key
+
+LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "triage_queries.jsonl")
+THRESHOLDS = [0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.7]
+
+
+def load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def relabel(rows, path):
+    import llm
+    import medical_prompt
+
+    for row in rows:
+        answer = llm.client.complete_json_sync(medical_prompt.lean_messages(row["query"]), temperature=0)
+        conditions = answer.get("possible_conditions") or [{}]
+        row["specialty"] = conditions[0].get("recommended_specialist", "General Practice")
+        row["label_source"] = "llm"
+    with open(path, "w") as f:
+        f.writelines(json.dumps(row) + "\n" for row in rows)
+
+
+def evaluate(rows):
+    """(offloaded, agreed, fallback reasons, per-row decisions)"""
+    offloaded = agreed = 0
+    reasons = Counter()
+    decisions = []
+    for row in rows:
+        index, confidence, reason = triage.model.classify(row["query"])
+        predicted = triage.model.specialties[index] if index is not None else None
+        if reason is None:
+            offloaded += 1
+            agreed += specialty_key(predicted) == specialty_key(row["specialty"])
+        else:
+            reasons[reason] += 1
+        decisions.append((row, predicted, confidence, reason))
+    return offloaded, agreed, reasons, decisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--labels", default=LABELS)
+    parser.add_argument("--relabel", action="store_true", help="label the queries with the live LLM first")
+    parser.add_argument("--show", action="store_true", help="print the decision for every query")
+    args = parser.parse_args()
+
+    rows = load(args.labels)
+    if args.relabel:
+        relabel(rows, args.labels)
+
+    offloaded, agreed, reasons, decisions = evaluate(rows)
+    if args.show:
+        for row, predicted, confidence, reason in decisions:
+            mark = "local" if reason is None else reason
+            print(f"{mark:<15} {confidence:5.2f} {str(predicted):<17} {row['specialty']:<17} {row['query']}")
+        print()
+
+    timings = []
+    for row in rows * 20:
+        start = time.perf_counter()
+        triage.model.classify(row["query"])
+        timings.append(time.perf_counter() - start)
+    ms = np.array(timings) * 1e3
+
+    print(f"{len(rows)} queries, threshold {triage.THRESHOLD}, margin {triage.MARGIN}")
+    print(f"offloaded: {offloaded} ({offloaded / len(rows):.0%} of traffic)")
+    print(f"agreement with the LLM on offloaded queries: {agreed}/{offloaded} "
+          f"({agreed / offloaded if offloaded else 0:.0%})")
+    print(f"fallbacks: {dict(reasons)}")
+    print(f"classify latency: p50 {np.percentile(ms, 50):.3f} ms, p99 {np.percentile(ms, 99):.3f} ms")
+
+    print(f"\n{'threshold':>9} {'offload':>8} {'agreement':>10}")
+    default = triage.THRESHOLD
+    for threshold in THRESHOLDS:
+        triage.THRESHOLD = threshold
+        offloaded, agreed, _, _ = evaluate(rows)
+        print(f"{threshold:>9.2f} {offloaded / len(rows):>8.0%} {agreed / offloaded if offloaded else 0:>10.0%}")
+    triage.THRESHOLD = default
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Offline load test of every endpoint, with JSON results and baseline comparison.
+
+Each endpoint is served over a real socket (werkzeug for the Flask apps,
+uvicorn for chatbot/app.py) and driven by concurrent clients with
+synthetic inputs:
+
+    genome    gene.py /api/analyze-genome   23andMe-style files of --genome-lines rows
+    skin      skin.py /api/predict          JPEGs at each of --image-sizes
+    xray      xray.py /api/predict          JPEGs at each of --image-sizes
+    chat      chatbot.py /api/chat          symptom queries
+    analyze   chatbot/app.py /analyze       symptom queries
+
+A local stub stands in for the Groq API (--llm-delay, --llm-token-delay),
+and the prediction, result and response caches and the triage fast path
+are turned off, so every request does the full work. Inputs are generated
+from fixed seeds.
+
+Every (endpoint, case) runs in its own process, so its peak RSS can be
+reported; the process then runs each --concurrency level in turn
+(after --warmup requests) and reports throughput, p50/p95/p99 latency,
+errors and peak RSS. Results go to --out as JSON. With --baseline (a
+previous --out file) every metric is compared against it, and the exit
+status is 1 if any got worse by more than --tolerance.
+Endpoints that can't start here (e.g. no TensorFlow or model weights)
+are reported with their error instead.
+
+Run from server/:
+    python -m benchmarks.load_suite --out results.json
+    python -m benchmarks.load_suite --endpoints genome chat --concurrency 1 8 32 --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = ("genome", "skin", "xray", "chat", "analyze")
+QUERIES = [
+    "throbbing headache with blurred vision and nausea for two days",
+    "persistent dry cough, mild fever and tiredness since last week",
+    "sharp pain in the lower right abdomen that gets worse when walking",
+    "itchy red patches on both elbows with flaking skin",
+    "shortness of breath when climbing stairs and swollen ankles",
+    "burning sensation when urinating and lower back pain",
+    "dizziness when standing up quickly and ringing in the ears",
+    "joint stiffness in the morning in both hands and wrists",
+]
+# (metric, True if higher is better) compared against the baseline.
+COMPARED = (("throughput_rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False),
+            ("peak_rss_mb", False))
+
+
+def cases(args):
+    """(endpoint, case) pairs to run."""
+    for endpoint in args.endpoints:
+        if endpoint == "genome":
+            yield from ((endpoint, f"{lines}") for lines in args.genome_lines)
+        elif endpoint in ("skin", "xray"):
+            yield from ((endpoint, size) for size in args.image_sizes)
+        else:
+            yield endpoint, "queries"
+
+
+def genome_file(lines):
+    from benchmarks.bench_genome_reader import write_synthetic_genome
+
+    with open("snp_annotations.jsonl") as f:
+        known = [json.loads(line)["rsid"] for line in f if line.strip()]
+    path = os.path.join(tempfile.mkdtemp(), "genome.txt")
+    write_synthetic_genome(path, lines, known_rsids=known)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def image_file(size):
+    from benchmarks.bench_imageprep import make_jpeg
+
+    width, height = map(int, size.split("x"))
+    return make_jpeg(width, height)
+
+
+def serve(endpoint, args):
+    """request(client, i) for an endpoint; imports and serves its app first."""
+    from benchmarks.bench_streaming import serve_asgi, serve_wsgi
+
+    if endpoint == "genome":
+        import gene
+
+        data = genome_file(int(args.case))
+        url = serve_wsgi(gene.app)
+        return lambda client, i: client.post(f"{url}/api/analyze-genome", files={"file": ("genome.txt", data)})
+    if endpoint in ("skin", "xray"):
+        import importlib
+
+        app = importlib.import_module(endpoint).app
+        data = image_file(args.case)
+        url = serve_wsgi(app)
+        return lambda client, i: client.post(f"{url}/api/predict", files={"file": ("image.jpg", data, "image/jpeg")})
+
+    from benchmarks.bench_llm_client import start_stub
+
+    os.environ["GROQ_BASE_URL"] = start_stub(args.llm_delay, args.llm_token_delay)
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    if endpoint == "chat":
+        import chatbot
+
+        url = serve_wsgi(chatbot.app)
+        return lambda client, i: client.post(f"{url}/api/chat", json={"query": QUERIES[i % len(QUERIES)]})
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "chatbot"))
+    import app as chatbot_app
+
+    url = serve_asgi(chatbot_app.app)
+    return lambda client, i: client.post(f"{url}/analyze", json={"symptoms": QUERIES[i % len(QUERIES)]})
+
+
+def drive(request, total, concurrency):
+    """Latencies (s) of the successful requests, error count and wall time."""
+    import httpx
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            ok = request(client, i).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    with httpx.Client(timeout=300, limits=limits) as client, ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(one, range(total)))
+        wall = time.perf_counter() - start
+    return [seconds for seconds, ok in results if ok], sum(not ok for _, ok in results), wall
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)  # bytes on macOS, KiB on Linux
+
+
+def worker(args):
+    """Run one (endpoint, case) in this process and print its rows as JSON."""
+    import numpy as np
+
+    # Every request does the full work: no result caches, no local triage.
+    for prefix in ("SKIN", "XRAY", "GENOME"):
+        os.environ[f"{prefix}_CACHE_BYTES"] = "0"
+    os.environ["CHATBOT_CACHE_TTL"] = "0"
+    os.environ["TRIAGE_ENABLED"] = "0"
+    os.environ.setdefault("ROUTER_LOG", os.devnull)
+
+    request = serve(args.worker, args)
+    rows = []
+    for concurrency in args.concurrency:
+        drive(request, args.warmup, 1)
+        latencies, errors, wall = drive(request, args.requests, concurrency)
+        ms = np.percentile(latencies, [50, 95, 99]) * 1e3 if latencies else [None] * 3
+        rows.append({
+            "endpoint": args.worker,
+            "case": args.case,
+            "concurrency": concurrency,
+            "requests": args.requests,
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / wall, 2),
+            "p50_ms": round(float(ms[0]), 1) if latencies else None,
+            "p95_ms": round(float(ms[1]), 1) if latencies else None,
+            "p99_ms": round(float(ms[2]), 1) if latencies else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        })
+    print(json.dumps(rows))
+
+
+def run_case(endpoint, case, args):
+    command = [sys.executable, "-m", "benchmarks.load_suite", "--worker", endpoint, "--case", case,
+               "--requests", str(args.requests), "--warmup", str(args.warmup),
+               "--llm-delay", str(args.llm_delay), "--llm-token-delay", str(args.llm_token_delay),
+               "--concurrency", *map(str, args.concurrency)]
+    done = subprocess.run(command, capture_output=True, text=True)
+    lines = done.stdout.strip().splitlines()
+    if done.returncode == 0 and lines:
+        return json.loads(lines[-1])
+    error = (done.stderr.strip().splitlines() or ["no output"])[-1]
+    return [{"endpoint": endpoint, "case": case, "error": error}]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, results_args, baseline, tolerance):
+    """Print each row against the baseline; return the number of regressions."""
+    previous = {(r["endpoint"], r["case"], r.get("concurrency")): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nagainst baseline {baseline['meta'].get('commit') or ''} (tolerance {tolerance:.0%})")
+    old_args = baseline["meta"].get("args", {})
+    new_args = results_args
+    # Rows are matched by case and concurrency; these settings change every row.
+    for name in ("requests", "warmup", "llm_delay", "llm_token_delay"):
+        if name in old_args and old_args[name] != new_args[name]:
+            print(f"note: the baseline ran with {name}={old_args[name]}, this run with {new_args[name]}")
+    for row in results:
+        old = previous.get((row["endpoint"], row["case"], row.get("concurrency")))
+        if old is None or "error" in row or "error" in old:
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED:
+            if not old.get(metric) or row.get(metric) is None:
+                continue
+            change = row[metric] / old[metric] - 1
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = " REGRESSION"
+                regressions += 1
+            changes.append(f"{metric} {old[metric]:g} -> {row[metric]:g} ({change:+.0%}){flag}")
+        print(f"{row['endpoint']:<8} {row['case']:<10} c={row['concurrency']:<3} " + "; ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=32, help="requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured requests before each level")
+    parser.add_argument("--genome-lines", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--image-sizes", nargs="+", default=["224x224", "1024x768", "3000x2000"])
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="stub LLM latency (s)")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0, help="stub LLM delay per output token (s)")
+    parser.add_argument("--out", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change that counts as a regression")
+    parser.add_argument("--worker", choices=ENDPOINTS, help=argparse.SUPPRESS)
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    results = []
+    print(f"{'endpoint':<8} {'case':<10} {'conc':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>6} {'RSS MB':>7}")
+    for endpoint, case in cases(args):
+        for row in run_case(endpoint, case, args):
+            results.append(row)
+            if "error" in row:
+                print(f"{endpoint:<8} {case:<10} failed: {row['error']}")
+                continue
+            cells = [f"{row[k]:>8}" if row[k] is not None else f"{'-':>8}" for k in ("p50_ms", "p95_ms", "p99_ms")]
+            print(f"{endpoint:<8} {case:<10} {row['concurrency']:>4} {row['throughput_rps']:>8} {' '.join(cells)} "
+                  f"{row['errors']:>6} {row['peak_rss_mb']:>7}")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("worker", "case", "out", "baseline")},
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"results written to {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, report["meta"]["args"], baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Summarize the model router's decision log to tune ROUTER_THRESHOLD.
+
+Reads the JSON lines router.py writes to ROUTER_LOG and reports, per
+complexity-score bucket, how many queries went to each model, how often
+the small model's answer was invalid and had to be escalated, and the
+latency of each model. A sweep then shows, for candidate thresholds, the
+share of queries the small model would get and the escalation rate it had
+on the logged queries below that threshold.
+
+Run from server/ (after serving traffic with ROUTER_LOG=router.jsonl):
+    python -m benchmarks.tune_router router.jsonl
+"""
+import argparse
+import json
+from collections import defaultdict
+
+import numpy as np
+
+import router
+
+BUCKETS = [0, 0.5, 1, 1.5, 2, 3, 4, float("inf")]
+THRESHOLDS = [0.5, 1, 1.5, 2, 2.5, 3, 4]
+
+
+def load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", nargs="?", default=router.LOG_PATH)
+    args = parser.parse_args()
+    if not args.log:
+        parser.error("no log given and ROUTER_LOG is not set")
+
+    rows = load(args.log)
+    print(f"{len(rows)} routed queries")
+    print(f"{'score':>10} {'queries':>8} {'small':>6} {'escalated':>10} {'small p50 ms':>13} {'large p50 ms':>13}")
+    for low, high in zip(BUCKETS, BUCKETS[1:]):
+        bucket = [r for r in rows if low <= r["score"] < high]
+        if not bucket:
+            continue
+        small = [r for r in bucket if r["attempts"] and r["attempts"][0]["model"] == router.SMALL_MODEL]
+        escalated = sum(len(r["attempts"]) > 1 for r in small)
+        latency = defaultdict(list)
+        for r in bucket:
+            for a in r["attempts"]:
+                latency[a["model"]].append(a["ms"])
+        p50 = {m: f"{np.median(v):.0f}" for m, v in latency.items()}
+        print(f"{f'{low:g}-{high:g}':>10} {len(bucket):>8} {len(small):>6} "
+              f"{escalated / len(small) if small else 0:>10.0%} "
+              f"{p50.get(router.SMALL_MODEL, '-'):>13} {p50.get(router.LARGE_MODEL, '-'):>13}")
+
+    print(f"\n{'threshold':>9} {'to small':>9} {'escalation':>11}")
+    for threshold in THRESHOLDS:
+        below = [r for r in rows if r["score"] < threshold and not r.get("red_flags")]
+        tried = [r for r in below if r["attempts"] and r["attempts"][0]["model"] == router.SMALL_MODEL]
+        escalated = sum(len(r["attempts"]) > 1 for r in tried)
+        rate = f"{escalated / len(tried):.0%}" if tried else "-"
+        print(f"{threshold:>9g} {len(below) / len(rows) if rows else 0:>9.0%} {rate:>11}")
+
+
+if __name__ == "__main__":
+    main()
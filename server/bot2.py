@@ -1,28 +1,20 @@
 from flask import Flask, request, render_template, jsonify
-from groq import Groq
 import json
 import os
+import analysis_cache
+import medical_prompt
+import metrics
+import resilience
+import router
+import triage
+from doctors import DOCTORS_DATABASE
 
 app = Flask(__name__)
-os.environ["GROQ_API_KEY"] = "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"
-client = Groq()
+metrics.instrument(app, "bot2")  # per-stage timings and GET /metrics
 
-DOCTORS_DATABASE = [
-    {"name": "Dr. Alice Johnson", "specialization": "Cardiology", "experience": "15 years", "contact": "555-0123"},
-    {"name": "Dr. Robert Smith", "specialization": "Neurology", "experience": "12 years", "contact": "555-0124"},
-    {"name": "Dr. Emily Chen", "specialization": "Dermatology", "experience": "10 years", "contact": "555-0125"},
-    {"name": "Dr. Michael Rodriguez", "specialization": "Orthopedics", "experience": "20 years", "contact": "555-0126"},
-    {"name": "Dr. Sarah Williams", "specialization": "Gastroenterology", "experience": "8 years", "contact": "555-0127"},
-    {"name": "Dr. James Wilson", "specialization": "Pulmonology", "experience": "14 years", "contact": "555-0128"},
-    {"name": "Dr. Lisa Brown", "specialization": "Endocrinology", "experience": "11 years", "contact": "555-0129"},
-    {"name": "Dr. Mark Davis", "specialization": "Psychiatry", "experience": "9 years", "contact": "555-0130"},
-    {"name": "Dr. Nancy Lee", "specialization": "Ophthalmology", "experience": "16 years", "contact": "555-0131"},
-    {"name": "Dr. Thomas Martin", "specialization": "ENT", "experience": "13 years", "contact": "555-0132"},
-    {"name": "Dr. Jennifer Garcia", "specialization": "General Practice", "experience": "8 years", "contact": "555-0133"},
-]
 
-def generate_medical_response(symptoms, doctors_data):
-    """Use Groq API to analyze symptoms and recommend doctors"""
+def full_prompt_messages(symptoms, doctors_data):
+    """The original prompt: the whole doctor directory is embedded and copied back by the model."""
     
     system_prompt = f"""
     You are a medical assistant chatbot designed to provide preliminary analysis of symptoms.
@@ -62,22 +54,36 @@ def generate_medical_response(symptoms, doctors_data):
     }}
     """
     user_message = f"Analyze these symptoms: {symptoms}"
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+def generate_medical_response(symptoms, doctors_data):
+    """Use Groq API to analyze symptoms and recommend doctors"""
+    if medical_prompt.MODE == "lean":
+        # Constant-size prompt; doctors are attached from the directory afterwards.
+        messages = medical_prompt.lean_messages(f"Analyze these symptoms: {symptoms}")
+    else:
+        messages = full_prompt_messages(symptoms, doctors_data)
     
+    deadline = resilience.Deadline()
+
+    async def compute():
+        # Small or large model by complexity, escalating on invalid output (see router.py).
+        return await router.analyze(symptoms, messages, max_tokens=1024, deadline=deadline)
+
     try:
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.2,  # Lower temperature for more reliable medical information
-            max_completion_tokens=1024,
-            response_format={"type": "json_object"}
-        )
-        
-        result = json.loads(response.choices[0].message.content)
-        return result
+        # Clear single-complaint queries are answered locally (see triage.py).
+        fast = triage.answer(symptoms)
+        if fast is not None:
+            return fast
+        return analysis_cache.cached_sync(symptoms, compute, deadline)
     
+    except resilience.Unavailable:
+        # The API is down or too slow for this request's budget: a limited
+        # local answer instead of an error (see resilience.py).
+        return resilience.degraded_answer(symptoms)
     except Exception as e:
         return {
             "error": f"An error occurred: {str(e)}",
@@ -166,5 +172,9 @@ def analyze():
         result = generate_medical_response(symptoms, DOCTORS_DATABASE)
         return jsonify(result)
 
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(analysis_cache.stats())
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,299 @@
+"""Small thread-safe caches shared by the services."""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by total size and/or entry count.
+
+    sizeof: callable returning the size charged for a value (defaults to 1,
+            which makes max_bytes a plain entry limit).
+    ttl: seconds an entry stays valid after put() (default: no expiry).
+    """
+
+    def __init__(self, max_bytes=None, max_entries=None, sizeof=None, ttl=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof or (lambda value: 1)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.current_bytes = 0
+        self._data = OrderedDict()  # key -> (value, size, expires at or None)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[2] is not None and item[2] <= time.monotonic():
+                del self._data[key]
+                self.current_bytes -= item[1]
+                self.expirations += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if self.max_bytes is not None and size > self.max_bytes:
+                return False  # would evict everything and still not fit
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._data[key] = (value, size, time.monotonic() + self.ttl if self.ttl else None)
+            self.current_bytes += size
+            while self._data and (
+                (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+                or (self.max_entries is not None and len(self._data) > self.max_entries)
+            ):
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self.current_bytes -= evicted
+                self.evictions += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SingleFlight:
+    """Lets concurrent callers asking for the same key share one computation.
+
+    The first caller of join(key) is the leader: it does the work and must
+    call done(). Later callers get the same Future and wait on it
+    (asyncio.wrap_future() for coroutines).
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def join(self, key):
+        """Returns (future, is_leader)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def done(self, key, result=None, error=None):
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class DiskCache:
+    """JSON values stored one file per key under `directory`.
+
+    Survives restarts and can be shared by several processes. Reads refresh a
+    file's mtime. Puts keep a running byte total, and only when it passes
+    max_bytes is the directory walked and the least recently used files
+    deleted, down to 90% of max_bytes so the next puts don't walk again.
+    """
+
+    LOW_WATER = 0.9
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.current_bytes = sum(size for _, size, _ in self._files())
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, name[:2], name[2:] + ".json")
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime_ns
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = json.loads(f.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return default
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        data = json.dumps(value).encode()
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            return False
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)
+        with self._lock:
+            self.current_bytes += len(data) - replaced
+            if self.max_bytes is not None and self.current_bytes > self.max_bytes:
+                self._evict()
+        return True
+
+    def _evict(self):
+        # Other processes may share the directory, so recount from disk.
+        files = sorted(self._files(), key=lambda item: item[2])
+        self.current_bytes = sum(size for _, size, _ in files)
+        target = self.max_bytes * self.LOW_WATER
+        for path, size, _ in files:
+            if self.current_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._files()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class TieredCache:
+    """An LRUCache in front of an optional DiskCache; disk hits are promoted."""
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value)
+        return default if value is None else value
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        lookups = stats["memory"]["hits"] + stats["memory"]["misses"]
+        hits = stats["memory"]["hits"] + stats.get("disk", {}).get("hits", 0)
+        stats["hits"] = hits
+        stats["misses"] = lookups - hits
+        stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+def file_version(path, chunk_size=1024 * 1024):
+    """sha256 of a file's contents, or of every file under a directory.
+
+    Used as the model version in prediction cache keys, so replacing a model
+    file invalidates its cached predictions.
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        paths = [path]
+    for p in paths:
+        digest.update(os.path.relpath(p, path).encode() if p != path else b"")
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tiered_from_env(prefix, memory_bytes=8 * 1024 * 1024, disk_bytes=256 * 1024 * 1024):
+    """TieredCache of JSON-able values configured from the environment.
+
+    <prefix>_CACHE_BYTES bounds the in-process tier; setting <prefix>_CACHE_DIR
+    adds a disk tier there, bounded by <prefix>_CACHE_DISK_BYTES.
+    """
+    memory = LRUCache(
+        max_bytes=int(os.environ.get(f"{prefix}_CACHE_BYTES", memory_bytes)),
+        sizeof=lambda value: len(json.dumps(value)),
+    )
+    directory = os.environ.get(f"{prefix}_CACHE_DIR")
+    disk = None
+    if directory:
+        disk = DiskCache(directory, max_bytes=int(os.environ.get(f"{prefix}_CACHE_DISK_BYTES", disk_bytes)))
+    return TieredCache(memory, disk)
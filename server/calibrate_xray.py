@@ -0,0 +1,65 @@
+"""Build the int8 statically quantized X-ray model used by XRAY_MODE=int8_static.
+
+Calibrates activation ranges on a directory of representative X-ray images
+(FX graph mode, x86 backend), then saves a frozen TorchScript model.
+
+Usage (from server/):
+    python calibrate_xray.py calibration_images/ [--limit 200] [--out resnet_knee_model_int8.pt]
+"""
+import argparse
+import os
+
+import torch
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+import imageprep
+import xray_serving
+from xray_serving import transform
+
+
+def calibration_batches(directory, limit, batch_size=8):
+    names = sorted(os.listdir(directory))[:limit]
+    batch = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), "rb") as f:
+                batch.append(transform(imageprep.open_image(f.read())))
+        except (OSError, imageprep.ImageRejected):
+            continue
+        if len(batch) == batch_size:
+            yield torch.stack(batch)
+            batch = []
+    if batch:
+        yield torch.stack(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate and save the int8 X-ray model.")
+    parser.add_argument("images", help="directory of calibration images")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--out", default=xray_serving.INT8_PATH)
+    args = parser.parse_args()
+
+    torch.backends.quantized.engine = "x86"
+    model = xray_serving.build_model()
+    example = torch.randn(xray_serving.INPUT_SHAPE)
+    prepared = prepare_fx(model, get_default_qconfig_mapping("x86"), (example,))
+
+    seen = 0
+    with torch.inference_mode():
+        for batch in calibration_batches(args.images, args.limit):
+            prepared(batch)
+            seen += len(batch)
+    if not seen:
+        raise SystemExit(f"no readable images in {args.images}")
+
+    quantized = convert_fx(prepared)
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(quantized, example).eval())
+    torch.jit.save(scripted, args.out)
+    print(f"calibrated on {seen} images, wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
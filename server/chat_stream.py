@@ -0,0 +1,234 @@
+"""Server-Sent Events for streamed symptom analyses.
+
+The model's JSON answer is forwarded token by token, and an incremental
+parser picks out each possible_conditions entry and the advice fields as
+soon as they are complete, so the page can show the first condition long
+before the whole answer has been generated. Events, in order:
+
+    token       {"text": ...}                 raw model output as it arrives
+    condition   {...}                         one complete possible_conditions entry
+    field       {"name": ..., "value": ...}   a completed top-level field (general_advice, disclaimer)
+    retry       {"reason": ...}               discard what was received: the small model's answer was
+                                              invalid and the large model answers (router.py), or the
+                                              API failed and a degraded answer follows (resilience.py)
+    doctors     [...]                         recommended_doctors
+    done        {...}                         the whole answer, as the non-streaming endpoint returns it
+    error       {"error": ...}
+
+A local triage answer (triage.py) or a cached one (analysis_cache) is sent
+without token events. With a conversation (sessions.py), a session event
+{"session_id": ...} comes first and follow-ups always go to the model.
+"""
+import json
+import time
+
+import analysis_cache
+import llm
+import metrics
+import resilience
+import router
+import sessions
+import triage
+
+
+class JSONStreamParser:
+    """Incremental parser for one JSON object that arrives in pieces.
+
+    feed(text) returns the events completed by that piece:
+        ("item", key, value)   an element of a top-level array
+        ("field", key, value)  any other top-level value
+    Text before the object's opening brace (e.g. a ```json fence) and after
+    its closing brace is ignored; result() parses the whole object.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._text = ""
+        self._start = None  # index of the object's "{"
+        self._end = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start = None
+        self._key = None
+        self._expect_value = False
+        self._value_start = None
+        self._array = False
+        self._expect_item = False
+        self._item_start = None
+
+    @property
+    def started(self):
+        """Whether any text has been fed (and so events may have gone out)."""
+        return bool(self._text)
+
+    def feed(self, text):
+        events = []
+        begin = len(self._text)
+        self._text += text
+        buf = self._text
+        for i in range(begin, len(buf)):
+            if self.done:
+                break
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+            if c.isspace() or (self._depth == 0 and c != "{"):
+                continue
+
+            if self._depth == 1 and self._expect_value:
+                self._value_start, self._array, self._expect_value = i, c == "[", False
+            elif self._depth == 2 and self._expect_item and c != "]":
+                self._item_start, self._expect_item = i, False
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = i
+            elif c in "{[":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+                if self._depth == 2 and self._array:
+                    self._expect_item = True
+            elif c in "}]":
+                if self._depth == 2 and self._array:
+                    self._end_item(i, events)
+                elif self._depth == 1:
+                    self._end_value(i, events)
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end = i + 1
+                    self.done = True
+            elif c == ":" and self._depth == 1:
+                self._expect_value = True
+            elif c == ",":
+                if self._depth == 1:
+                    self._end_value(i, events)
+                elif self._depth == 2 and self._array:
+                    self._end_item(i, events)
+                    self._expect_item = True
+        return events
+
+    def _end_item(self, i, events):
+        if self._item_start is not None:
+            events.append(("item", self._key, json.loads(self._text[self._item_start:i])))
+            self._item_start = None
+
+    def _end_value(self, i, events):
+        if self._value_start is not None and not self._array:
+            events.append(("field", self._key, json.loads(self._text[self._value_start:i])))
+        self._value_start = None
+        self._array = False
+        self._expect_item = False
+
+    def result(self):
+        if not self.done:
+            raise ValueError("incomplete JSON object in model output")
+        return json.loads(self._text[self._start:self._end])
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def answer_events(answer):
+    """The structured events for a complete answer."""
+    for condition in answer.get("possible_conditions", []):
+        yield sse("condition", condition)
+    for name in ("general_advice", "disclaimer"):
+        if name in answer:
+            yield sse("field", {"name": name, "value": answer[name]})
+    yield sse("doctors", answer.get("recommended_doctors", []))
+    yield sse("done", answer)
+
+
+async def analysis_events(text, messages, max_tokens=None, session=None):
+    """SSE frames for the analysis of `text`, streamed from the model with `messages`.
+
+    With a sessions.Session the conversation so far is added to the prompt
+    and the answer is recorded in it.
+    """
+    ready = None
+    # Follow-ups depend on the conversation, so triage and the cache can't answer them.
+    follow_up = session is not None and not session.empty
+    if session is not None:
+        yield sse("session", {"session_id": session.id})
+        messages = session.messages(messages)
+    try:
+        if not follow_up:
+            ready = triage.answer(text) or analysis_cache.lookup(text)
+    except Exception as e:
+        yield sse("error", {"error": f"An error occurred: {str(e)}"})
+        return
+    if ready is not None:
+        if session is not None:
+            sessions.record(session, text, ready)
+        for frame in answer_events(ready):
+            yield frame
+        return
+
+    deadline = resilience.Deadline()
+    decision = router.Decision(text)
+    answer = None
+    try:
+        for model in decision.models:
+            parser = JSONStreamParser()
+            start = time.perf_counter()
+            try:
+                if not resilience.breaker.allow():
+                    raise resilience.CircuitOpen("upstream marked unhealthy; failing fast")
+                try:
+                    async for delta in llm.client.stream_json(messages, model=model, temperature=0.2,
+                                                              max_tokens=max_tokens, timeout=deadline.remaining()):
+                        yield sse("token", {"text": delta})
+                        for kind, key, value in parser.feed(delta):
+                            if kind == "item" and key == "possible_conditions":
+                                yield sse("condition", value)
+                            elif kind == "field" and key in ("general_advice", "disclaimer"):
+                                yield sse("field", {"name": key, "value": value})
+                except Exception as e:
+                    resilience.breaker.record(e)
+                    raise
+                except BaseException:
+                    resilience.breaker.release()
+                    raise
+                resilience.breaker.record()
+                with metrics.stage("json_parse"):
+                    parsed = parser.result()
+                answer = router.validate(parsed)
+            except Exception as e:
+                if decision.attempt(model, time.perf_counter() - start, e):
+                    yield sse("retry", {"reason": str(e)[:200]})
+                    continue
+                if not isinstance(e, (resilience.Unavailable, TimeoutError)):
+                    yield sse("error", {"error": f"An error occurred: {str(e)}"})
+                    return
+                # The API is down or too slow: a limited local answer (see resilience.py).
+                if parser.started:
+                    yield sse("retry", {"reason": str(e)[:200]})
+                answer = resilience.degraded_answer(text)
+                if session is not None:
+                    sessions.record(session, text, answer)
+                for frame in answer_events(answer):
+                    yield frame
+                return
+            decision.attempt(model, time.perf_counter() - start)
+            break
+    finally:
+        decision.log()
+    if not follow_up:
+        analysis_cache.store(text, answer, time.perf_counter() - start)
+    if session is not None:
+        sessions.record(session, text, answer)
+    yield sse("doctors", answer.get("recommended_doctors", []))
+    yield sse("done", answer)
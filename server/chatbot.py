@@ -1,37 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import json
 import os
-from groq import Groq
+import analysis_cache
+import chat_stream
+import llm
+import medical_prompt
+import metrics
+import resilience
+import router
+import sessions
+import triage
+from doctors import DOCTORS_DATABASE
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+metrics.instrument(app, "chatbot")  # per-stage timings and GET /metrics
 
-# Set up the Groq API key and client
-os.environ["GROQ_API_KEY"] = "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"
-client = Groq()
 
-# A static doctors database for chatbot recommendations
-DOCTORS_DATABASE = [
-    {"name": "Dr. Alice Johnson", "specialization": "Cardiology", "experience": "15 years", "contact": "555-0123"},
-    {"name": "Dr. Robert Smith", "specialization": "Neurology", "experience": "12 years", "contact": "555-0124"},
-    {"name": "Dr. Emily Chen", "specialization": "Dermatology", "experience": "10 years", "contact": "555-0125"},
-    {"name": "Dr. Michael Rodriguez", "specialization": "Orthopedics", "experience": "20 years", "contact": "555-0126"},
-    {"name": "Dr. Sarah Williams", "specialization": "Gastroenterology", "experience": "8 years", "contact": "555-0127"},
-    {"name": "Dr. James Wilson", "specialization": "Pulmonology", "experience": "14 years", "contact": "555-0128"},
-    {"name": "Dr. Lisa Brown", "specialization": "Endocrinology", "experience": "11 years", "contact": "555-0129"},
-    {"name": "Dr. Mark Davis", "specialization": "Psychiatry", "experience": "9 years", "contact": "555-0130"},
-    {"name": "Dr. Nancy Lee", "specialization": "Ophthalmology", "experience": "16 years", "contact": "555-0131"},
-    {"name": "Dr. Thomas Martin", "specialization": "ENT", "experience": "13 years", "contact": "555-0132"},
-    {"name": "Dr. Jennifer Garcia", "specialization": "General Practice", "experience": "8 years", "contact": "555-0133"},
-]
-
-def generate_medical_response(query, doctors_data):
-    """
-    Generate a chatbot response based on the user's query.
-    The prompt instructs the Groq API chatbot to return a JSON structure with possible conditions,
-    recommended doctors, general advice, and a disclaimer.
-    """
+def full_prompt_messages(query, doctors_data):
+    """The original prompt: the whole doctor directory is embedded and copied back by the model."""
     system_prompt = f"""
     You are a medical assistant chatbot designed to provide preliminary analysis of health queries.
     
@@ -70,20 +58,48 @@ def generate_medical_response(query, doctors_data):
     }}
     """
     user_message = f"{query}"
-    
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+def analysis_messages(query, doctors_data):
+    if medical_prompt.MODE == "lean":
+        # Constant-size prompt; doctors are attached from the directory afterwards.
+        return medical_prompt.lean_messages(query)
+    return full_prompt_messages(query, doctors_data)
+
+def generate_medical_response(query, doctors_data, session=None):
+    """
+    Generate a chatbot response based on the user's query.
+    The prompt instructs the Groq API chatbot to return a JSON structure with possible conditions,
+    recommended doctors, general advice, and a disclaimer.
+    With a session (see sessions.py) the conversation so far is part of the prompt.
+    """
+    messages = analysis_messages(query, doctors_data)
+    if session is not None:
+        messages = session.messages(messages)
+    deadline = resilience.Deadline()
+
+    async def compute():
+        # Small or large model by complexity, escalating on invalid output (see router.py).
+        return await router.analyze(query, messages, deadline=deadline)
+
     try:
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.2,
-            # Removed max_completion_tokens argument
-            response_format={"type": "json_object"}
-        )
-        result = json.loads(response.choices[0].message.content)
-        return result
+        if session is not None and not session.empty:
+            # Follow-ups depend on the conversation, so triage and the cache can't answer them.
+            return llm.client.run_sync(compute())
+        # Clear single-complaint queries are answered locally (see triage.py).
+        fast = triage.answer(query)
+        if fast is not None:
+            return fast
+        # Equivalent queries share one answer (see analysis_cache.py); the call
+        # runs on the shared pooled client and blocks only this request's thread.
+        return analysis_cache.cached_sync(query, compute, deadline)
+    except resilience.Unavailable:
+        # The API is down or too slow for this request's budget: a limited
+        # local answer instead of an error (see resilience.py).
+        return resilience.degraded_answer(query)
     except Exception as e:
         return {
             "error": f"An error occurred: {str(e)}",
@@ -100,9 +116,34 @@ def chat():
     if not data or "query" not in data:
         return jsonify({"error": "No query provided"}), 400
     user_query = data["query"]
-    result = generate_medical_response(user_query, DOCTORS_DATABASE)
+    # Multi-turn: the client sends back the session_id of the previous answer.
+    session = sessions.open_session(data.get("session_id"))
+    result = generate_medical_response(user_query, DOCTORS_DATABASE, session)
+    sessions.record(session, user_query, result)
+    result["session_id"] = session.id
     return jsonify(result)
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream_events():
+    """/api/chat as Server-Sent Events (see chat_stream.py for the events)."""
+    data = request.get_json()
+    if not data or "query" not in data:
+        return jsonify({"error": "No query provided"}), 400
+    user_query = data["query"]
+    session = sessions.open_session(data.get("session_id"))
+    events = chat_stream.analysis_events(user_query, analysis_messages(user_query, DOCTORS_DATABASE),
+                                         session=session)
+    return Response(llm.client.iterate_sync(events), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(analysis_cache.stats())
+
+@app.route('/api/session-stats', methods=['GET'])
+def session_stats():
+    return jsonify(sessions.stats())
+
 if __name__ == '__main__':
     # Run on port 5003 (or set a PORT environment variable)
     port = int(os.environ.get("PORT", 5003))
@@ -0,0 +1,151 @@
+"""Export the skin classifier to the faster backends in skin_backends.py and
+check them against the original Keras model.
+
+Usage (from server/):
+    python convert_skin_model.py --samples sample_images/
+    python convert_skin_model.py --samples sample_images/ --skip-export   # re-run the checks
+
+Writes into SKIN_CONVERTED_DIR (default skin_models/):
+    saved_model/             tf.function serving signature
+    skin_model_fp16.tflite   float16 weights
+    skin_model_int8.tflite   int8 post-training quantization, calibrated on --samples
+    skin_model.onnx          ONNX (needs tf2onnx)
+
+Then every backend is loaded in a fresh process and run over the sample set,
+and a table with top-1 agreement against Keras, max probability difference,
+latency at batch 1 and batch 8, load time and peak RSS is printed.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+import imageprep
+import skin_backends
+
+INPUT_SIZE = (180, 180)
+
+
+def load_samples(directory, limit=None):
+    """Preprocess sample images exactly as skin.py does, as one float32 array."""
+    images = []
+    for name in sorted(os.listdir(directory))[:limit]:
+        try:
+            with open(os.path.join(directory, name), "rb") as f:
+                pixels = imageprep.decode_rgb(imageprep.open_image(f.read()), INPUT_SIZE)
+        except (OSError, imageprep.ImageRejected):
+            continue
+        images.append(imageprep.scale_to_unit(pixels))
+    if not images:
+        raise SystemExit(f"no readable images in {directory}")
+    return np.stack(images)
+
+
+def export_all(model_path, out_dir, samples):
+    import tensorflow as tf
+
+    os.makedirs(out_dir, exist_ok=True)
+    model = tf.keras.models.load_model(model_path)
+    spec = tf.TensorSpec([None, *INPUT_SIZE, 3], tf.float32, name="image")
+
+    serve = tf.function(lambda image: {"probabilities": model(image, training=False)}, input_signature=[spec])
+    module = tf.Module()
+    module.model = model
+    module.serve = serve
+    tf.saved_model.save(module, os.path.join(out_dir, "saved_model"), signatures={"serving_default": serve})
+    print("exported saved_model/")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    with open(os.path.join(out_dir, "skin_model_fp16.tflite"), "wb") as f:
+        f.write(converter.convert())
+    print("exported skin_model_fp16.tflite")
+
+    def representative_dataset():
+        for image in samples[:200]:
+            yield [image[None]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    # Inputs and outputs stay float32 so the backend interface is unchanged.
+    with open(os.path.join(out_dir, "skin_model_int8.tflite"), "wb") as f:
+        f.write(converter.convert())
+    print("exported skin_model_int8.tflite")
+
+    try:
+        import tf2onnx
+    except ImportError:
+        print("tf2onnx not installed; skipping skin_model.onnx", file=sys.stderr)
+        return
+    tf2onnx.convert.from_keras(model, input_signature=[spec], opset=13,
+                               output_path=os.path.join(out_dir, "skin_model.onnx"))
+    print("exported skin_model.onnx")
+
+
+def evaluate(name, samples, repeats):
+    """Runs in a fresh process so load time and peak RSS belong to one backend."""
+    start = time.perf_counter()
+    backend = skin_backends.load_backend(name)
+    load_s = time.perf_counter() - start
+
+    predictions = np.concatenate([backend.predict(samples[i:i + 8]) for i in range(0, len(samples), 8)])
+    latency = {}
+    for batch_size in (1, 8):
+        batch = np.resize(samples, (batch_size, *samples.shape[1:]))
+        backend.predict(batch)  # warm up, and settle any input resize
+        timings = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            backend.predict(batch)
+            timings.append(time.perf_counter() - t)
+        latency[batch_size] = float(np.median(timings))
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+    return {"predictions": predictions, "load_s": load_s, "latency": latency, "peak_rss": peak_rss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and compare skin classifier backends.")
+    parser.add_argument("--model", default=skin_backends.MODEL_PATH)
+    parser.add_argument("--samples", required=True, help="directory of sample images for calibration and parity")
+    parser.add_argument("--limit", type=int, help="use at most this many sample images")
+    parser.add_argument("--skip-export", action="store_true")
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--backends", nargs="+", default=list(skin_backends.BACKENDS))
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples, args.limit)
+    if not args.skip_export:
+        export_all(args.model, skin_backends.CONVERTED_DIR, samples)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for name in args.backends:
+        with ctx.Pool(1) as pool:
+            try:
+                results[name] = pool.apply(evaluate, (name, samples, args.repeats))
+            except Exception as e:
+                print(f"{name}: unavailable ({e})", file=sys.stderr)
+
+    reference = results.get("keras")
+    print(f"\n{len(samples)} sample images")
+    print(f"{'backend':<12} {'top-1 agree':>11} {'max |dp|':>9} {'b1 ms':>7} {'b8 ms':>7} {'load s':>7} {'peak RSS MiB':>13}")
+    for name, r in results.items():
+        if reference is not None:
+            agree = np.mean(r["predictions"].argmax(1) == reference["predictions"].argmax(1)) * 100
+            diff = np.abs(r["predictions"] - reference["predictions"]).max()
+            parity = f"{agree:>10.1f}% {diff:>9.4f}"
+        else:
+            parity = f"{'n/a':>11} {'n/a':>9}"
+        print(f"{name:<12} {parity} {r['latency'][1] * 1e3:>7.2f} {r['latency'][8] * 1e3:>7.2f} "
+              f"{r['load_s']:>7.2f} {r['peak_rss'] / 2**20:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Doctor directory shared by the chatbot services, stored in SQLite.
+
+The directory lives in a local SQLite file (DOCTORS_DB, default
+doctors.sqlite3 next to this module), created and seeded with
+DOCTORS_DATABASE on first use:
+
+    doctors      one row per doctor; experience is kept as text for display
+                 and as experience_years for filtering and sorting, and
+                 specializations are normalized (specialty_key) so
+                 "Cardiologist" finds Cardiology
+    name_tokens  every word of every name, for prefix search on any name part,
+                 with copies of the filter and sort columns so a name search
+                 is answered from this table's index alone
+    meta         `version`, bumped on every import; used for ETags
+
+Listings use keyset (cursor) pagination over indexes that match each sort
+order, so a page costs the same at any depth. Larger directories are loaded
+from a JSON or JSON Lines file of records shaped like DOCTORS_DATABASE:
+
+    python doctors.py import doctors.jsonl [--replace]
+"""
+import base64
+import difflib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+DEFAULT_DB = os.environ.get("DOCTORS_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "doctors.sqlite3"))
+
+DOCTORS_DATABASE = [
+    {"name": "Dr. Alice Johnson", "specialization": "Cardiology", "experience": "15 years", "contact": "555-0123"},
+    {"name": "Dr. Robert Smith", "specialization": "Neurology", "experience": "12 years", "contact": "555-0124"},
+    {"name": "Dr. Emily Chen", "specialization": "Dermatology", "experience": "10 years", "contact": "555-0125"},
+    {"name": "Dr. Michael Rodriguez", "specialization": "Orthopedics", "experience": "20 years", "contact": "555-0126"},
+    {"name": "Dr. Sarah Williams", "specialization": "Gastroenterology", "experience": "8 years", "contact": "555-0127"},
+    {"name": "Dr. James Wilson", "specialization": "Pulmonology", "experience": "14 years", "contact": "555-0128"},
+    {"name": "Dr. Lisa Brown", "specialization": "Endocrinology", "experience": "11 years", "contact": "555-0129"},
+    {"name": "Dr. Mark Davis", "specialization": "Psychiatry", "experience": "9 years", "contact": "555-0130"},
+    {"name": "Dr. Nancy Lee", "specialization": "Ophthalmology", "experience": "16 years", "contact": "555-0131"},
+    {"name": "Dr. Thomas Martin", "specialization": "ENT", "experience": "13 years", "contact": "555-0132"},
+    {"name": "Dr. Jennifer Garcia", "specialization": "General Practice", "experience": "8 years", "contact": "555-0133"},
+]
+
+# Names the model tends to use for a specialty that don't share its stem.
+ALIASES = {
+    "ent": ["ear nose and throat", "ear nose throat", "otolaryngology", "otolaryngologist", "otorhinolaryngology"],
+    "general practice": ["general practitioner", "family medicine", "family doctor", "primary care", "internal medicine"],
+    "orthopedics": ["orthopaedics", "orthopedic surgeon", "orthopaedic surgeon"],
+    "psychiatry": ["psychiatrist", "mental health"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doctors (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    specialization TEXT NOT NULL,
+    specialty_key TEXT NOT NULL,
+    experience TEXT NOT NULL,
+    experience_years INTEGER NOT NULL,
+    contact TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS doctors_name ON doctors (name_key, id);
+CREATE INDEX IF NOT EXISTS doctors_experience ON doctors (experience_years, id);
+CREATE INDEX IF NOT EXISTS doctors_specialty_name ON doctors (specialty_key, name_key, id);
+CREATE INDEX IF NOT EXISTS doctors_specialty_experience ON doctors (specialty_key, experience_years, id);
+CREATE TABLE IF NOT EXISTS name_tokens (
+    token TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name_key TEXT NOT NULL,
+    specialty_key TEXT NOT NULL,
+    experience_years INTEGER NOT NULL,
+    PRIMARY KEY (token, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# sort parameter -> (column, direction)
+SORTS = {
+    "name": ("name_key", "ASC"),
+    "-name": ("name_key", "DESC"),
+    "experience": ("experience_years", "ASC"),
+    "-experience": ("experience_years", "DESC"),
+}
+MAX_PAGE = 100
+TITLES = {"dr", "doctor", "prof", "professor"}
+
+
+def specialty_key(name):
+    """Normalize a specialty or specialist name: "Cardiologist" and "cardiology" -> "cardiolog"."""
+    name = re.sub(r"[^a-z ]", " ", name.lower())
+    name = " ".join(name.split())
+    for canonical, aliases in ALIASES.items():
+        if name == canonical or name in aliases:
+            name = canonical
+            break
+    return re.sub(r"(ists?|ics?|y|s)$", "", name.replace(" ", ""))
+
+
+def name_tokens(name):
+    """Lowercase words of a name, without titles: "Dr. Alice Johnson" -> ["alice", "johnson"]."""
+    return [t for t in re.findall(r"[a-z0-9]+", name.lower()) if t not in TITLES]
+
+
+def parse_years(experience):
+    """ "15 years" / "15+ yrs" / 15 -> 15; unknown -> 0."""
+    match = re.search(r"\d+", str(experience))
+    return int(match.group()) if match else 0
+
+
+def _upper_bound(prefix):
+    # Smallest string greater than every string starting with prefix.
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def encode_cursor(sort, value, doctor_id):
+    raw = json.dumps([sort, value, doctor_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        sort, value, doctor_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+    if sort not in SORTS or not isinstance(doctor_id, int):
+        raise ValueError("invalid cursor")
+    return sort, value, doctor_id
+
+
+class DoctorDirectory:
+    """Doctors in a SQLite file; safe to use from many threads (one connection each)."""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._specializations = (None, None)
+        with sqlite3.connect(path) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            # Check and seed under one write lock, so processes starting together seed once.
+            db.execute("BEGIN IMMEDIATE")
+            if db.execute("SELECT COUNT(*) FROM doctors").fetchone()[0] == 0:
+                self._insert(db, DOCTORS_DATABASE)
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _insert(db, doctors):
+        for doctor in doctors:
+            row = (" ".join(name_tokens(doctor["name"])), specialty_key(doctor["specialization"]),
+                   parse_years(doctor.get("experience", "")))
+            cursor = db.execute(
+                "INSERT INTO doctors (name, name_key, specialization, specialty_key, experience, experience_years, contact)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doctor["name"], row[0], doctor["specialization"], row[1], str(doctor.get("experience", "")),
+                 row[2], doctor.get("contact", "")),
+            )
+            db.executemany("INSERT OR IGNORE INTO name_tokens (token, id, name_key, specialty_key, experience_years)"
+                           " VALUES (?, ?, ?, ?, ?)",
+                           [(token, cursor.lastrowid) + row for token in name_tokens(doctor["name"])])
+        db.execute("INSERT INTO meta (key, value) VALUES ('version', '1')"
+                   " ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    def import_doctors(self, doctors, replace=False):
+        """Add doctors (or replace the whole directory) in one transaction."""
+        with sqlite3.connect(self.path) as db:
+            if replace:
+                db.execute("DELETE FROM doctors")
+                db.execute("DELETE FROM name_tokens")
+            self._insert(db, doctors)
+
+    @property
+    def version(self):
+        return int(self._db().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+
+    def __len__(self):
+        return self._db().execute("SELECT COUNT(*) FROM doctors").fetchone()[0]
+
+    def specializations(self):
+        """Distinct specializations, in order of first appearance."""
+        version, names = self._specializations
+        if version != self.version:
+            rows = self._db().execute(
+                "SELECT specialization FROM doctors GROUP BY specialty_key ORDER BY MIN(id)").fetchall()
+            names = [row[0] for row in rows]
+            self._specializations = (self.version, names)
+        return names
+
+    def find(self, specialty, limit=2):
+        """The most experienced doctors matching `specialty` (specialist names work too)."""
+        rows = self._db().execute(
+            "SELECT * FROM doctors WHERE specialty_key = ? ORDER BY experience_years DESC, id LIMIT ?",
+            (specialty_key(specialty), limit)).fetchall()
+        return [self._record(row) for row in rows]
+
+    def search(self, specialization=None, min_experience=None, max_experience=None, name=None,
+               sort="name", limit=20, cursor=None):
+        """One page of doctors matching every given filter.
+
+        name matches doctors having a name word that starts with each query
+        word ("ali john" finds Dr. Alice Johnson); if nothing matches, close
+        spellings are tried ("jonson"). Returns (doctors, next_cursor), where
+        next_cursor is None on the last page.
+        """
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        limit = max(1, min(int(limit), MAX_PAGE))
+        column, direction = SORTS[sort]
+        where, params = [], []
+        if specialization:
+            where.append("specialty_key = ?")
+            params.append(specialty_key(specialization))
+        if min_experience is not None:
+            where.append("experience_years >= ?")
+            params.append(int(min_experience))
+        if max_experience is not None:
+            where.append("experience_years <= ?")
+            params.append(int(max_experience))
+        if cursor:
+            cursor_sort, value, last_id = decode_cursor(cursor)
+            if cursor_sort != sort:
+                raise ValueError("cursor belongs to a different sort order")
+            where.append(f"({column}, id) {'>' if direction == 'ASC' else '<'} (?, ?)")
+            params += [value, last_id]
+
+        words = name_tokens(name or "")
+        rows = self._page(where, params, words, column, direction, limit, exact=True)
+        if words and not rows:
+            # No name starts with the query: fall back to close spellings. A
+            # cursor page that finds nothing exactly must come from such a search too.
+            rows = self._page(where, params, words, column, direction, limit, exact=False)
+
+        doctors = [self._record(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(sort, last[column], last["id"])
+        return doctors, next_cursor
+
+    def _page(self, where, params, words, column, direction, limit, exact):
+        order = f" ORDER BY {column} {direction}, id {direction} LIMIT ?"
+        if not words:
+            sql = "SELECT * FROM doctors" + (" WHERE " + " AND ".join(where) if where else "") + order
+            return self._db().execute(sql, params + [limit + 1]).fetchall()
+
+        # The longest word selects candidate tokens through the index; the
+        # other words are checked against the name_key stored alongside.
+        where, params = list(where), list(params)
+        words = sorted(words, key=len, reverse=True)
+        if exact:
+            where.insert(0, "token >= ? AND token < ?")
+            params[:0] = [words[0], _upper_bound(words[0])]
+            for word in words[1:]:
+                where.append("(' ' || name_key) LIKE ?")
+                params.append(f"% {word}%")
+        else:
+            close = [self._close_tokens(word) for word in words]
+            if not all(close):
+                return []
+            where.insert(0, f"token IN ({', '.join('?' * len(close[0]))})")
+            params[:0] = close[0]
+            for tokens in close[1:]:
+                where.append("(" + " OR ".join(["(' ' || name_key || ' ') LIKE ?"] * len(tokens)) + ")")
+                params += [f"% {token} %" for token in tokens]
+        # A doctor with two words matching the prefix comes back twice; dedupe
+        # here (SQL DISTINCT costs an extra sort) and fetch more if needed.
+        sql = f"SELECT id, {column} FROM name_tokens WHERE " + " AND ".join(where) + order
+        fetch = limit + 1
+        while True:
+            rows = self._db().execute(sql, params + [fetch]).fetchall()
+            ids = list(dict.fromkeys(row["id"] for row in rows))
+            if len(ids) > limit or len(rows) < fetch:
+                break
+            fetch *= 2
+        ids = ids[:limit + 1]
+        rows = self._db().execute(f"SELECT * FROM doctors WHERE id IN ({', '.join('?' * len(ids))})", ids).fetchall()
+        by_id = {row["id"]: row for row in rows}
+        return [by_id[i] for i in ids]
+
+    def _close_tokens(self, word, n=5, cutoff=0.75):
+        # Candidates share the first letter and have a similar length.
+        rows = self._db().execute(
+            "SELECT DISTINCT token FROM name_tokens WHERE token >= ? AND token < ? AND length(token) BETWEEN ? AND ?",
+            (word[0], _upper_bound(word[0]), len(word) - 2, len(word) + 2)).fetchall()
+        return difflib.get_close_matches(word, [row[0] for row in rows], n=n, cutoff=cutoff)
+
+    @staticmethod
+    def _record(row):
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "specialization": row["specialization"],
+            "experience": row["experience"],
+            "experience_years": row["experience_years"],
+            "contact": row["contact"],
+        }
+
+
+def load(path=DEFAULT_DB):
+    return DoctorDirectory(path)
+
+
+directory = load()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "import":
+        sys.exit(__doc__.rstrip().splitlines()[-1].strip())
+    with open(sys.argv[2], encoding="utf-8") as f:
+        text = f.read()
+    records = json.loads(text) if text.lstrip().startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+    directory.import_doctors(records, replace="--replace" in sys.argv[3:])
+    print(f"{directory.path}: {len(directory)} doctors, version {directory.version}")
@@ -0,0 +1,179 @@
+"""One ASGI process serving the gene, skin, chatbot and X-ray routes.
+
+Each Flask service is mounted under its own prefix and imported lazily, in a
+background thread started at startup, so the light services (gene, chatbot)
+answer within a second while TensorFlow and torch are still loading:
+
+    /gene/...     gene.py      (also /api/analyze-genome...)
+    /chatbot/...  chatbot.py   (also /api/chat)
+    /skin/...     skin.py      e.g. /skin/api/predict
+    /xray/...     xray.py      e.g. /xray/api/predict
+
+A request for a service that is still loading waits for it (up to
+GATEWAY_LOAD_TIMEOUT seconds, then 503). GET /ready reports every service and
+GET /ready/<name> returns 200 once that one can serve, 503 before. GET /metrics
+has the metrics of every loaded service (see metrics.py).
+
+GATEWAY_PRELOAD lists the services loaded in the background at startup
+(default: all); the others load on their first request.
+
+Usage (from server/):
+    uvicorn gateway:app --port 8000
+"""
+import asyncio
+import importlib
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+
+import metrics
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:  # starlette's version works too, but is deprecated
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+LOAD_TIMEOUT = float(os.environ.get("GATEWAY_LOAD_TIMEOUT", 300))
+
+
+class LazyService:
+    """ASGI app that imports `module` (a Flask app module) the first time it's needed."""
+
+    def __init__(self, name, module, heavy=False):
+        self.name = name
+        self.module = module
+        self.heavy = heavy
+        self.state = "not_loaded"  # -> loading -> ready | failed
+        self.error = None
+        self.load_s = None
+        self._app = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Import the service; blocks until it's loaded. Safe to call from any thread."""
+        with self._lock:
+            if self._app is not None:
+                return
+            self.state = "loading"
+            start = time.perf_counter()
+            try:
+                flask_app = importlib.import_module(self.module).app
+            except Exception as e:
+                self.state = "failed"
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"gateway: loading {self.name} failed: {self.error}", flush=True)
+                return
+            self._app = WSGIMiddleware(flask_app)
+            self.load_s = time.perf_counter() - start
+            self.state = "ready"
+            self.error = None
+            print(f"gateway: {self.name} ready in {self.load_s:.1f}s", flush=True)
+
+    def warm_up(self):
+        threading.Thread(target=self.load, name=f"load-{self.name}", daemon=True).start()
+
+    def status(self):
+        return {"status": self.state, "error": self.error, "load_s": self.load_s}
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            try:
+                await asyncio.wait_for(asyncio.to_thread(self.load), LOAD_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            if self._app is None:
+                response = JSONResponse({"error": f"{self.name} is not available", **self.status()},
+                                        status_code=503, headers={"Retry-After": "5"})
+                await response(scope, receive, send)
+                return
+        await self._app(scope, receive, send)
+
+
+SERVICES = {
+    "gene": LazyService("gene", "gene"),
+    "chatbot": LazyService("chatbot", "chatbot"),
+    "skin": LazyService("skin", "skin", heavy=True),
+    "xray": LazyService("xray", "xray", heavy=True),
+}
+
+# Unprefixed paths that only one service serves, so existing clients of the
+# separate processes can switch to the gateway by changing the port only.
+ALIASES = [("/api/analyze-genome", "gene"), ("/api/chat", "chatbot")]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    preload = os.environ.get("GATEWAY_PRELOAD", ",".join(SERVICES))
+    services = [SERVICES[name] for name in filter(None, (n.strip() for n in preload.split(",")))]
+
+    def warm_up():
+        # Light services first, so TensorFlow/torch imports don't compete with them for CPU.
+        for service in services:
+            if not service.heavy:
+                service.load()
+        for service in services:
+            if service.heavy:
+                service.warm_up()
+
+    threading.Thread(target=warm_up, name="gateway-warmup", daemon=True).start()
+    yield
+
+
+app = FastAPI(title="Health platform gateway", lifespan=lifespan)
+
+
+@app.get("/")
+async def root():
+    return {"services": {name: f"/{name}" for name in SERVICES}, "ready": "/ready"}
+
+
+@app.get("/ready")
+async def ready():
+    statuses = {name: service.status() for name, service in SERVICES.items()}
+    all_ready = all(s["status"] == "ready" for s in statuses.values())
+    return JSONResponse(statuses, status_code=200 if all_ready else 503)
+
+
+@app.get("/ready/{name}")
+async def ready_service(name: str):
+    if name not in SERVICES:
+        return JSONResponse({"error": f"unknown service {name!r}"}, status_code=404)
+    status = SERVICES[name].status()
+    return JSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
+
+
+@app.get("/metrics")
+async def all_metrics():
+    # The mounted services share this process and so its metrics registry.
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+for _name, _service in SERVICES.items():
+    app.mount(f"/{_name}", _service)
+
+
+class _Aliases:
+    """Send the unprefixed ALIASES paths straight to their service."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for prefix, name in ALIASES:
+                if scope["path"].startswith(prefix):
+                    await SERVICES[name](scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(_Aliases)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
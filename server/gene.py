@@ -1,101 +1,265 @@
-from flask import Flask, request, jsonify
+import contextvars
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+from cache import LRUCache
+import genome_analysis
+import metrics
+import snp_kb
 
 app = Flask(__name__)
 CORS(app)  # Allow all origins
+metrics.instrument(app, "gene")  # per-stage timings and GET /metrics
 
-# SNP Database (from gene.py)
-SNP_DATABASE = {
-    "rs9939609": {
-        "gene": "FTO",
-        "risk_allele": "A",
-        "normal_allele": "T",
-        "homozygous_risk": {
-            "condition": "Higher obesity risk",
-            "lifestyle_advice": "Consider a lower-calorie diet, regular exercise routine, and monitoring weight carefully.",
-            "nutrition_advice": "Focus on high protein, low glycemic index foods. Limit processed foods and sugars.",
-            "risk_factor": 1.67,
-            "predictive_health": "Increased likelihood of obesity-related diseases like type 2 diabetes, heart disease, etc.",
-        },
-        "heterozygous": {
-            "condition": "Moderate obesity risk",
-            "lifestyle_advice": "Regular physical activity and mindful eating habits recommended.",
-            "nutrition_advice": "Balanced diet with portion control. Moderate carbohydrate intake.",
-            "risk_factor": 1.3,
-            "predictive_health": "Moderate risk of developing obesity-related conditions over time.",
-        },
-        "normal": {
-            "condition": "Typical obesity risk",
-            "lifestyle_advice": "Maintain standard healthy lifestyle choices.",
-            "nutrition_advice": "Follow general nutritional guidelines.",
-            "risk_factor": 1.0,
-            "predictive_health": "Low likelihood of obesity-related health issues in the near future.",
-        }
-    },
-    # Include other SNPs from your file (rs1234567, rs7891011)...
-}
-
-def simulate_health_condition(report):
-    condition_outcome = {}
-    if report['condition'] == "Higher obesity risk":
-        health_risk = report['risk_factor'] * 100
-        if health_risk > 150:
-            condition_outcome['obesity'] = "High likelihood of developing obesity and related diseases."
-        elif health_risk > 100:
-            condition_outcome['obesity'] = "Moderate risk over time. Regular health checks advised."
-        else:
-            condition_outcome['obesity'] = "Low risk, but maintain a healthy lifestyle."
-    return condition_outcome
-
-def interpret_snp(rsid, genotype):
-    snp_info = SNP_DATABASE.get(rsid)
-    if not snp_info:
-        return None
-
-    risk_allele = snp_info["risk_allele"]
-    normal_allele = snp_info["normal_allele"]
-    alleles = sorted(genotype)
-
-    if alleles[0] == risk_allele and alleles[1] == risk_allele:
-        category = "homozygous_risk"
-    elif risk_allele in alleles and normal_allele in alleles:
-        category = "heterozygous"
-    else:
-        category = "normal"
-
-    report = {
-        "rsid": rsid,
-        "gene": snp_info["gene"],
-        "genotype": genotype,
-        "category": category,
-        "condition": snp_info[category]["condition"],
-        "lifestyle_advice": snp_info[category]["lifestyle_advice"],
-        "nutrition_advice": snp_info[category]["nutrition_advice"],
-        "predictive_health": snp_info[category]["predictive_health"],
-        "risk_factor": snp_info[category]["risk_factor"],
-    }
+_kb_lock = threading.Lock()  # guards swapping genome_analysis.SNP_KB
+
+# Finished analyses keyed by (knowledge base version, sha256 of the upload).
+# Sized by report count: a report is a ~10-key dict whose annotation strings
+# are shared with the knowledge base, about 1 KB each.
+REPORT_BYTES = 1024
+RESULT_CACHE = LRUCache(
+    max_bytes=int(os.environ.get("GENOME_CACHE_BYTES", 64 * 1024 * 1024)),
+    sizeof=lambda reports: 100 + len(reports) * REPORT_BYTES,
+)
+
+# Background analysis jobs; finished jobs are forgotten after JOB_TTL seconds.
+JOB_TTL = int(os.environ.get("GENOME_JOB_TTL", 15 * 60))
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get("GENOME_WORKERS", 2)))
+jobs = {}
+_jobs_lock = threading.Lock()
+metrics.register("gene_cache", RESULT_CACHE.stats)
+
+def job_stats():
+    statuses = {"queued": 0, "running": 0, "done": 0, "error": 0}
+    for job in list(jobs.values()):
+        statuses[job["status"]] += 1
+    return statuses
+
+metrics.register("gene_jobs", job_stats)
+
+def refresh_kb():
+    """Reload the SNP index if its source file changed, dropping cached results."""
+    with _kb_lock:
+        if snp_kb.is_stale():
+            kb = snp_kb.load()
+            if kb.version != genome_analysis.SNP_KB.version:
+                genome_analysis.SNP_KB = kb
+                RESULT_CACHE.clear()
+    return genome_analysis.SNP_KB
+
+def spool_upload(file, chunk_size=1024 * 1024):
+    """Copy an upload into a temporary file, hashing it and counting lines on the way.
+
+    Returns (spooled file rewound to the start, sha256 hex digest, line count).
+    Small uploads stay in memory; large ones go to disk.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    digest = hashlib.sha256()
+    lines = 0
+    last = b"\n"
+    while True:
+        chunk = file.stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        lines += chunk.count(b"\n")
+        last = chunk[-1:]
+        spool.write(chunk)
+    if last != b"\n":
+        lines += 1
+    spool.seek(0)
+    return spool, digest.hexdigest(), lines
+
+# Compact responses send each distinct annotation once and have result rows
+# refer to it by position in the "annotations" list.
+ROW_FIELDS = ("rsid", "genotype", "category", "risk_factor")
+ANNOTATION_FIELDS = ("gene", "condition", "lifestyle_advice", "nutrition_advice",
+                     "predictive_health", "health_report")
+
+class AnnotationTable:
+    """Deduplicates the annotation part of reports within one response."""
+
+    def __init__(self):
+        self.annotations = []
+        self._ids = {}
+
+    def add(self, report):
+        """Return (annotation id, True if it wasn't in the table yet)."""
+        key = tuple(report[field] for field in ANNOTATION_FIELDS[:-1])
+        key += tuple(sorted(report["health_report"].items()))
+        annotation_id = self._ids.get(key)
+        if annotation_id is not None:
+            return annotation_id, False
+        annotation_id = self._ids[key] = len(self.annotations)
+        self.annotations.append({field: report[field] for field in ANNOTATION_FIELDS})
+        return annotation_id, True
+
+def compact_row(report, annotation_id):
+    row = {field: report[field] for field in ROW_FIELDS}
+    row["annotation"] = annotation_id
+    return row
+
+def compact_reports(reports):
+    table = AnnotationTable()
+    rows = [compact_row(report, table.add(report)[0]) for report in reports]
+    return {"annotations": table.annotations, "results": rows}
+
+def ndjson_lines(batches, compact=False):
+    """Render batches of reports as NDJSON: "result" lines (preceded, in compact
+    mode, by an "annotation" line the first time each one is used), then an
+    "end" line, or an "error" line if analysis fails part way."""
+    table = AnnotationTable()
+    count = 0
+    try:
+        for reports in batches:
+            for report in reports:
+                if compact:
+                    annotation_id, new = table.add(report)
+                    if new:
+                        yield json.dumps({"type": "annotation", "id": annotation_id,
+                                          **table.annotations[annotation_id]}) + "\n"
+                    report = compact_row(report, annotation_id)
+                yield json.dumps({"type": "result", **report}) + "\n"
+                count += 1
+    except Exception as e:
+        print("Error during genome analysis:", e)
+        yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+        return
+    yield json.dumps({"type": "end", "count": count}) + "\n"
 
-    report["health_report"] = simulate_health_condition(report)
-    return report
+def _wants_compact():
+    return request.args.get("compact", "").lower() in ("1", "true", "yes")
+
+def _wants_ndjson():
+    return (request.args.get("stream", "").lower() in ("1", "true", "yes")
+            or request.accept_mimetypes.best == "application/x-ndjson")
+
+def _run_job(job, spool):
+    job["status"] = "running"
+    try:
+        with spool, metrics.stage("analysis"):
+            reports = genome_analysis.analyze_stream(spool, lambda lines: job.update(lines_processed=lines))
+        if genome_analysis.SNP_KB.version == job["kb_version"]:
+            RESULT_CACHE.put((job["kb_version"], job["sha256"]), reports)
+        job.update(status="done", results=reports, lines_processed=job["total_lines"])
+    except Exception as e:
+        print("Error during genome analysis:", e)
+        job.update(status="error", error=str(e))
+    job["finished_at"] = time.time()
+
+def _prune_jobs():
+    cutoff = time.time() - JOB_TTL
+    with _jobs_lock:
+        for job_id in [k for k, job in jobs.items() if job.get("finished_at", cutoff + 1) < cutoff]:
+            del jobs[job_id]
+
+def _job_view(job, compact=False):
+    view = {key: job[key] for key in ("job_id", "status", "lines_processed", "total_lines")}
+    view["progress"] = job["lines_processed"] / job["total_lines"] if job["total_lines"] else 1.0
+    if job["status"] == "done":
+        if compact:
+            view.update(compact_reports(job["results"]))
+        else:
+            view["results"] = job["results"]
+    elif job["status"] == "error":
+        view["error"] = job["error"]
+    return view
 
 @app.route("/api/analyze-genome", methods=["POST"])
 def analyze_genome():
+    """Analyze an uploaded genome file.
+
+    ?compact=1 sends each distinct annotation once instead of in every row.
+    ?stream=1 (or Accept: application/x-ndjson) streams NDJSON as batches finish.
+    """
     if 'file' not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
-    file = request.files['file']
-    text = file.read().decode("utf-8")
+    kb = refresh_kb()
+    compact = _wants_compact()
+    # Spool and hash the upload (bounded memory); identical re-uploads are
+    # answered from the cache without parsing again.
+    with metrics.stage("upload_read"):
+        spool, sha256, _ = spool_upload(request.files['file'])
+    key = (kb.version, sha256)
+    with metrics.stage("cache_lookup"):
+        reports = RESULT_CACHE.get(key)
+
+    if _wants_ndjson():
+        def batches():
+            if reports is not None:
+                yield reports
+                return
+            collected = []
+            with spool:
+                for batch in genome_analysis.iter_analysis(spool):
+                    collected.extend(batch)
+                    yield batch
+            if genome_analysis.SNP_KB.version == kb.version:  # not if the index was refreshed meanwhile
+                RESULT_CACHE.put(key, collected)
+
+        if reports is not None:
+            spool.close()
+        return Response(ndjson_lines(batches(), compact), mimetype="application/x-ndjson")
 
-    reports = []
-    for line in text.splitlines():
-        parts = line.strip().split()
-        if len(parts) == 2:
-            rsid, genotype = parts
-            result = interpret_snp(rsid, genotype)
-            if result:
-                reports.append(result)
+    with spool:
+        if reports is None:
+            with metrics.stage("analysis"):
+                reports = genome_analysis.analyze_stream(spool)
+            if genome_analysis.SNP_KB.version == kb.version:
+                RESULT_CACHE.put(key, reports)
 
+    if compact:
+        return jsonify(compact_reports(reports))
     return jsonify({"results": reports})
 
+@app.route("/api/analyze-genome/jobs", methods=["POST"])
+def submit_genome_job():
+    """Start an analysis in the background; poll GET .../jobs/<job_id> for the result."""
+    if 'file' not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    _prune_jobs()
+    kb = refresh_kb()
+    with metrics.stage("upload_read"):
+        spool, sha256, total_lines = spool_upload(request.files['file'])
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "status": "queued",
+        "sha256": sha256,
+        "kb_version": kb.version,
+        "lines_processed": 0,
+        "total_lines": total_lines,
+    }
+    with _jobs_lock:
+        jobs[job["job_id"]] = job
+
+    cached = RESULT_CACHE.get((kb.version, sha256))
+    if cached is not None:
+        spool.close()
+        job.update(status="done", results=cached, lines_processed=total_lines, finished_at=time.time())
+        return jsonify(_job_view(job, _wants_compact())), 200
+
+    # In a copy of this request's context, so the job's timings carry its service label.
+    executor.submit(contextvars.copy_context().run, _run_job, job, spool)
+    response = jsonify(_job_view(job))
+    response.headers["Location"] = f"/api/analyze-genome/jobs/{job['job_id']}"
+    return response, 202
+
+@app.route("/api/analyze-genome/jobs/<job_id>", methods=["GET"])
+def genome_job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(_job_view(job, _wants_compact()))
+
 if __name__ == "__main__":
     app.run(port=5001, debug=True)
@@ -0,0 +1,215 @@
+"""Offline genome analysis for research cohorts.
+
+Runs the same interpretation as /api/analyze-genome over many genome files in
+parallel and writes one long-format table with a row per (sample, rsid):
+
+    sample, rsid, gene, genotype, category, risk_factor
+
+Usage (from server/):
+    python gene_cohort.py genomes/ --out cohort_results
+    python gene_cohort.py manifest.tsv --out cohort_results --workers 16
+
+A manifest lists one genome per line, either "path" or "sample<TAB>path";
+relative paths are resolved against the manifest's directory.
+
+Each finished sample is checkpointed to <out>/parts/ first, so rerunning the
+same command after an interruption only processes what is missing. The parts
+are then merged into <out>/cohort.csv and, if pyarrow is installed,
+<out>/cohort.parquet, and pivoted into an rsid x sample table with a
+category and risk_factor column per sample, <out>/cohort_wide.csv (and
+cohort_wide.parquet).
+"""
+import argparse
+import csv
+import hashlib
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+COLUMNS = ["sample", "rsid", "gene", "genotype", "category", "risk_factor"]
+
+
+def read_samples(source):
+    """[(sample_id, path)] from a directory of genome files or a manifest file."""
+    if os.path.isdir(source):
+        samples = [
+            (os.path.splitext(name)[0], os.path.join(source, name))
+            for name in sorted(os.listdir(source))
+            if not name.startswith(".") and os.path.isfile(os.path.join(source, name))
+        ]
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        samples = []
+        with open(source) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                parts = line.split("\t")
+                path = parts[-1]
+                sample = parts[0] if len(parts) > 1 else os.path.splitext(os.path.basename(path))[0]
+                samples.append((sample, os.path.join(base, path)))
+
+    seen = set()
+    for sample, _ in samples:
+        if sample in seen:
+            raise SystemExit(f"duplicate sample id: {sample!r}")
+        seen.add(sample)
+    return samples
+
+
+def part_path(out_dir, sample):
+    # The hash keeps ids that sanitize alike ("a/b", "a_b") in separate parts.
+    digest = hashlib.sha1(sample.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(out_dir, "parts", re.sub(r"[^\w.-]", "_", sample) + f"-{digest}.csv")
+
+
+def analyze_sample(sample, path, out_path):
+    """Worker: analyze one genome file and checkpoint its rows to out_path."""
+    import genome_analysis
+
+    with open(path, "rb") as f:
+        reports = genome_analysis.analyze_stream(f)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for report in reports:
+            writer.writerow([sample] + [report[column] for column in COLUMNS[1:]])
+    os.replace(tmp, out_path)  # a part only exists once it is complete
+    return sample, len(reports)
+
+
+def merge_parts(out_dir, samples):
+    """Concatenate the per-sample parts (in input order) into the final tables."""
+    parts = [part_path(out_dir, sample) for sample, _ in samples]
+    csv_path = os.path.join(out_dir, "cohort.csv")
+    with open(csv_path, "w", newline="") as out:
+        out.write(",".join(COLUMNS) + "\n")
+        for part in parts:
+            with open(part) as f:
+                next(f)  # header
+                for line in f:
+                    out.write(line)
+    written = [csv_path]
+
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("pyarrow not installed; skipping cohort.parquet", file=sys.stderr)
+        return written
+
+    schema = pa.schema([
+        ("sample", pa.string()), ("rsid", pa.string()), ("gene", pa.string()),
+        ("genotype", pa.string()), ("category", pa.dictionary(pa.int32(), pa.string())),
+        ("risk_factor", pa.float64()),
+    ])
+    convert = pacsv.ConvertOptions(column_types={field.name: field.type for field in schema})
+    parquet_path = os.path.join(out_dir, "cohort.parquet")
+    # One part at a time, so memory is bounded by the largest sample.
+    with pq.ParquetWriter(parquet_path, schema) as writer:
+        for part in parts:
+            writer.write_table(pacsv.read_csv(part, convert_options=convert).cast(schema))
+    written.append(parquet_path)
+    return written
+
+
+def merge_wide(out_dir, samples):
+    """Pivot the parts into an rsid x sample table: a row per rsid and a
+    <sample>:category and <sample>:risk_factor column per sample, empty where
+    the sample has no call. Rows are bounded by the knowledge base, so the
+    table is built in memory."""
+    names = [sample for sample, _ in samples]
+    genes = {}
+    cells = {}  # rsid -> {sample: (category, risk_factor)}
+    for sample in names:
+        with open(part_path(out_dir, sample), newline="") as f:
+            for row in csv.DictReader(f):
+                genes.setdefault(row["rsid"], row["gene"])
+                cells.setdefault(row["rsid"], {})[sample] = (row["category"], row["risk_factor"])
+    rsids = sorted(cells)
+    header = ["rsid", "gene"] + [f"{sample}:{field}" for sample in names for field in ("category", "risk_factor")]
+
+    csv_path = os.path.join(out_dir, "cohort_wide.csv")
+    with open(csv_path, "w", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(header)
+        for rsid in rsids:
+            row = [rsid, genes[rsid]]
+            for sample in names:
+                row += cells[rsid].get(sample, ("", ""))
+            writer.writerow(row)
+    written = [csv_path]
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return written
+
+    columns = {"rsid": pa.array(rsids, pa.string()), "gene": pa.array([genes[r] for r in rsids], pa.string())}
+    for sample in names:
+        calls = [cells[rsid].get(sample) for rsid in rsids]
+        columns[f"{sample}:category"] = pa.array([c[0] if c else None for c in calls], pa.string()).dictionary_encode()
+        columns[f"{sample}:risk_factor"] = pa.array([float(c[1]) if c and c[1] else None for c in calls], pa.float64())
+    parquet_path = os.path.join(out_dir, "cohort_wide.parquet")
+    pq.write_table(pa.table(columns), parquet_path)
+    written.append(parquet_path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch genome analysis for research cohorts.")
+    parser.add_argument("source", help="directory of genome files or a manifest file")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args()
+
+    samples = read_samples(args.source)
+    os.makedirs(os.path.join(args.out, "parts"), exist_ok=True)
+
+    # Compile the SNP index once up front rather than racing in every worker,
+    # and refuse to mix parts produced against different knowledge bases.
+    import snp_kb
+    kb_version = snp_kb.load().version
+    version_file = os.path.join(args.out, "parts", "KB_VERSION")
+    if os.path.exists(version_file):
+        with open(version_file) as f:
+            if f.read().strip() != kb_version:
+                sys.exit(f"{args.out} was produced with a different SNP knowledge base; use a new --out")
+    else:
+        with open(version_file, "w") as f:
+            f.write(kb_version + "\n")
+
+    todo = [(sample, path) for sample, path in samples if not os.path.exists(part_path(args.out, sample))]
+    print(f"{len(samples)} samples, {len(samples) - len(todo)} already done, {len(todo)} to run")
+
+    start = time.perf_counter()
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(analyze_sample, sample, path, part_path(args.out, sample)): sample
+                   for sample, path in todo}
+        for n, future in enumerate(as_completed(futures), 1):
+            try:
+                sample, rows = future.result()
+                print(f"[{n}/{len(todo)}] {sample}: {rows} matched SNPs")
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"[{n}/{len(todo)}] {futures[future]}: failed: {e}", file=sys.stderr)
+    if todo:
+        elapsed = time.perf_counter() - start
+        print(f"processed {len(todo) - len(failed)} samples in {elapsed:.1f}s "
+              f"({(len(todo) - len(failed)) / elapsed:.1f} samples/s)")
+
+    if failed:
+        sys.exit(f"{len(failed)} samples failed; rerun the same command to retry them")
+    for path in merge_parts(args.out, samples) + merge_wide(args.out, samples):
+        print(f"wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
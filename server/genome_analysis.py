@@ -0,0 +1,120 @@
+"""Genome interpretation: SNP lookups, genotype classification and reports.
+
+Shared by the /api/analyze-genome service (gene.py) and the offline cohort
+runner (gene_cohort.py), and kept free of Flask so cohort workers only load
+what the analysis needs. SNP_KB is the loaded index; gene.refresh_kb()
+swaps it when the annotation source changes.
+"""
+import numpy as np
+
+import snp_kb
+from genome_reader import GenomeReader
+
+# SNP annotations are compiled from snp_annotations.jsonl into a memory-mapped
+# index on first start (see snp_kb.py).
+SNP_KB = snp_kb.load()
+
+def simulate_health_condition(report):
+    condition_outcome = {}
+    if report['condition'] == "Higher obesity risk":
+        health_risk = report['risk_factor'] * 100
+        if health_risk > 150:
+            condition_outcome['obesity'] = "High likelihood of developing obesity and related diseases."
+        elif health_risk > 100:
+            condition_outcome['obesity'] = "Moderate risk over time. Regular health checks advised."
+        else:
+            condition_outcome['obesity'] = "Low risk, but maintain a healthy lifestyle."
+    return condition_outcome
+
+def classify_genotype(genotype, risk_allele, normal_allele):
+    alleles = sorted(genotype)
+    if len(alleles) == 1:  # hemizygous call (X/Y/MT in male samples)
+        alleles *= 2
+
+    if alleles[0] == risk_allele and alleles[1] == risk_allele:
+        return "homozygous_risk"
+    elif risk_allele in alleles and normal_allele in alleles:
+        return "heterozygous"
+    return "normal"
+
+def build_report(rsid, genotype, snp_info, category):
+    report = {
+        "rsid": rsid,
+        "gene": snp_info["gene"],
+        "genotype": genotype,
+        "category": category,
+        "condition": snp_info[category]["condition"],
+        "lifestyle_advice": snp_info[category]["lifestyle_advice"],
+        "nutrition_advice": snp_info[category]["nutrition_advice"],
+        "predictive_health": snp_info[category]["predictive_health"],
+        "risk_factor": snp_info[category]["risk_factor"],
+    }
+
+    report["health_report"] = simulate_health_condition(report)
+    return report
+
+def interpret_snp(rsid, genotype):
+    snp_info = SNP_KB.get(rsid)
+    if not snp_info:
+        return None
+
+    category = classify_genotype(genotype, snp_info["risk_allele"], snp_info["normal_allele"])
+    return build_report(rsid, genotype, snp_info, category)
+
+def _text(value):
+    return value.decode("ascii", "replace") if isinstance(value, bytes) else value
+
+def interpret_batch(rsids, genotypes):
+    """Vectorized interpret_snp over parallel lists of str or raw bytes (as
+    GenomeReader.batches() yields them). Returns the reports for matched rows in
+    input order, identical to calling interpret_snp line by line."""
+    positions = SNP_KB.positions(rsids)
+    rows = np.flatnonzero(positions >= 0)
+    if not len(rows):
+        return []
+    positions = positions[rows]
+    matched = [genotypes[i] for i in rows]
+    texts = [_text(genotype) for genotype in matched]
+
+    # Encode the genotypes of matched rows as two uint8 allele columns.
+    lengths = np.fromiter(map(len, matched), dtype=np.int64, count=len(matched))
+    try:
+        encoded = np.array(matched, dtype="S2").view(np.uint8).reshape(len(matched), 2)
+    except UnicodeEncodeError:
+        return [interpret_snp(_text(rsids[i]), genotype) for i, genotype in zip(rows, texts)]
+    first, second = encoded[:, 0], encoded[:, 1].copy()
+    second[lengths == 1] = first[lengths == 1]
+    low, high = np.minimum(first, second), np.maximum(first, second)
+
+    risk, normal = (codes[positions] for codes in SNP_KB.allele_codes())
+    has_risk = (low == risk) | (high == risk)
+    has_normal = (low == normal) | (high == normal)
+    category = np.full(len(matched), 2, dtype=np.int8)  # normal
+    category[has_risk & has_normal] = 1  # heterozygous
+    category[(low == risk) & (high == risk)] = 0  # homozygous_risk
+
+    reports = []
+    for row, pos, genotype, code, length in zip(rows, positions, texts, category, lengths):
+        snp_info = SNP_KB.entry(pos)
+        if length not in (1, 2):  # multi-base indel calls keep the per-line rules
+            name = classify_genotype(genotype, snp_info["risk_allele"], snp_info["normal_allele"])
+        else:
+            name = snp_kb.CATEGORIES[code]
+        reports.append(build_report(_text(rsids[row]), genotype, snp_info, name))
+    return reports
+
+def iter_analysis(stream, progress=None):
+    """Yield the reports of each batch of a genome file as soon as it is done;
+    progress(lines_read) is called after each batch."""
+    reader = GenomeReader(stream)
+    for rsids, genotypes in reader.batches():
+        yield interpret_batch(rsids, genotypes)
+        if progress:
+            progress(reader.lines_read)
+
+def analyze_stream(stream, progress=None):
+    """Run the batch path over a whole file object and return all reports."""
+    reports = []
+    for batch in iter_analysis(stream, progress):
+        reports.extend(batch)
+    return reports
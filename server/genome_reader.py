@@ -0,0 +1,143 @@
+"""Streaming reader for raw genotype files.
+
+Reads the upload in fixed-size chunks so memory stays flat no matter how big
+the file is. Understands the formats we see in practice:
+
+    rs9939609 AA                              (snp.txt, 2 columns)
+    rs9939609  16  53786615  AA               (23andMe, 4 columns)
+    rs9939609  16  53786615  A  A             (AncestryDNA, 5 columns)
+
+Lines starting with '#', blank lines and the AncestryDNA column header are
+skipped. Anything else that doesn't fit one of the layouts is ignored, same as
+the old splitlines() loop did.
+"""
+import numpy as np
+
+
+CHUNK_SIZE = 1 << 16  # 64 KiB per read
+
+# bytes.split() treats exactly these as whitespace
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[list(b" \t\n\r\x0b\x0c")] = True
+
+
+def _parse_line(line):
+    """(rsid, genotype) as bytes, or None for comments/headers/unknown layouts."""
+    if not line or line.startswith(b"#"):
+        return None
+    parts = line.split()
+    n = len(parts)
+    if n == 2:
+        rsid, genotype = parts
+    elif n == 4:
+        rsid, genotype = parts[0], parts[3]
+    elif n == 5:
+        rsid, genotype = parts[0], parts[3] + parts[4]
+    else:
+        return None
+    if rsid == b"rsid":  # AncestryDNA header row
+        return None
+    return rsid, genotype
+
+
+def _split_block(lines):
+    """Parse a list of lines into (rsids, genotypes) byte lists.
+
+    When every line has the same supported column count the whole block is
+    split with a single bytes.split() call; otherwise each line is parsed on
+    its own, with the same rules.
+    """
+    block = b"\n".join(lines)
+    if b"#" in block:
+        lines = [line for line in lines if not line.startswith(b"#")]
+        block = b"\n".join(lines)
+    if not lines:
+        return [], []
+
+    data = np.frombuffer(block, dtype=np.uint8)
+    space = _WHITESPACE[data]
+    starts = ~space
+    starts[1:] &= space[:-1]
+    counts = np.bincount(np.cumsum(data == ord("\n"))[starts], minlength=len(lines))
+    columns = int(counts[0])
+    if columns in (2, 4, 5) and (counts == columns).all():
+        tokens = block.split()
+        rsids = tokens[0::columns]
+        if columns == 2:
+            genotypes = tokens[1::2]
+        elif columns == 4:
+            genotypes = tokens[3::4]
+        else:
+            genotypes = list(map(bytes.__add__, tokens[3::5], tokens[4::5]))
+        if b"rsid" not in rsids:
+            return rsids, genotypes
+        pairs = [pair for pair in zip(rsids, genotypes) if pair[0] != b"rsid"]
+    else:
+        pairs = [pair for pair in map(_parse_line, lines) if pair]
+    return [rsid for rsid, _ in pairs], [genotype for _, genotype in pairs]
+
+
+class GenomeReader:
+    """Iterate (rsid, genotype) pairs from a binary file-like object.
+
+    keep: optional callable taking an rsid string; pairs for which it returns
+          False are dropped. Only the rsid is decoded to ask it; the genotype
+          of a dropped pair is never decoded or stored.
+    """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE, keep=None):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.keep = keep
+        self.lines_read = 0
+        self.bytes_read = 0
+
+    def _blocks(self):
+        """Yield the complete lines of each chunk read, as a list."""
+        tail = b""
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            self.bytes_read += len(chunk)
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+            self.lines_read += len(lines)
+            yield lines
+        if tail:
+            self.lines_read += 1
+            yield [tail]
+
+    def __iter__(self):
+        keep = self.keep
+        for lines in self._blocks():
+            for pair in map(_parse_line, lines):
+                if pair is None:
+                    continue
+                rsid = pair[0].decode("ascii", "replace")
+                if keep is not None and not keep(rsid):
+                    continue
+                yield rsid, pair[1].decode("ascii", "replace")
+
+    def batches(self, size=65536):
+        """Yield (rsids, genotypes) lists of at most `size` pairs.
+
+        Unlike iteration, values are left as raw bytes so nothing is decoded
+        for rows that never match; genome_analysis.interpret_batch accepts them as-is.
+        """
+        rsids, genotypes = [], []
+        for lines in self._blocks():
+            block_rsids, block_genotypes = _split_block(lines)
+            if self.keep is not None:
+                kept = [i for i, rsid in enumerate(block_rsids) if self.keep(rsid.decode("ascii", "replace"))]
+                block_rsids = [block_rsids[i] for i in kept]
+                block_genotypes = [block_genotypes[i] for i in kept]
+            rsids += block_rsids
+            genotypes += block_genotypes
+            while len(rsids) >= size:
+                yield rsids[:size], genotypes[:size]
+                rsids, genotypes = rsids[size:], genotypes[size:]
+        if rsids:
+            yield rsids, genotypes
@@ -0,0 +1,173 @@
+"""Shared image decoding and preprocessing for the skin and X-ray services.
+
+Uploads are often 12+ megapixel phone photos, while the models want 180x180
+or 224x224, so most of the work used to be decoding pixels that the resize
+then threw away. Here:
+
+- the header is checked first, so unsupported formats and oversized images
+  are rejected before any pixel is decoded;
+- JPEGs are decoded at a reduced DCT scale (1/2, 1/4 or 1/8) that is still
+  at least the target size, and other formats are shrunk with reduce()
+  before the final resample;
+- normalization works on float32 and can write into a caller-provided
+  buffer, so no float64 temporaries (the old `/ 255.0`) are created.
+"""
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "BMP", "TIFF", "MPO"}
+MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", 50_000_000))
+MAX_BYTES = int(os.environ.get("IMAGE_MAX_BYTES", 25 * 1024 * 1024))
+MAX_BATCH_IMAGES = int(os.environ.get("IMAGE_MAX_BATCH", 64))
+
+# Decoding for batch requests; Pillow releases the GIL while decoding and
+# resizing, so threads run in parallel. Threads start on first use (after any
+# pre-fork).
+decode_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("IMAGE_DECODE_WORKERS", min(4, os.cpu_count() or 1))))
+
+
+class ImageRejected(ValueError):
+    """The upload isn't an image we accept; the message is safe to show to clients."""
+
+
+def read_upload(file, max_bytes=MAX_BYTES):
+    """Read an uploaded file's bytes, refusing anything larger than max_bytes."""
+    data = file.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ImageRejected(f"Image too large: more than {max_bytes} bytes")
+    return data
+
+
+def read_batch(files, max_images=MAX_BATCH_IMAGES, max_bytes=MAX_BYTES):
+    """Expand a batch upload into [(name, bytes or ImageRejected)] in input order.
+
+    files: uploaded file objects with .filename and .read(); zip archives are
+    replaced by their members. Problems with a single image are returned in
+    its slot; a batch over max_images is rejected as a whole.
+    """
+    uploads = []
+    for file in files:
+        name = file.filename or f"image-{len(uploads)}"
+        try:
+            data = read_upload(file, max_bytes * max_images if _is_zip(file) else max_bytes)
+        except ImageRejected as e:
+            uploads.append((name, e))
+            continue
+        if data.startswith(b"PK\x03\x04"):
+            uploads.extend(_zip_members(name, data, max_bytes, max_images - len(uploads)))
+        else:
+            uploads.append((name, data))
+        if len(uploads) > max_images:
+            raise ImageRejected(f"Too many images: at most {max_images} per batch")
+    return uploads
+
+
+def _is_zip(file):
+    return (file.filename or "").lower().endswith(".zip") or getattr(file, "mimetype", None) in ("application/zip", "application/x-zip-compressed")
+
+
+def _zip_members(name, data, max_bytes, limit):
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        return [(name, ImageRejected("Invalid zip archive"))]
+    members = []
+    with archive:
+        infos = [info for info in archive.infolist()
+                 if not info.is_dir() and not os.path.basename(info.filename).startswith(".")
+                 and not info.filename.startswith("__MACOSX/")]
+        if len(infos) > limit:
+            raise ImageRejected(f"Too many images: {name} holds {len(infos)}, the batch has room for {limit}")
+        for info in infos:
+            if info.file_size > max_bytes:
+                members.append((info.filename, ImageRejected(f"Image too large: more than {max_bytes} bytes")))
+                continue
+            try:
+                members.append((info.filename, archive.read(info)))
+            except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e:
+                members.append((info.filename, ImageRejected(f"Could not extract from zip: {e}")))
+    return members
+
+
+def open_image(source, max_pixels=MAX_PIXELS, formats=ALLOWED_FORMATS):
+    """Open an image lazily (header only) and validate format and dimensions.
+
+    source: a file object, or the raw bytes of the upload.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    try:
+        image = Image.open(source)
+    except Exception:
+        raise ImageRejected("Invalid image file")
+    if image.format not in formats:
+        raise ImageRejected(f"Unsupported image format: {image.format}")
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageRejected(f"Image too large: {width}x{height} exceeds {max_pixels} pixels")
+    return image
+
+
+def prepare_batch(uploads, prepare, out=None):
+    """Run prepare(image) on decode_pool for every (name, bytes) upload.
+
+    With `out` (an array with one row per upload), upload i is prepared with
+    prepare(image, out=out[i]), so the batch is assembled in place.
+    Returns the results in input order; an upload that can't be opened or
+    prepared gets its exception in its slot instead.
+    """
+    def run(i):
+        data = uploads[i][1]
+        if isinstance(data, Exception):
+            return data
+        try:
+            image = open_image(data)
+            return prepare(image) if out is None else prepare(image, out=out[i])
+        except Exception as e:
+            return e if isinstance(e, ImageRejected) else ImageRejected(f"Could not process image: {e}")
+
+    return list(decode_pool.map(run, range(len(uploads))))
+
+
+def decode_rgb(image, size, resample=Image.BICUBIC):
+    """Decode `image` to an RGB uint8 array of shape (size[1], size[0], 3).
+
+    Uses reduced-scale JPEG decoding where possible, then one resample to
+    exactly `size`.
+    """
+    try:
+        if image.format in ("JPEG", "MPO"):
+            image.draft("RGB", size)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image = image.resize(size, resample=resample, reducing_gap=3.0)
+    except (OSError, SyntaxError, ValueError) as e:
+        raise ImageRejected(f"Could not decode image: {e}")
+    return np.asarray(image, dtype=np.uint8)
+
+
+def scale_to_unit(pixels, out=None):
+    """uint8 HWC -> float32 HWC in [0, 1], written into `out` if given."""
+    if out is None:
+        out = np.empty(pixels.shape, dtype=np.float32)
+    np.multiply(pixels, np.float32(1 / 255), out=out, casting="unsafe")
+    return out
+
+
+def normalize_chw(pixels, mean, std, out=None):
+    """uint8 HWC -> float32 CHW with per-channel (x / 255 - mean) / std, like
+    torchvision's ToTensor + Normalize; written into `out` if given."""
+    height, width, channels = pixels.shape
+    if out is None:
+        out = np.empty((channels, height, width), dtype=np.float32)
+    scale = (1 / (255 * np.asarray(std, dtype=np.float32))).astype(np.float32)
+    shift = (np.asarray(mean, dtype=np.float32) / np.asarray(std, dtype=np.float32)).astype(np.float32)
+    for c in range(channels):
+        np.multiply(pixels[:, :, c], scale[c], out=out[c], casting="unsafe")
+        out[c] -= shift[c]
+    return out
@@ -0,0 +1,210 @@
+"""Shared async access to the Groq chat API for the chatbot services.
+
+One AsyncGroq client per process keeps a pool of HTTP connections to the API
+open across requests, a semaphore caps how many completions are in flight,
+and every call has a deadline that covers both waiting for the semaphore and
+the request itself. Async code (FastAPI) awaits `client.complete_json`; sync
+code (the Flask apps) calls `client.complete_json_sync`, which runs the same
+coroutine on a background event loop shared by all request threads.
+`client.stream_json` yields the text as it is generated (iterate_sync from
+threads).
+
+Configured through the environment:
+
+    GROQ_API_KEY         API key (required; calls fail with RuntimeError without it)
+    GROQ_BASE_URL        API endpoint (e.g. a local stub for load tests)
+    LLM_MODEL            default model (llama-3.3-70b-versatile)
+    LLM_MAX_CONCURRENCY  completions in flight per process (default 16)
+    LLM_TIMEOUT          seconds per completion, queueing included (default 30)
+    LLM_MAX_RETRIES      client-level retries on connection errors/429/5xx (default 0;
+                         resilience.py retries within each request's deadline)
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+import metrics
+
+DEFAULT_MODEL = os.environ.get("LLM_MODEL", "llama-3.3-70b-versatile")
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 16))
+TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 30))
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 0))
+
+
+class LLMClient:
+    """Pooled, concurrency-limited JSON-mode chat completions."""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, timeout=TIMEOUT, max_retries=MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+        self._background = None
+        self._background_pid = None
+        self._start_lock = threading.Lock()
+
+    def _bind(self):
+        # httpx connections and asyncio primitives belong to one event loop:
+        # create them for the loop that uses the client.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if not os.environ.get("GROQ_API_KEY"):
+                raise RuntimeError("GROQ_API_KEY is not set; export it before starting the chatbot services")
+            limits = httpx.Limits(max_connections=self.max_concurrency,
+                                  max_keepalive_connections=self.max_concurrency)
+            self._client = AsyncGroq(
+                max_retries=self.max_retries,
+                http_client=DefaultAsyncHttpxClient(limits=limits, timeout=self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+
+    async def complete_json(self, messages, model=DEFAULT_MODEL, temperature=0.2, max_tokens=None, timeout=None):
+        """Run a chat completion in JSON mode and return the parsed object.
+
+        Raises TimeoutError if it doesn't finish within `timeout` seconds
+        (default LLM_TIMEOUT), and the API or JSON error otherwise.
+        """
+        self._bind()
+        timeout = self.timeout if timeout is None else timeout
+        self.requests += 1
+        try:
+            return await asyncio.wait_for(self._complete(messages, model, temperature, max_tokens, timeout), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.failures += 1
+            raise TimeoutError(f"LLM request timed out after {timeout:g}s")
+        except Exception:
+            self.failures += 1
+            raise
+
+    async def _complete(self, messages, model, temperature, max_tokens, timeout):
+        options = {"max_completion_tokens": max_tokens} if max_tokens else {}
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                with metrics.stage("llm_call"):
+                    response = await self._client.chat.completions.create(
+                        messages=messages,
+                        model=model,
+                        temperature=temperature,
+                        response_format={"type": "json_object"},
+                        timeout=timeout,
+                        **options,
+                    )
+            finally:
+                self.in_flight -= 1
+        if response.usage is not None:
+            self.prompt_tokens += response.usage.prompt_tokens or 0
+            self.completion_tokens += response.usage.completion_tokens or 0
+        with metrics.stage("json_parse"):
+            return json.loads(response.choices[0].message.content)
+
+    async def stream_json(self, messages, model=DEFAULT_MODEL, temperature=0.2, max_tokens=None, timeout=None):
+        """Yield the text of a completion as it is generated.
+
+        Groq doesn't stream in JSON mode, so the prompt itself has to ask for
+        JSON (chat_stream.JSONStreamParser skips anything around the object).
+        The deadline covers the whole stream; TimeoutError as complete_json.
+        """
+        self._bind()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = asyncio.get_running_loop().time() + timeout
+        remaining = lambda: max(deadline - asyncio.get_running_loop().time(), 0)
+        options = {"max_completion_tokens": max_tokens} if max_tokens else {}
+        self.requests += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), remaining())
+            self.in_flight += 1
+            start = time.perf_counter()
+            try:
+                stream = await asyncio.wait_for(self._client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                    temperature=temperature,
+                    stream=True,
+                    timeout=timeout,
+                    **options,
+                ), remaining())
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+                    except StopAsyncIteration:
+                        break
+                    usage = (chunk.x_groq and chunk.x_groq.usage) or chunk.usage
+                    if usage is not None:
+                        self.prompt_tokens += usage.prompt_tokens or 0
+                        self.completion_tokens += usage.completion_tokens or 0
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                metrics.observe("llm_call", time.perf_counter() - start)
+                self.in_flight -= 1
+                self._semaphore.release()
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.failures += 1
+            raise TimeoutError(f"LLM request timed out after {timeout:g}s")
+        except Exception:
+            self.failures += 1
+            raise
+
+    def complete_json_sync(self, *args, **kwargs):
+        """Blocking complete_json for threaded (WSGI) callers."""
+        return self.run_sync(self.complete_json(*args, **kwargs))
+
+    def run_sync(self, coro):
+        """Run a coroutine that uses this client on the background loop and wait for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result()
+
+    def iterate_sync(self, agen):
+        """Iterate an async generator that uses this client from a threaded caller."""
+        loop = self._background_loop()
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+
+    def _background_loop(self):
+        # Started on first use, and again in a forked child.
+        if self._background_pid != os.getpid():
+            with self._start_lock:
+                if self._background_pid != os.getpid():
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+                    self._background = loop
+                    self._background_pid = os.getpid()
+        return self._background
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+client = LLMClient()
+metrics.register("llm", client.stats)
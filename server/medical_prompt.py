@@ -0,0 +1,56 @@
+"""Token-lean prompting for the symptom analysis chatbots.
+
+The original prompt embeds the whole doctor directory as JSON and asks the
+model to copy matching records back, so input and output grow with the
+directory. In "lean" mode the model only returns conditions and the
+specialist to see, from a fixed list of specializations, and doctors are
+looked up in the DoctorDirectory afterwards. The prompt no longer depends on
+how many doctors there are.
+
+CHATBOT_PROMPT_MODE selects "lean" (default) or "full" (the original prompt).
+"""
+import os
+
+from doctors import directory
+
+MODE = os.environ.get("CHATBOT_PROMPT_MODE", "lean")
+DOCTORS_PER_SPECIALTY = 2
+MAX_DOCTORS = 5
+FALLBACK_SPECIALTY = "General Practice"
+
+LEAN_SYSTEM_PROMPT = """You are a medical assistant giving a preliminary analysis of a user's symptoms or health question.
+List 2-4 possible conditions of varying severity, each with a general treatment approach and the specialist to consult, then general advice and a disclaimer encouraging professional medical advice.
+recommended_specialist must be one of: {specializations}.
+Reply with JSON only, in this shape:
+{{"possible_conditions":[{{"condition":"","likelihood":"low|medium|high","description":"","general_treatment":"","recommended_specialist":""}}],"general_advice":"","disclaimer":""}}"""
+
+
+def lean_messages(user_message):
+    system = LEAN_SYSTEM_PROMPT.format(specializations=", ".join(directory.specializations()))
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user_message},
+    ]
+
+
+def attach_doctors(result):
+    """Fill result["recommended_doctors"] from the specialists named in its conditions."""
+    doctors = []
+    seen = set()
+    specialties = [c.get("recommended_specialist") or "" for c in result.get("possible_conditions", [])]
+    for specialty in specialties:
+        for doctor in directory.find(specialty, DOCTORS_PER_SPECIALTY):
+            if doctor["name"] not in seen:
+                seen.add(doctor["name"])
+                doctors.append(doctor)
+        if len(doctors) >= MAX_DOCTORS:
+            break
+    if not doctors:
+        doctors = directory.find(FALLBACK_SPECIALTY, DOCTORS_PER_SPECIALTY)
+    result["recommended_doctors"] = doctors[:MAX_DOCTORS]
+    return result
+
+
+def finish(result):
+    """The model's answer as returned to clients: doctors attached in lean mode."""
+    return attach_doctors(result) if MODE == "lean" else result
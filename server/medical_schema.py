@@ -0,0 +1,30 @@
+"""Response models of the symptom analyzers.
+
+Used by chatbot/app.py as FastAPI response models, and by router.py to
+validate model output before it is returned.
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class Condition(BaseModel):
+    condition: str
+    likelihood: str
+    description: str
+    general_treatment: str
+    recommended_specialist: str
+
+class Doctor(BaseModel):
+    name: str
+    specialization: str
+    experience: str
+    contact: str
+    id: Optional[int] = None
+    experience_years: Optional[int] = None
+
+class MedicalResponse(BaseModel):
+    possible_conditions: List[Condition]
+    recommended_doctors: List[Doctor]
+    general_advice: str
+    disclaimer: str
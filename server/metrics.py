@@ -0,0 +1,282 @@
+"""Per-stage latency metrics for the services, in Prometheus text format.
+
+Code times the stages of a request with
+
+    with metrics.stage("decode"):
+        image = imageprep.open_image(data)
+
+into medease_stage_seconds{service, stage}. The stage names used across the
+services are upload_read, cache_lookup, decode, preprocess, inference,
+analysis (gene), triage, llm_call, json_parse, validate and serialize.
+
+instrument(app, service) hooks a Flask app (instrument_asgi for FastAPI):
+every request is timed into medease_request_seconds{service, endpoint,
+status}, medease_requests_in_flight{service, endpoint} counts the ones
+being served, and GET /metrics renders everything in the process. For
+streamed responses the request time ends when the body starts.
+
+register(name, stats) exposes a stats() dict (cache hit ratios, LLM token
+counts, ...) as medease_<name>_<key> gauges, read at scrape time. Dicts of
+dicts (e.g. per-model stats) become a `key` label and strings a `value`
+label.
+
+Metrics are per process: behind prefork.py each worker has its own.
+
+    METRICS_TIMING_HEADER   1 adds a Server-Timing header with the stage
+                            durations of each request (default off)
+"""
+import contextvars
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from starlette.responses import JSONResponse
+except ImportError:  # Flask-only installs
+    JSONResponse = None
+
+PREFIX = "medease"
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TIMING_HEADER = os.environ.get("METRICS_TIMING_HEADER", "0").lower() in ("1", "true", "yes")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# The service and stage timings of the request being handled; copied into
+# tasks and onto llm's background loop along with the rest of the context.
+_service = contextvars.ContextVar("metrics_service", default=None)
+_timings = contextvars.ContextVar("metrics_timings", default=None)
+_default_service = "unknown"  # for stages timed outside a request
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by label values."""
+
+    def __init__(self, name, help, labels, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, values, seconds):
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {values: list(counts) for values, counts in self._series.items()}
+        for values, counts in sorted(series.items()):
+            for bound, count in zip(self.buckets + ("+Inf",), counts[:len(self.buckets)] + counts[-1:]):
+                le = f'le="{bound:g}"' if bound != "+Inf" else 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {counts[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {counts[-1]}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def add(self, values, amount):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = dict(self._values)
+        lines += [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in sorted(values.items())]
+        return lines
+
+
+stage_seconds = Histogram(f"{PREFIX}_stage_seconds", "Time spent in each stage of a request.", ("service", "stage"))
+request_seconds = Histogram(f"{PREFIX}_request_seconds", "Request latency by endpoint and status.",
+                            ("service", "endpoint", "status"))
+in_flight = Gauge(f"{PREFIX}_requests_in_flight", "Requests being served.", ("service", "endpoint"))
+collectors = {}  # name -> stats callable
+
+
+def observe(name, seconds):
+    """Record a stage timed elsewhere."""
+    stage_seconds.observe((_service.get() or _default_service, name), seconds)
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def register(name, stats):
+    """Expose stats() (a dict of numbers, strings and nested dicts) at scrape time."""
+    collectors[name] = stats
+
+
+def _metric_name(*parts):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(parts))
+
+
+def _flatten(name, stats, labels=()):
+    """(metric name, label pairs, value) for every number and string in a stats dict."""
+    for key, value in stats.items():
+        if isinstance(value, dict) and value and all(isinstance(v, dict) for v in value.values()):
+            for label, entry in value.items():
+                yield from _flatten(_metric_name(name, key), entry, labels + (("key", label),))
+        elif isinstance(value, dict):
+            yield from _flatten(_metric_name(name, key), value, labels)
+        elif isinstance(value, bool):
+            yield _metric_name(name, key), labels, int(value)
+        elif isinstance(value, (int, float)):
+            yield _metric_name(name, key), labels, value
+        elif isinstance(value, str):
+            yield _metric_name(name, key), labels + (("value", value),), 1
+
+
+def render():
+    lines = stage_seconds.render() + request_seconds.render() + in_flight.render()
+    for name, stats in sorted(collectors.items()):
+        try:
+            # Samples of one metric have to be contiguous.
+            samples = sorted(_flatten(f"{PREFIX}_{name}", stats()), key=lambda sample: sample[0])
+        except Exception as e:
+            print(f"metrics: collecting {name} failed: {e}", flush=True)
+            continue
+        typed = set()
+        for metric, labels, value in samples:
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} gauge")
+            names, values = zip(*labels) if labels else ((), ())
+            lines.append(f"{metric}{_labels(names, values)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _Request:
+    """The metrics side of one request, from its start to end()."""
+
+    def __init__(self, service, endpoint):
+        self.service = service
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.timings = []
+        self._tokens = (_service.set(service), _timings.set(self.timings))
+        in_flight.add((service, endpoint), 1)
+
+    def end(self, status):
+        seconds = time.perf_counter() - self.start
+        in_flight.add((self.service, self.endpoint), -1)
+        request_seconds.observe((self.service, self.endpoint, str(status)), seconds)
+        _service.reset(self._tokens[0])
+        _timings.reset(self._tokens[1])
+        return seconds
+
+    def server_timing(self):
+        entries = [f"{name};dur={seconds * 1e3:.1f}" for name, seconds in self.timings]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1e3:.1f}")
+        return ", ".join(entries)
+
+
+def instrument(app, service):
+    """Time every request of a Flask app, add GET /metrics and time JSON serialization."""
+    from flask import Response, g, request
+    from flask.json.provider import DefaultJSONProvider
+
+    global _default_service
+    if _default_service == "unknown":
+        _default_service = service
+
+    class TimedJSONProvider(DefaultJSONProvider):
+        def response(self, *args, **kwargs):
+            with stage("serialize"):
+                return super().response(*args, **kwargs)
+
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def begin_request():
+        rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        g.metrics = _Request(service, rule)
+
+    @app.after_request
+    def timing_header(response):
+        g.metrics_status = response.status_code
+        if TIMING_HEADER and "metrics" in g:
+            response.headers["Server-Timing"] = g.metrics.server_timing()
+        return response
+
+    @app.teardown_request
+    def end_request(error):
+        if "metrics" in g:
+            g.metrics.end(g.get("metrics_status", 500))
+
+    app.add_url_rule("/metrics", "metrics", lambda: Response(render(), content_type=CONTENT_TYPE))
+    return app
+
+
+def instrument_asgi(app, service):
+    """instrument() for a FastAPI app."""
+    from starlette.responses import Response
+    from starlette.routing import Match
+
+    global _default_service
+    if _default_service == "unknown":
+        _default_service = service
+
+    @app.middleware("http")
+    async def time_request(request, call_next):
+        endpoint = next((route.path for route in app.router.routes
+                         if route.matches(request.scope)[0] == Match.FULL), "unmatched")
+        metrics = _Request(service, endpoint)
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            if TIMING_HEADER:
+                response.headers["Server-Timing"] = metrics.server_timing()
+            return response
+        finally:
+            metrics.end(status)
+
+    app.add_api_route("/metrics", lambda: Response(render(), media_type=CONTENT_TYPE), include_in_schema=False)
+    return app
+
+
+if JSONResponse is not None:
+    class TimedJSONResponse(JSONResponse):
+        """JSONResponse that times its rendering as the serialize stage (FastAPI default_response_class)."""
+
+        def render(self, content):
+            with stage("serialize"):
+                return super().render(content)
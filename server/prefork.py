@@ -0,0 +1,136 @@
+"""Pre-fork serving for the image models: load once, serve from N processes.
+
+The parent process imports the service (which loads the model), moves the
+weights somewhere the workers can share them, binds the listening socket and
+then forks the workers. Each worker accepts connections on the inherited
+socket, so the kernel spreads requests across processes while the weights
+exist once in memory:
+
+    xray   torch parameters are moved to shared memory (share_memory()); the
+           workers only read them. XRAY_MODE=torchscript/compile trace or
+           compile the model at import, i.e. in the parent, and are refused.
+    skin   TFLite backends (SKIN_BACKEND=tflite_fp16/tflite_int8) memory-map
+           the model file, so every worker's interpreter reads the same page
+           cache pages. keras/tf_function can't be forked safely and are
+           refused; onnx works but each worker holds its own copy.
+
+Usage (from server/):
+    python prefork.py xray --workers 4 --port 5000
+    SKIN_BACKEND=tflite_int8 python prefork.py skin --workers 4 --port 5002
+
+Workers that die are restarted; SIGINT/SIGTERM stops them all.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+
+def prepare_xray(threads_per_worker):
+    # Running torch's thread pools before fork() can leave the children
+    # deadlocked, so the parent only loads weights: warmup happens in the
+    # workers, and modes that trace or compile at load time are refused.
+    mode = os.environ.get("XRAY_MODE", "eager")
+    if mode in ("torchscript", "compile"):
+        sys.exit(f"XRAY_MODE={mode} can't be used with pre-fork serving; use eager, int8_dynamic or int8_static")
+    os.environ["XRAY_WARMUP"] = "0"
+    import torch
+    import xray
+    import xray_serving
+
+    xray.model.share_memory()
+
+    def post_fork():
+        torch.set_num_threads(threads_per_worker)
+        xray_serving.warmup(xray.model, 3, xray.model_info["channels_last"])
+
+    return xray.app, post_fork
+
+
+def prepare_skin(threads_per_worker):
+    os.environ.setdefault("SKIN_NUM_THREADS", str(threads_per_worker))
+    import skin
+    import skin_backends
+
+    name = skin.backend.name
+    if name in ("keras", "tf_function"):
+        sys.exit(f"SKIN_BACKEND={name} can't be used with pre-fork serving; use tflite_int8 or tflite_fp16")
+
+    def post_fork():
+        # A fresh interpreter per worker (no state shared across fork); it maps
+        # the same model file, so the weights stay shared.
+        skin.backend = skin_backends.load_backend(name)
+        skin.batcher.predict_batch = skin.backend.predict
+
+    return skin.app, post_fork
+
+
+SERVICES = {"xray": prepare_xray, "skin": prepare_skin}
+
+
+def worker(app, sock, host, port, post_fork):
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    post_fork()
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an image model from pre-forked workers.")
+    parser.add_argument("service", choices=SERVICES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--threads-per-worker", type=int,
+                        help="framework threads per worker (default: cores / workers)")
+    args = parser.parse_args()
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers)
+
+    app, post_fork = SERVICES[args.service](threads)
+    sock = socket.create_server((args.host, args.port), backlog=128, reuse_port=False)
+    sock.set_inheritable(True)
+
+    children = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                worker(app, sock, args.host, args.port, post_fork)
+            finally:
+                os._exit(1)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(args.workers):
+        spawn()
+    print(f"{args.service}: {args.workers} workers on {args.host}:{args.port} "
+          f"({threads} threads each), parent pid {os.getpid()}", flush=True)
+
+    while True:
+        pid, status = os.wait()
+        started = children.pop(pid, None)
+        if started is None:
+            continue
+        print(f"worker {pid} exited with status {status}; restarting", file=sys.stderr, flush=True)
+        if time.monotonic() - started < 1:
+            time.sleep(1)  # don't spin if workers die on startup
+        spawn()
+
+
+if __name__ == "__main__":
+    main()
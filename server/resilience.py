@@ -0,0 +1,266 @@
+"""Tail-latency controls for the upstream LLM calls.
+
+Every analysis request gets a Deadline, an end-to-end time budget that is
+passed down to each call it makes (cache waits, model attempts,
+escalations), so a slow API can't hold a worker for longer than the
+budget. call() wraps one upstream request with:
+
+    retries     connection errors, 429s and 5xx are retried with full-jitter
+                exponential backoff, only while the budget allows it
+    hedging     when a request is still running after the recent p95 latency
+                of its model, a duplicate is sent and the first answer wins;
+                at most LLM_HEDGE_RATIO of requests are hedged
+    breaker     after LLM_BREAKER_FAILURES consecutive failed calls, calls
+                fail fast (CircuitOpen) for LLM_BREAKER_COOLDOWN seconds, then
+                a single probe decides whether to close it again
+
+When the upstream is unavailable (breaker open, budget spent, retries
+exhausted) the apps answer with degraded_answer(): a best-effort local
+analysis from the triage model, after the response cache has been tried.
+
+    CHATBOT_DEADLINE        seconds per analysis request (default 20)
+    LLM_RETRIES             retries per call (default 2)
+    LLM_HEDGE_RATIO         share of calls that may be hedged (default 0.1; 0 disables)
+    LLM_BREAKER_FAILURES    consecutive failures that open the breaker (default 5)
+    LLM_BREAKER_COOLDOWN    seconds before an open breaker lets a probe through (default 15)
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import groq
+
+import medical_prompt
+import metrics
+import triage
+
+BUDGET = float(os.environ.get("CHATBOT_DEADLINE", 20))
+RETRIES = int(os.environ.get("LLM_RETRIES", 2))
+RETRY_BASE = 0.25  # seconds; backoff is uniform in [0, base * 2**attempt]
+RETRY_CAP = 4.0
+MIN_ATTEMPT = 0.5  # don't start an attempt with less budget than this
+HEDGE_RATIO = float(os.environ.get("LLM_HEDGE_RATIO", 0.1))
+HEDGE_MIN_SAMPLES = 20
+BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", 15))
+
+
+class Unavailable(Exception):
+    """The upstream can't answer this request in time; use a degraded answer."""
+
+class CircuitOpen(Unavailable):
+    pass
+
+class DeadlineExceeded(Unavailable, TimeoutError):
+    pass
+
+
+class Deadline:
+    """An end-to-end time budget, measured on the monotonic clock."""
+
+    def __init__(self, seconds=None):
+        self.seconds = BUDGET if seconds is None else seconds
+        self.expires = time.monotonic() + self.seconds
+
+    def remaining(self):
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def check(self, needed=0.0):
+        """Raise DeadlineExceeded unless more than `needed` seconds are left."""
+        if self.remaining() <= needed:
+            raise DeadlineExceeded(f"request budget of {self.seconds:g}s exhausted")
+
+
+def is_retryable(error):
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (groq.APIConnectionError, groq.APITimeoutError))
+
+
+def is_upstream_failure(error):
+    """Errors that say the API is unhealthy (as opposed to a bad request or bad output)."""
+    return is_retryable(error) or isinstance(error, (TimeoutError, Unavailable))
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed."""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half-open"
+            if self.state == "closed" or (self.state == "half-open" and not self._probing):
+                self._probing = self.state == "half-open"
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """An allowed call ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, error=None):
+        """Record the outcome of an allowed call."""
+        with self._lock:
+            self._probing = False
+            if error is None or not is_upstream_failure(error):
+                self.state = "closed"
+                self.consecutive = 0
+                return
+            self.consecutive += 1
+            if self.state == "half-open" or self.consecutive >= self.failures:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Recent successful latencies per model, for the hedging delay."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def p95(self, key):
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[int(len(samples) * 0.95)]
+
+
+breaker = CircuitBreaker()
+latency = LatencyTracker()
+counters = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "deadline_exceeded": 0, "degraded": 0}
+
+
+async def call(request, deadline, key):
+    """await request(timeout) with retries, hedging and the circuit breaker.
+
+    request is called with the seconds it may take and returns an awaitable;
+    key names the model (latencies are tracked per key). Raises Unavailable
+    when the upstream can't answer within the deadline, and request's own
+    error for anything not worth retrying. The breaker sees one outcome per
+    call, after its retries.
+    """
+    counters["calls"] += 1
+    try:
+        deadline.check(MIN_ATTEMPT)
+    except DeadlineExceeded:
+        counters["deadline_exceeded"] += 1
+        raise
+    if not breaker.allow():
+        raise CircuitOpen("upstream marked unhealthy; failing fast")
+    try:
+        result = await _retried(request, deadline, key)
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception as e:
+        breaker.record(e)
+        raise
+    breaker.record()
+    return result
+
+
+async def _retried(request, deadline, key):
+    attempt = 0
+    while True:
+        try:
+            return await _hedged(request, deadline, key)
+        except Exception as e:
+            if isinstance(e, TimeoutError):
+                counters["deadline_exceeded"] += 1
+                raise DeadlineExceeded(str(e)) from e
+            if not is_retryable(e):
+                raise
+            attempt += 1
+            backoff = random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt))
+            if attempt > RETRIES or deadline.remaining() - backoff < MIN_ATTEMPT:
+                raise Unavailable(f"upstream failed after {attempt} attempt(s): {e}") from e
+            counters["retries"] += 1
+            await asyncio.sleep(backoff)
+
+
+async def _hedged(request, deadline, key):
+    start = time.perf_counter()
+    first = asyncio.ensure_future(request(deadline.remaining()))
+    tasks = {first}
+    try:
+        delay = latency.p95(key)
+        if delay is not None and delay < deadline.remaining() - MIN_ATTEMPT:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and counters["hedges"] < HEDGE_RATIO * counters["calls"]:
+                counters["hedges"] += 1
+                tasks.add(asyncio.ensure_future(request(deadline.remaining())))
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        counters["hedge_wins"] += 1
+                    latency.record(key, time.perf_counter() - start)
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def degraded_answer(text):
+    """A best-effort local answer for when the model can't be reached."""
+    counters["degraded"] += 1
+    index, _, reason = triage.model.classify(text)
+    conditions = []
+    if index is not None and reason in (None, "low_confidence"):
+        specialty, condition, description, treatment, _, _ = triage.model.corpus[index]
+        conditions.append({
+            "condition": condition,
+            "likelihood": "low",
+            "description": description,
+            "general_treatment": treatment,
+            "recommended_specialist": specialty,
+        })
+    result = {
+        "possible_conditions": conditions,
+        "general_advice": "Our full analysis is temporarily unavailable, so this is a limited answer. "
+                          "If your symptoms are severe, sudden or getting worse, seek medical care promptly.",
+        "disclaimer": triage.DISCLAIMER,
+        "degraded": True,
+    }
+    return medical_prompt.attach_doctors(result)
+
+
+def stats():
+    return {
+        **counters,
+        "breaker": breaker.state,
+        "breaker_opened": breaker.opened,
+        "breaker_rejected": breaker.rejected,
+    }
+
+
+metrics.register("resilience", stats)
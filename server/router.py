@@ -0,0 +1,179 @@
+"""Latency-aware model routing for the symptom analyzers.
+
+Each query gets a complexity score from its length, how many separate
+complaints it lists and whether it has red-flag terms (triage.RED_FLAGS).
+Simple queries go to a small, fast model and everything else to the large
+one; red flags always get the large model. If the small model's answer
+doesn't validate against medical_schema.MedicalResponse (or isn't JSON at
+all), the query is escalated to the large model.
+
+Every decision is logged with the score, its inputs and per-model latency,
+as a JSON line to ROUTER_LOG if set (benchmarks/tune_router.py summarizes
+it) and otherwise as a short INFO line on the "router" logger. `stats` keeps per-model
+counts and latencies.
+
+    LLM_SMALL_MODEL    small model (llama-3.1-8b-instant; empty disables routing)
+    ROUTER_THRESHOLD   scores below this go to the small model (default 2)
+    ROUTER_LOG         path of the JSON-lines decision log
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import groq
+from pydantic import ValidationError
+
+import llm
+import medical_prompt
+import metrics
+import resilience
+import triage
+from medical_schema import MedicalResponse
+
+SMALL_MODEL = os.environ.get("LLM_SMALL_MODEL", "llama-3.1-8b-instant")
+LARGE_MODEL = llm.DEFAULT_MODEL
+THRESHOLD = float(os.environ.get("ROUTER_THRESHOLD", 2))
+LOG_PATH = os.environ.get("ROUTER_LOG")
+WORDS_PER_POINT = 8  # content words per point of complexity
+
+_log_lock = threading.Lock()
+logger = logging.getLogger("router")
+
+
+def complexity(text):
+    """(score, features) for a query; features are logged with the decision."""
+    tokens = triage.words(text)
+    lowered = " ".join(tokens)
+    content = [w for w in tokens if w not in triage.STOPWORDS]
+    # Complaints are listed with commas, semicolons, "and", "with", "plus" or "also".
+    parts = re.split(r"[,;]|\b(?:and|with|plus|also)\b", text.lower())
+    symptoms = sum(1 for part in parts if set(triage.words(part)) - triage.STOPWORDS)
+    red_flags = sum(flag in lowered for flag in triage.RED_FLAGS) or int(triage.red_flag(tokens))
+    score = len(content) / WORDS_PER_POINT + max(symptoms - 1, 0) + 3 * red_flags
+    return score, {"words": len(content), "symptoms": symptoms, "red_flags": red_flags}
+
+
+def route(text):
+    """(models to try in order, score, features)."""
+    score, features = complexity(text)
+    if SMALL_MODEL and SMALL_MODEL != LARGE_MODEL and score < THRESHOLD and not features["red_flags"]:
+        return [SMALL_MODEL, LARGE_MODEL], score, features
+    return [LARGE_MODEL], score, features
+
+
+def validate(result):
+    """The finished answer, or ValueError if it doesn't match MedicalResponse."""
+    if not isinstance(result, dict):
+        raise ValueError(f"expected a JSON object, got {type(result).__name__}")
+    with metrics.stage("validate"):
+        try:
+            result = medical_prompt.finish(result)
+        except (AttributeError, TypeError) as e:  # e.g. possible_conditions isn't a list of objects
+            raise ValueError(f"malformed answer: {e}") from e
+        MedicalResponse.model_validate(result)
+    return result
+
+
+def is_invalid_output(error):
+    """Errors that mean the model produced unusable output (worth escalating)."""
+    # Groq rejects JSON-mode completions that aren't valid JSON with a 400.
+    return isinstance(error, (ValueError, ValidationError, groq.BadRequestError))
+
+
+class Stats:
+    """Per-model request counts and recent latencies."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.models = {}
+        self.escalations = 0
+        self._lock = threading.Lock()
+
+    def record(self, model, seconds, ok):
+        with self._lock:
+            entry = self.models.setdefault(model, {"requests": 0, "invalid": 0,
+                                                   "latencies": deque(maxlen=self.window)})
+            entry["requests"] += 1
+            entry["invalid"] += not ok
+            entry["latencies"].append(seconds)
+
+    def escalated(self):
+        with self._lock:
+            self.escalations += 1
+
+    def snapshot(self):
+        with self._lock:
+            models = {}
+            for model, entry in self.models.items():
+                latencies = sorted(entry["latencies"])
+                models[model] = {
+                    "requests": entry["requests"],
+                    "invalid": entry["invalid"],
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1e3, 1) if latencies else None,
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1e3, 1) if latencies else None,
+                }
+            return {"models": models, "escalations": self.escalations, "threshold": THRESHOLD}
+
+
+stats = Stats()
+metrics.register("router", stats.snapshot)
+
+
+class Decision:
+    """The routing of one query: models to try and what happened on each attempt."""
+
+    def __init__(self, text):
+        self.models, self.score, self.features = route(text)
+        self.attempts = []
+
+    def attempt(self, model, seconds, error=None):
+        """Record an attempt; True if its error calls for escalating to the next model."""
+        invalid = error is not None and is_invalid_output(error)
+        if error is None or invalid:
+            stats.record(model, seconds, ok=error is None)
+        self.attempts.append({"model": model, "ms": round(seconds * 1e3, 1), "ok": error is None,
+                              **({"error": str(error)[:200]} if error is not None else {})})
+        escalate = invalid and model != self.models[-1]
+        if escalate:
+            stats.escalated()
+        return escalate
+
+    def log(self):
+        if LOG_PATH:
+            line = {"time": time.time(), "score": round(self.score, 3), **self.features, "attempts": self.attempts}
+            with _log_lock, open(LOG_PATH, "a") as f:
+                f.write(json.dumps(line) + "\n")
+        else:
+            attempts = ", ".join(f"{a['model']} {a['ms']:.0f} ms{'' if a['ok'] else ' (failed)'}"
+                                 for a in self.attempts)
+            logger.info("score %.2f -> %s", self.score, attempts)
+
+
+async def analyze(text, messages, max_tokens=None, temperature=0.2, deadline=None):
+    """The finished, validated answer to `messages`, from the model `text` is routed to.
+
+    Each model call goes through resilience.call within `deadline`.
+    """
+    decision = Decision(text)
+    deadline = deadline or resilience.Deadline()
+    try:
+        for model in decision.models:
+            def request(timeout, model=model):
+                return llm.client.complete_json(messages, model=model, temperature=temperature,
+                                                max_tokens=max_tokens, timeout=timeout)
+
+            start = time.perf_counter()
+            try:
+                result = validate(await resilience.call(request, deadline, key=model))
+            except Exception as e:
+                if decision.attempt(model, time.perf_counter() - start, e):
+                    continue
+                raise
+            decision.attempt(model, time.perf_counter() - start)
+            return result
+    finally:
+        decision.log()
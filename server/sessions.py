@@ -0,0 +1,176 @@
+"""Bounded multi-turn conversation memory for /api/chat.
+
+Each conversation is a Session kept server-side under an opaque id that the
+client sends back with its next message. A session holds the latest
+exchanges verbatim and a condensed summary of everything older, and every
+prompt is assembled against a token budget:
+
+    system prompt
+    summary        "Earlier in this conversation: ..." (one line per folded exchange)
+    recent turns   the latest user messages and answers, verbatim
+    new message
+
+When the recent turns outgrow their share of the budget the oldest exchange
+is folded into the summary: the question and the conditions and specialists
+the answer named, built locally so folding costs no model call. The summary
+has its own budget; past it, the oldest lines after the first (usually the
+chief complaint) are dropped. Folding happens when a turn is recorded, so a
+session never grows past its budget and prompt size stays flat however long
+the conversation gets.
+
+Sessions live in an LRUCache bounded by total bytes, with a sliding TTL.
+
+    CHATBOT_SESSION_TTL      idle seconds before a session is forgotten (default 1800)
+    CHATBOT_SESSION_BYTES    memory for all sessions (default 32 MB)
+    CHATBOT_HISTORY_TOKENS   prompt budget for the history (default 1200)
+    CHATBOT_SUMMARY_TOKENS   part of it for the summary (default 300)
+"""
+import json
+import os
+import re
+import secrets
+import threading
+
+import metrics
+from cache import LRUCache
+
+TTL = float(os.environ.get("CHATBOT_SESSION_TTL", 1800))
+MAX_BYTES = int(os.environ.get("CHATBOT_SESSION_BYTES", 32 * 1024 * 1024))
+HISTORY_TOKENS = int(os.environ.get("CHATBOT_HISTORY_TOKENS", 1200))
+SUMMARY_TOKENS = int(os.environ.get("CHATBOT_SUMMARY_TOKENS", 300))
+CHARS_PER_TOKEN = 4  # rough for English text and JSON
+QUESTION_CHARS = 160  # of each question kept in the summary
+SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+_counters_lock = threading.Lock()
+counters = {"turns": 0, "folded": 0, "summary_dropped": 0}
+
+
+def _count(name):
+    with _counters_lock:
+        counters[name] += 1
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def compact_answer(answer):
+    """An answer as it is replayed to the model: what it wrote, without doctors or disclaimer."""
+    keep = {k: answer[k] for k in ("possible_conditions", "general_advice") if k in answer}
+    return json.dumps(keep, separators=(",", ":"))
+
+
+def condense(question, answer):
+    """One summary line for an exchange."""
+    question = " ".join(question.split())
+    if len(question) > QUESTION_CHARS:
+        question = question[:QUESTION_CHARS - 3] + "..."
+    conditions = [c for c in answer.get("possible_conditions", []) if isinstance(c, dict)]
+    named = ", ".join(f"{c.get('condition', '?')} ({c.get('likelihood', '?')})" for c in conditions)
+    specialists = sorted({c["recommended_specialist"] for c in conditions if c.get("recommended_specialist")})
+    line = f'- user: "{question}" -> {named or "no specific condition"}'
+    if specialists:
+        line += f"; see {', '.join(specialists)}"
+    return line
+
+
+class Session:
+    """One conversation: a condensed summary of old exchanges and the latest ones verbatim.
+
+    Safe to share between requests: every method holds the session's lock.
+    """
+
+    def __init__(self, id):
+        self.id = id
+        self._lock = threading.RLock()
+        self.summary = []  # condensed lines, oldest first
+        self.turns = []  # [user message, answer JSON] pairs, oldest first
+        self.dropped = 0  # summary lines dropped to stay within SUMMARY_TOKENS
+
+    @property
+    def empty(self):
+        with self._lock:
+            return not self.summary and not self.turns
+
+    def size(self):
+        """Approximate bytes held, charged against CHATBOT_SESSION_BYTES."""
+        with self._lock:
+            return 200 + sum(len(line) for line in self.summary) + sum(len(q) + len(a) for q, a in self.turns)
+
+    def summary_text(self):
+        with self._lock:
+            if not self.summary:
+                return ""
+            lines = self.summary[:1]
+            if self.dropped:
+                lines.append(f"- ({self.dropped} more exchange(s) omitted)")
+            lines += self.summary[1:]
+            return "Earlier in this conversation:\n" + "\n".join(lines)
+
+    def add(self, question, answer):
+        turn = [question, compact_answer(answer)]
+        with self._lock:
+            self.turns.append(turn)
+            _count("turns")
+            recent_budget = HISTORY_TOKENS - SUMMARY_TOKENS
+            while self.turns and sum(estimate_tokens(q) + estimate_tokens(a) for q, a in self.turns) > recent_budget:
+                old_question, old_answer = self.turns.pop(0)
+                self.summary.append(condense(old_question, json.loads(old_answer)))
+                _count("folded")
+            while len(self.summary) > 1 and estimate_tokens(self.summary_text()) > SUMMARY_TOKENS:
+                del self.summary[1]
+                self.dropped += 1
+                _count("summary_dropped")
+
+    def messages(self, base):
+        """`base` ([system, user] from the analyzer) with this conversation inserted before the new message."""
+        history = []
+        with self._lock:
+            if self.summary:
+                history.append({"role": "system", "content": self.summary_text()})
+            for question, answer in self.turns:
+                history += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+        return base[:-1] + history + base[-1:]
+
+    def history_tokens(self):
+        return sum(estimate_tokens(m["content"]) for m in self.messages([{"content": ""}])[:-1])
+
+
+store = LRUCache(max_bytes=MAX_BYTES, sizeof=Session.size, ttl=TTL)
+
+
+def open_session(session_id=None):
+    """The session for a client-supplied id, or a new one under a fresh id.
+
+    Unknown, expired or malformed ids are never adopted, so a client can't
+    pick the id another user's conversation will be stored under.
+    """
+    if session_id and SESSION_ID.match(session_id):
+        session = store.get(session_id)
+        if session is not None:
+            return session
+    return Session(secrets.token_urlsafe(16))
+
+
+def record(session, question, answer):
+    """Add an exchange to the session and keep it alive for another TTL."""
+    if "error" in answer:
+        return
+    session.add(question, answer)
+    store.put(session.id, session)
+
+
+def stats():
+    lru = store.stats()
+    return {
+        "sessions": lru["entries"],
+        "bytes": lru["bytes"],
+        "evictions": lru["evictions"],
+        "expirations": lru["expirations"],
+        **counters,
+        "history_tokens": HISTORY_TOKENS,
+    }
+
+
+metrics.register("sessions", stats)
@@ -1,30 +1,66 @@
 import os
 import io
+import hashlib
+import time
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import tensorflow as tf
-import numpy as np
-from PIL import Image
+from batching import MicroBatcher
+import cache
+import imageprep
+import metrics
+import skin_backends
 
 app = Flask(__name__)
 CORS(app)  # Enable Cross-Origin Resource Sharing
+metrics.instrument(app, "skin")  # per-stage timings and GET /metrics
 
-# Load your Keras model
-MODEL_PATH = "fixed_model.h5"
-model = tf.keras.models.load_model(MODEL_PATH)
+# Load the model through the backend chosen by SKIN_BACKEND (keras by default;
+# see skin_backends.py and convert_skin_model.py for the faster ones).
+backend = skin_backends.load_backend()
+
+# Concurrent requests are coalesced into one forward pass: requests arriving
+# within SKIN_BATCH_WAIT_MS of each other share a batch of up to SKIN_MAX_BATCH.
+batcher = MicroBatcher(
+    backend.predict,
+    max_batch_size=int(os.environ.get("SKIN_MAX_BATCH", 16)),
+    max_wait_ms=float(os.environ.get("SKIN_BATCH_WAIT_MS", 5)),
+)
+
+# Finished predictions keyed by model version and sha256 of the upload, so
+# re-posted images skip decoding and inference. SKIN_CACHE_DIR adds a disk tier
+# that survives restarts (see cache.tiered_from_env). The version hashes the
+# model file, so replacing it invalidates old entries.
+MODEL_VERSION = f"{backend.name}:{cache.file_version(backend.path)[:16]}"
+prediction_cache = cache.tiered_from_env("SKIN")
+metrics.register("skin_cache", prediction_cache.stats)
+metrics.register("skin_batcher", batcher.stats)
 
 # Define the class names according to your skin classification model.
 # Update the list as needed with your actual class labels.
 class_names = ['Acne', 'Eczema', 'Psoriasis', 'Vitiligo']
 
-def preprocess_image(image, target_size=(180, 180)):
-    """Preprocess the image to be suitable for the model input."""
-    if image.mode != "RGB":
-        image = image.convert("RGB")
-    image = image.resize(target_size)
-    image_array = np.array(image) / 255.0  # Normalize pixel values
-    image_array = np.expand_dims(image_array, axis=0)
-    return image_array
+def preprocess_image(image, target_size=(180, 180), out=None):
+    """Preprocess the image to be suitable for the model input (float32 HWC in [0, 1])."""
+    return imageprep.scale_to_unit(imageprep.decode_rgb(image, target_size), out=out)
+
+def cache_key(data):
+    return f"{MODEL_VERSION}:{hashlib.sha256(data).hexdigest()}"
+
+def format_prediction(predictions):
+    """Top three classes and confidences (as percentages) for one output row."""
+    top_indices = predictions.argsort()[-3:][::-1]
+    top_preds = []
+    for i in top_indices:
+        label = class_names[i] if i < len(class_names) else f"Class {i}"
+        confidence = float(predictions[i] * 100)
+        top_preds.append({"class": label, "confidence": confidence})
+
+    # The highest prediction is assumed to be the primary result.
+    return {
+        "prediction": top_preds[0]["class"],
+        "confidence": top_preds[0]["confidence"],
+        "top_predictions": top_preds
+    }
 
 @app.route("/api/predict", methods=["POST"])
 def predict():
@@ -39,33 +75,90 @@ def predict():
         return jsonify({"error": "No file selected"}), 400
 
     try:
-        # Read the image from the request file stream
-        image = Image.open(file.stream)
-        processed_image = preprocess_image(image)
+        # Read the upload; oversized or unsupported files are rejected before decoding.
+        with metrics.stage("upload_read"):
+            data = imageprep.read_upload(file.stream)
+        key = cache_key(data)
+        with metrics.stage("cache_lookup"):
+            cached = prediction_cache.get(key)
+        if cached is not None:
+            response = jsonify(cached)
+            response.headers["X-Cache"] = "HIT"
+            return response
 
-        # Get prediction from the model
-        predictions = model.predict(processed_image)[0]
-        
-        # Compute the top three predictions and corresponding confidences (converted to percentages)
-        top_indices = predictions.argsort()[-3:][::-1]
-        top_preds = []
-        for i in top_indices:
-            label = class_names[i] if i < len(class_names) else f"Class {i}"
-            confidence = float(predictions[i] * 100)
-            top_preds.append({"class": label, "confidence": confidence})
-        
-        # Prepare response: highest prediction is assumed to be the primary result.
-        result = {
-            "prediction": top_preds[0]["class"],
-            "confidence": top_preds[0]["confidence"],
-            "top_predictions": top_preds
-        }
+        with metrics.stage("decode"):
+            image = imageprep.open_image(data)
+        with metrics.stage("preprocess"):
+            processed_image = preprocess_image(image)
+
+        # Get prediction from the model (batched with other in-flight requests)
+        with metrics.stage("inference"):
+            predictions = batcher.predict(processed_image)
         
-        return jsonify(result)
+        result = format_prediction(predictions)
+        prediction_cache.put(key, result)
+
+        response = jsonify(result)
+        response.headers["X-Cache"] = "MISS"
+        return response
+    except imageprep.ImageRejected as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print("Error during prediction:", e)
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/predict/batch", methods=["POST"])
+def predict_batch():
+    """Predict several images in one request: repeated "files" parts and/or zip archives.
+
+    Returns {"results": [...]} in input order; an image that fails gets an
+    "error" entry instead of predictions and doesn't fail the others.
+    """
+    files = request.files.getlist("files") + request.files.getlist("file")
+    if not files:
+        return jsonify({"error": "No files in the request"}), 400
+    try:
+        with metrics.stage("upload_read"):
+            uploads = imageprep.read_batch(files)
+    except imageprep.ImageRejected as e:
+        return jsonify({"error": str(e)}), 400
+
+    results = [None] * len(uploads)
+    keys = {}
+    todo = []
+    for i, (_, data) in enumerate(uploads):
+        if not isinstance(data, Exception):
+            keys[i] = cache_key(data)
+            results[i] = prediction_cache.get(keys[i])
+        if results[i] is None:
+            todo.append(i)
+
+    # Decode in parallel, then hand every image to the micro-batcher, which
+    # runs them through the model SKIN_MAX_BATCH at a time.
+    with metrics.stage("preprocess"):
+        prepared = imageprep.prepare_batch([uploads[i] for i in todo], preprocess_image)
+    inference_start = time.perf_counter()
+    futures = {i: batcher.submit(array) for i, array in zip(todo, prepared) if not isinstance(array, Exception)}
+    for i, array in zip(todo, prepared):
+        if isinstance(array, Exception):
+            results[i] = {"error": str(array)}
+            continue
+        try:
+            results[i] = format_prediction(futures[i].result())
+        except Exception as e:
+            print("Error during prediction:", e)
+            results[i] = {"error": str(e)}
+            continue
+        prediction_cache.put(keys[i], results[i])
+    if futures:
+        metrics.observe("inference", time.perf_counter() - inference_start)
+
+    return jsonify({"results": [{"filename": name, **result} for (name, _), result in zip(uploads, results)]})
+
+@app.route("/api/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify({"model_version": MODEL_VERSION, **prediction_cache.stats()})
+
 if __name__ == "__main__":
     # The server will run on port 5002 or a PORT environment variable if set.
     port = int(os.environ.get("PORT", 5002))
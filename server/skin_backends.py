@@ -0,0 +1,122 @@
+"""Inference backends for the skin classifier.
+
+All backends expose predict(batch) -> probabilities for a float32 batch of
+shape (N, 180, 180, 3), so skin.py doesn't care which one is loaded. Pick one
+at startup with SKIN_BACKEND:
+
+    keras        fixed_model.h5 through tf.keras (the original path)
+    tf_function  SavedModel with a compiled serving signature
+    tflite_fp16  TFLite, float16 weights
+    tflite_int8  TFLite, int8 post-training quantized
+    onnx         ONNX Runtime
+
+Everything except "keras" is produced by convert_skin_model.py. Frameworks are
+imported only by the backend that needs them, so e.g. a TFLite deployment can
+run with tflite_runtime instead of full TensorFlow.
+"""
+import os
+import threading
+
+import numpy as np
+
+MODEL_PATH = os.environ.get("SKIN_MODEL_PATH", "fixed_model.h5")
+CONVERTED_DIR = os.environ.get("SKIN_CONVERTED_DIR", "skin_models")
+NUM_THREADS = int(os.environ.get("SKIN_NUM_THREADS", 0)) or None  # None: framework default
+
+
+class KerasBackend:
+    name = "keras"
+
+    def __init__(self, path=MODEL_PATH):
+        import tensorflow as tf
+
+        self.path = path
+        self.model = tf.keras.models.load_model(path)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFFunctionBackend:
+    """SavedModel serving signature: a traced graph, no Keras call machinery."""
+
+    name = "tf_function"
+
+    def __init__(self, path=os.path.join(CONVERTED_DIR, "saved_model")):
+        import tensorflow as tf
+
+        if NUM_THREADS:
+            tf.config.threading.set_intra_op_parallelism_threads(NUM_THREADS)
+        self.path = path
+        self._tf = tf
+        self._loaded = tf.saved_model.load(path)
+        self._fn = self._loaded.signatures["serving_default"]
+        self._output = next(iter(self._fn.structured_outputs))
+
+    def predict(self, batch):
+        return self._fn(self._tf.constant(batch, dtype=self._tf.float32))[self._output].numpy()
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.path = path
+        self._interpreter = Interpreter(model_path=path, num_threads=NUM_THREADS)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self._lock = threading.Lock()  # interpreters aren't thread-safe
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self._interpreter.set_tensor(self._input["index"], batch)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output["index"]).copy()
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, path=os.path.join(CONVERTED_DIR, "skin_model.onnx")):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if NUM_THREADS:
+            options.intra_op_num_threads = NUM_THREADS
+        self.path = path
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self._input = self._session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self._session.run(None, {self._input: np.asarray(batch, dtype=np.float32)})[0]
+
+
+BACKENDS = {
+    "keras": lambda: KerasBackend(),
+    "tf_function": lambda: TFFunctionBackend(),
+    "tflite_fp16": lambda: TFLiteBackend(os.path.join(CONVERTED_DIR, "skin_model_fp16.tflite")),
+    "tflite_int8": lambda: TFLiteBackend(os.path.join(CONVERTED_DIR, "skin_model_int8.tflite")),
+    "onnx": lambda: OnnxBackend(),
+}
+
+
+def load_backend(name=None):
+    """Instantiate the backend named by `name` (default: SKIN_BACKEND, else keras)."""
+    name = name or os.environ.get("SKIN_BACKEND", "keras")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SKIN_BACKEND {name!r}; choose from {', '.join(BACKENDS)}")
+    backend = BACKENDS[name]()
+    backend.name = name
+    return backend
@@ -0,0 +1,250 @@
+"""SNP knowledge base: compiled, memory-mapped annotation index.
+
+The curated annotations live in a JSON Lines source file, one SNP per line,
+in the same shape the old hard-coded SNP_DATABASE dict used:
+
+    {"rsid": "rs9939609", "gene": "FTO", "risk_allele": "A", "normal_allele": "T",
+     "homozygous_risk": {...}, "heterozygous": {...}, "normal": {...}}
+
+compile_index() turns that into a compact binary index which load() maps into
+memory, so startup cost doesn't grow with the number of SNPs:
+
+    header   magic, record count, string count, sha256 of the source
+    rsids    sorted uint32 array (rs9939609 -> 9939609), binary searched
+    records  fixed-size rows of string-table ids plus risk factors
+    strings  offset table + one UTF-8 blob; every distinct text stored once
+
+The index is a local build artifact (native byte order) and is rebuilt
+whenever the source is newer than it.
+
+    python snp_kb.py compile [source.jsonl] [out.idx]
+"""
+import array
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.environ.get("SNP_KB_SOURCE", os.path.join(BASE_DIR, "snp_annotations.jsonl"))
+DEFAULT_INDEX = os.environ.get("SNP_KB_INDEX", os.path.join(BASE_DIR, "snp_annotations.idx"))
+
+CATEGORIES = ("homozygous_risk", "heterozygous", "normal")
+TEXT_FIELDS = ("condition", "lifestyle_advice", "nutrition_advice", "predictive_health")
+
+MAGIC = b"SNPIDX1\0"
+HEADER = struct.Struct("=8sII32s")
+# gene, risk_allele, normal_allele, then per category: 4 text ids + risk_factor
+RECORD = struct.Struct("=III" + "IIIId" * len(CATEGORIES))
+
+
+def rsid_to_int(rsid):
+    """'rs9939609' -> 9939609; None for ids that aren't plain rs numbers."""
+    if isinstance(rsid, bytes):
+        rsid = rsid.decode("ascii", "replace")
+    digits = rsid[2:]
+    if rsid[:2] != "rs" or not (digits.isascii() and digits.isdigit()):
+        return None
+    value = int(digits)
+    return value if value < 2**32 else None
+
+
+def rsid_keys(rsids):
+    """Vectorized rsid_to_int over a list of rsids (str or ASCII bytes): int64 array,
+    -1 where invalid."""
+    import numpy as np
+
+    n = len(rsids)
+    width = 13  # "rs" + 10 digits fits uint32, plus one byte to spot longer ids
+    try:
+        raw = np.array(rsids, dtype=f"S{width}").view(np.uint8).reshape(n, width)
+    except UnicodeEncodeError:
+        return np.fromiter((-1 if k is None else k for k in map(rsid_to_int, rsids)), np.int64, n)
+
+    tail = raw[:, 2:]
+    is_digit = (tail >= ord("0")) & (tail <= ord("9"))
+    ndigits = is_digit.sum(axis=1)
+    valid = (
+        (raw[:, 0] == ord("r")) & (raw[:, 1] == ord("s")) & (ndigits > 0)
+        & (is_digit | (tail == 0)).all(axis=1)
+        & (is_digit[:, :-1] >= is_digit[:, 1:]).all(axis=1)  # digits, then padding
+    )
+    exponent = np.clip(ndigits[:, None] - 1 - np.arange(width - 2), 0, None)
+    values = np.where(is_digit, tail - ord("0"), 0).astype(np.int64) * 10 ** exponent
+    keys = np.where(valid, values.sum(axis=1), -1)
+    keys[keys >= 2**32] = -1
+
+    # Full-width entries were possibly truncated; redo those the slow way.
+    for i in np.flatnonzero(raw[:, -1]):
+        key = rsid_to_int(rsids[i])
+        keys[i] = -1 if key is None else key
+    return keys
+
+
+def compile_index(source=DEFAULT_SOURCE, index=DEFAULT_INDEX):
+    """Compile a JSON Lines annotation source into a binary index file."""
+    digest = hashlib.sha256()
+    entries = {}
+    with open(source, "rb") as f:
+        for lineno, line in enumerate(f, 1):
+            digest.update(line)
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            key = rsid_to_int(entry["rsid"])
+            if key is None:
+                raise ValueError(f"{source}:{lineno}: not an rs identifier: {entry['rsid']!r}")
+            entries[key] = entry  # later lines override earlier ones
+
+    strings = {}
+
+    def intern(text):
+        return strings.setdefault(text, len(strings))
+
+    keys = sorted(entries)
+    records = bytearray()
+    for key in keys:
+        entry = entries[key]
+        values = [intern(entry["gene"]), intern(entry["risk_allele"]), intern(entry["normal_allele"])]
+        for category in CATEGORIES:
+            info = entry[category]
+            values.extend(intern(info[field]) for field in TEXT_FIELDS)
+            values.append(float(info["risk_factor"]))
+        records += RECORD.pack(*values)
+
+    blob = bytearray()
+    offsets = [0]
+    for text in strings:  # dicts keep insertion order, i.e. id order
+        blob += text.encode("utf-8")
+        offsets.append(len(blob))
+
+    tmp = f"{index}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), len(strings), digest.digest()))
+        f.write(array.array("I", keys).tobytes())
+        f.write(records)
+        f.write(array.array("I", offsets).tobytes())
+        f.write(blob)
+    os.replace(tmp, index)
+    return index
+
+
+class SnpKnowledgeBase:
+    """Read-only view over a compiled index. Mapping-like: `rsid in kb`, kb.get(rsid)."""
+
+    def __init__(self, index=DEFAULT_INDEX):
+        self.path = index
+        with open(index, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.string_count, digest = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{index} is not an SNP index")
+        self.version = digest.hex()
+
+        view = memoryview(self._map)
+        ids_at = HEADER.size
+        records_at = ids_at + 4 * self.count
+        offsets_at = records_at + RECORD.size * self.count
+        self._blob_at = offsets_at + 4 * (self.string_count + 1)
+        self._ids = view[ids_at:records_at].cast("I")
+        self._records_at = records_at
+        self._offsets = view[offsets_at:self._blob_at].cast("I")
+        self._string = lru_cache(maxsize=65536)(self._read_string)
+        self._allele_codes = None
+
+    def __len__(self):
+        return self.count
+
+    def _read_string(self, i):
+        start = self._blob_at + self._offsets[i]
+        end = self._blob_at + self._offsets[i + 1]
+        return self._map[start:end].decode("utf-8")
+
+    def _position(self, rsid):
+        key = rsid_to_int(rsid)
+        if key is None:
+            return None
+        pos = bisect.bisect_left(self._ids, key)
+        if pos < self.count and self._ids[pos] == key:
+            return pos
+        return None
+
+    def __contains__(self, rsid):
+        return self._position(rsid) is not None
+
+    def get(self, rsid):
+        """Return the annotation dict for `rsid` (old SNP_DATABASE shape) or None."""
+        pos = self._position(rsid)
+        if pos is None:
+            return None
+        return self.entry(pos)
+
+    def entry(self, pos):
+        """Annotation dict for the record at index position `pos`."""
+        v = RECORD.unpack_from(self._map, self._records_at + pos * RECORD.size)
+        text = self._string
+        info = {"gene": text(v[0]), "risk_allele": text(v[1]), "normal_allele": text(v[2])}
+        for i, category in zip(range(3, len(v), 5), CATEGORIES):
+            info[category] = {
+                "condition": text(v[i]),
+                "lifestyle_advice": text(v[i + 1]),
+                "nutrition_advice": text(v[i + 2]),
+                "predictive_health": text(v[i + 3]),
+                "risk_factor": v[i + 4],
+            }
+        return info
+
+    def positions(self, rsids):
+        """Vectorized lookup: record position per rsid as an int64 array, -1 if unknown."""
+        import numpy as np
+
+        keys = rsid_keys(rsids)
+        if not self.count:
+            return np.full(len(keys), -1, dtype=np.int64)
+        ids = np.frombuffer(self._map, dtype=np.uint32, count=self.count, offset=HEADER.size)
+        pos = np.minimum(np.searchsorted(ids, keys), self.count - 1)
+        return np.where(ids[pos] == keys, pos, -1)
+
+    def allele_codes(self):
+        """(risk, normal) uint8 arrays per record: the allele's byte, or 0 if it isn't
+        a single ASCII character (a genotype character can then never match it)."""
+        if self._allele_codes is None:
+            import numpy as np
+
+            records = np.frombuffer(self._map, dtype=np.uint32, count=self.count * RECORD.size // 4,
+                                    offset=self._records_at)
+            records = records.reshape(self.count, RECORD.size // 4)
+            table = np.zeros(self.string_count, dtype=np.uint8)
+            for i in np.unique(records[:, 1:3]):
+                allele = self._string(int(i))
+                if len(allele) == 1 and allele.isascii():
+                    table[i] = ord(allele)
+            self._allele_codes = (table[records[:, 1]], table[records[:, 2]])
+        return self._allele_codes
+
+
+def is_stale(source=DEFAULT_SOURCE, index=DEFAULT_INDEX):
+    """True if the index is missing or older than its source."""
+    return not os.path.exists(index) or (
+        os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(index)
+    )
+
+
+def load(source=DEFAULT_SOURCE, index=DEFAULT_INDEX):
+    """Open the index, compiling it first if it is missing or older than the source."""
+    if is_stale(source, index):
+        compile_index(source, index)
+    return SnpKnowledgeBase(index)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "compile":
+        sys.exit(__doc__.rstrip().splitlines()[-1].strip())
+    out = compile_index(*sys.argv[2:4])
+    kb = SnpKnowledgeBase(out)
+    print(f"wrote {out}: {len(kb)} SNPs, {kb.string_count} distinct strings")
@@ -0,0 +1,39 @@
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The services import each other as top-level modules from server/.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Keep the doctor directory the tests seed out of the working tree.
+os.environ.setdefault("DOCTORS_DB", os.path.join(tempfile.mkdtemp(), "doctors.sqlite3"))
+
+
+def annotation(rsid, gene, risk_allele="A", normal_allele="T", risk_factor=1.5):
+    """A snp_annotations.jsonl entry with distinct text per field."""
+    import snp_kb
+
+    entry = {"rsid": rsid, "gene": gene, "risk_allele": risk_allele, "normal_allele": normal_allele}
+    for i, category in enumerate(snp_kb.CATEGORIES):
+        entry[category] = {field: f"{gene} {category} {field} é" for field in snp_kb.TEXT_FIELDS}
+        entry[category]["risk_factor"] = risk_factor - i * 0.25
+    return entry
+
+
+@pytest.fixture
+def make_kb(tmp_path):
+    """make_kb(entries) writes a JSON Lines source and returns the loaded index."""
+    import snp_kb
+
+    def make(entries, name="kb"):
+        source = tmp_path / f"{name}.jsonl"
+        with open(source, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        index = snp_kb.compile_index(str(source), str(tmp_path / f"{name}.idx"))
+        return snp_kb.SnpKnowledgeBase(index)
+
+    return make
@@ -0,0 +1,28 @@
+import pytest
+
+from analysis_cache import cache_key, normalize_query
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Headache, fever!", "headache   fever"),
+    ("I have headache fever", "headache fever"),
+    ("Please analyze: sore throat", "sore throat"),
+    ("I've got a rash", "a rash"),
+])
+def test_equivalent_queries_share_a_key(a, b):
+    assert normalize_query(a) == normalize_query(b)
+    assert cache_key(a) == cache_key(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("pain in leg, swelling in arm", "swelling in leg, pain in arm"),
+    ("headache", "headache headache"),
+    ("no fever but cough", "fever but no cough"),
+    ("i have a rash", "a rash i have"),
+])
+def test_different_queries_get_different_keys(a, b):
+    assert cache_key(a) != cache_key(b)
+
+
+def test_filler_is_only_stripped_at_the_start():
+    assert normalize_query("cough, please help") == "cough please help"
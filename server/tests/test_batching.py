@@ -0,0 +1,64 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+
+
+class Model:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, batch):
+        if self.gate is not None:
+            self.gate.wait()
+        self.calls.append(len(batch))
+        return batch * 10
+
+
+def test_concurrent_inputs_share_a_call_and_get_their_own_row():
+    gate = threading.Event()
+    model = Model(gate)
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(np.array([i])) for i in range(10)]
+    gate.set()
+    assert [int(f.result(5)[0]) for f in futures] == [i * 10 for i in range(10)]
+    assert max(model.calls) <= 4 and sum(model.calls) == 10
+    assert len(model.calls) < 10
+    assert batcher.stats()["items"] == 10 and batcher.stats()["batches"] == len(model.calls)
+    batcher.close()
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    def broken(batch):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(broken, max_wait_ms=20)
+    futures = [batcher.submit(np.zeros(2)) for _ in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model failed"):
+            future.result(5)
+    batcher.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_worker_restarts_in_a_forked_child():
+    batcher = MicroBatcher(Model(), max_wait_ms=1)
+    assert batcher.predict(np.array([1]), timeout=5)[0] == 10  # worker thread started in the parent
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # child: the parent's worker thread doesn't exist here
+        try:
+            ok = batcher.predict(np.array([2]), timeout=5)[0] == 20
+        except Exception:
+            ok = False
+        os.write(write, b"1" if ok else b"0")
+        os._exit(0)
+    os.close(write)
+    assert os.read(read, 1) == b"1"
+    os.waitpid(pid, 0)
+    assert batcher.predict(np.array([3]), timeout=5)[0] == 30
+    batcher.close()
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import cache
+from cache import DiskCache, LRUCache, TieredCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1  # "b" is now the oldest
+    lru.put("c", 3)
+    assert lru.get("b") is None and lru.get("a") == 1 and lru.get("c") == 3
+    assert lru.stats()["evictions"] == 1
+
+
+def test_lru_byte_bound():
+    lru = LRUCache(max_bytes=10, sizeof=len)
+    assert lru.put("a", "xxxx") and lru.put("b", "yyyy")
+    assert not lru.put("huge", "z" * 11)  # never fits; nothing is evicted for it
+    assert len(lru) == 2
+    lru.put("a", "xxxxxx")  # replacing counts only the new size
+    assert lru.current_bytes == 10
+    lru.put("c", "c")
+    assert lru.get("b") is None and lru.current_bytes == 7
+
+
+def test_lru_ttl(clock):
+    lru = LRUCache(ttl=5)
+    lru.put("a", 1)
+    clock[0] += 4.9
+    assert lru.get("a") == 1
+    clock[0] += 0.2
+    assert lru.get("a") is None
+    assert lru.stats()["expirations"] == 1 and len(lru) == 0
+
+
+def fill(disk, keys, value="x" * 100):
+    for i, key in enumerate(keys):
+        disk.put(key, value)
+        os.utime(disk._path(key), ns=(i * 10**9, i * 10**9))  # oldest first
+
+
+def test_disk_cache_evicts_oldest_down_to_low_water(tmp_path):
+    size = len(b'"' + b"x" * 100 + b'"')
+    disk = DiskCache(str(tmp_path), max_bytes=size * 10)
+    fill(disk, [f"k{i}" for i in range(10)])
+    assert disk.evictions == 0 and disk.current_bytes == size * 10
+    disk.put("new", "x" * 100)
+    # Over the limit: the oldest go until the total is at most 90% of max_bytes.
+    assert disk.current_bytes <= disk.max_bytes * DiskCache.LOW_WATER
+    assert disk.evictions == 2
+    assert disk.get("k0") is None and disk.get("k1") is None
+    assert disk.get("k2") == "x" * 100 and disk.get("new") == "x" * 100
+
+
+def test_disk_cache_walks_only_when_over_the_limit(tmp_path, monkeypatch):
+    disk = DiskCache(str(tmp_path), max_bytes=10_000)
+    walks = []
+    files = disk._files
+    monkeypatch.setattr(disk, "_files", lambda: walks.append(1) or files())
+    for _ in range(50):
+        disk.put("same", "x" * 300)  # overwrites don't grow the total
+    assert walks == [] and disk.current_bytes == 302
+    for i in range(100):
+        disk.put(f"k{i}", "x" * 300)
+    assert 0 < len(walks) < 20
+    assert disk.current_bytes == sum(os.path.getsize(p) for p, _, _ in files())
+
+
+def test_disk_cache_survives_restart_and_rejects_oversized(tmp_path):
+    disk = DiskCache(str(tmp_path), max_bytes=1000)
+    disk.put("a", {"x": 1})
+    assert not disk.put("big", "x" * 2000)
+    reopened = DiskCache(str(tmp_path), max_bytes=1000)
+    assert reopened.get("a") == {"x": 1} and reopened.current_bytes == disk.current_bytes
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    disk = DiskCache(str(tmp_path))
+    disk.put("a", [1, 2])
+    tiered = TieredCache(LRUCache(max_entries=4), disk)
+    assert tiered.get("a") == [1, 2]
+    stats = tiered.stats()
+    assert stats["hits"] == 1 and stats["memory"]["misses"] == 1 and stats["disk"]["hits"] == 1
+    assert tiered.memory.get("a") == [1, 2]
+
+
+def test_file_version_follows_content(tmp_path):
+    path = tmp_path / "model.bin"
+    path.write_bytes(b"v1")
+    version = cache.file_version(str(path))
+    path.write_bytes(b"v2")
+    assert cache.file_version(str(path)) != version
@@ -0,0 +1,50 @@
+import pytest
+
+from chat_stream import JSONStreamParser
+
+ANSWER = ('```json\n{"possible_conditions":[{"condition":"Migraine"},{"condition":"Tension headache"}],'
+          '"empty":[],"general_advice":"rest, \\"fluids\\" {not a brace}","nested":{"x":[1]}}\n```')
+
+
+def feed_all(parser, text, piece=1):
+    events = []
+    for i in range(0, len(text), piece):
+        events += parser.feed(text[i:i + piece])
+    return events
+
+
+@pytest.mark.parametrize("piece", [1, 3, 17, len(ANSWER)])
+def test_events_do_not_depend_on_how_the_text_is_split(piece):
+    parser = JSONStreamParser()
+    events = feed_all(parser, ANSWER, piece)
+    assert events == [
+        ("item", "possible_conditions", {"condition": "Migraine"}),
+        ("item", "possible_conditions", {"condition": "Tension headache"}),
+        ("field", "general_advice", 'rest, "fluids" {not a brace}'),
+        ("field", "nested", {"x": [1]}),
+    ]
+    assert parser.done
+    assert parser.result()["empty"] == []
+
+
+def test_incomplete_result():
+    parser = JSONStreamParser()
+    parser.feed('{"general_advice": "re')
+    assert not parser.done
+    with pytest.raises(ValueError):
+        parser.result()
+
+
+def test_text_after_the_object_is_ignored():
+    parser = JSONStreamParser()
+    feed_all(parser, '{"a": 1} {"b": 2}')
+    assert parser.result() == {"a": 1}
+
+
+def test_started_once_any_text_is_fed():
+    parser = JSONStreamParser()
+    assert not parser.started
+    parser.feed("")
+    assert not parser.started
+    parser.feed("```json\n")
+    assert parser.started and not parser.done
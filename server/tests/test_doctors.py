@@ -0,0 +1,90 @@
+import importlib.util
+import multiprocessing
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import doctors
+from doctors import DOCTORS_DATABASE, DoctorDirectory
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "chatbot", "app.py")
+
+
+def open_directory(path):
+    DoctorDirectory(path)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_processes_starting_together_seed_once(tmp_path):
+    path = str(tmp_path / "doctors.sqlite3")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=open_directory, args=(path,)) for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+    directory = DoctorDirectory(path)
+    assert len(directory) == len(DOCTORS_DATABASE) and directory.version == 1
+
+
+def test_cursor_pages_cover_the_listing_once(tmp_path):
+    directory = DoctorDirectory(str(tmp_path / "doctors.sqlite3"))
+    for sort in doctors.SORTS:
+        everything, _ = directory.search(sort=sort, limit=doctors.MAX_PAGE)
+        paged, cursor = [], None
+        while True:
+            page, cursor = directory.search(sort=sort, limit=3, cursor=cursor)
+            paged += page
+            if cursor is None:
+                break
+        assert paged == everything and len(paged) == len(DOCTORS_DATABASE), sort
+    with pytest.raises(ValueError, match="invalid cursor"):
+        directory.search(cursor="not-a-cursor")
+
+
+@pytest.fixture(scope="module")
+def chatbot_app():
+    spec = importlib.util.spec_from_file_location("chatbot_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def client(chatbot_app, tmp_path, monkeypatch):
+    directory = DoctorDirectory(str(tmp_path / "doctors.sqlite3"))
+    monkeypatch.setattr(chatbot_app, "directory", directory)
+    client = TestClient(chatbot_app.app)
+    client.directory = directory
+    return client
+
+
+def test_doctors_endpoint_pages_with_next_cursor(client):
+    first = client.get("/doctors", params={"sort": "experience", "limit": 4})
+    assert first.status_code == 200 and len(first.json()) == 4
+    cursor = first.headers["X-Next-Cursor"]
+    assert 'rel="next"' in first.headers["Link"] and f"cursor={cursor}" in first.headers["Link"]
+    second = client.get("/doctors", params={"sort": "experience", "limit": 4, "cursor": cursor})
+    assert not {d["name"] for d in first.json()} & {d["name"] for d in second.json()}
+    assert client.get("/doctors", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_doctors_endpoint_etag(client):
+    first = client.get("/doctors?specialization=Cardiology&sort=name")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"') and first.headers["Cache-Control"] == "no-cache"
+    # Parameter order doesn't change the tag; W/ and lists are accepted in If-None-Match.
+    again = client.get("/doctors?sort=name&specialization=Cardiology", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["ETag"] == etag and not again.content
+    assert client.get("/doctors?sort=name&specialization=Cardiology",
+                      headers={"If-None-Match": f'"x", {etag.removeprefix("W/")}'}).status_code == 304
+    other = client.get("/doctors", params={"specialization": "Neurology"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+
+    client.directory.import_doctors([{"name": "Dr. Etag Test", "specialization": "Cardiology",
+                                       "experience": "1 year", "contact": "555-0000"}])
+    changed = client.get("/doctors?specialization=Cardiology&sort=name", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert "Dr. Etag Test" in {d["name"] for d in changed.json()}
@@ -0,0 +1,50 @@
+import io
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import gateway
+
+GENOME = b"rs9939609 AA\n"
+
+
+@pytest.fixture
+def client():
+    # Not entered as a context manager: no lifespan, so nothing is preloaded.
+    return TestClient(gateway.app)
+
+
+def test_services_load_on_first_request_and_report_ready(client):
+    assert client.get("/ready/nope").status_code == 404
+    if gateway.SERVICES["gene"].state != "ready":
+        assert client.get("/ready/gene").status_code == 503
+    response = client.post("/gene/api/analyze-genome", files={"file": ("g.txt", GENOME)})
+    assert response.status_code == 200
+    assert client.get("/ready/gene").json()["status"] == "ready"
+    statuses = client.get("/ready")
+    assert statuses.json()["gene"]["load_s"] is not None
+    assert statuses.status_code == (200 if all(s.state == "ready" for s in gateway.SERVICES.values()) else 503)
+
+
+def test_aliases_reach_the_same_service(client):
+    prefixed = client.post("/gene/api/analyze-genome", files={"file": ("g.txt", GENOME)}).json()
+    alias = client.post("/api/analyze-genome", files={"file": ("g.txt", GENOME)}).json()
+    assert alias == prefixed and alias["results"][0]["rsid"] == "rs9939609"
+    assert client.post("/api/chat", json={}).status_code == 400  # chatbot.py's own validation
+    assert client.get("/").json()["ready"] == "/ready"
+
+
+def test_failed_service_answers_503_with_its_error():
+    app = FastAPI()
+    service = gateway.LazyService("broken", "no_such_module_for_gateway_test")
+    app.mount("/broken", service)
+    response = TestClient(app).get("/broken/anything")
+    assert response.status_code == 503 and response.headers["Retry-After"] == "5"
+    assert service.state == "failed" and "ModuleNotFoundError" in response.json()["error"]
+
+
+def test_metrics_cover_mounted_services(client):
+    client.post("/api/analyze-genome", files={"file": ("g.txt", GENOME)})
+    text = client.get("/metrics").text
+    assert 'medease_request_seconds_count{service="gene",endpoint="/api/analyze-genome"' in text
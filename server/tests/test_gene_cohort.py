@@ -0,0 +1,28 @@
+import csv
+import sys
+
+import gene_cohort
+
+
+def test_part_names_do_not_collide(tmp_path):
+    paths = {gene_cohort.part_path(str(tmp_path), sample) for sample in ("a/b", "a_b", "a:b", "A_b")}
+    assert len(paths) == 4
+
+
+def test_cohort_run_writes_long_and_wide_tables(tmp_path, monkeypatch):
+    genomes = tmp_path / "genomes"
+    genomes.mkdir()
+    (genomes / "s1.txt").write_text("rs9939609 AA\nrs1 CC\n")
+    (genomes / "s2.txt").write_text("rs9939609\t16\t53786615\tAT\n")
+    out = tmp_path / "out"
+    monkeypatch.setattr(sys, "argv", ["gene_cohort.py", str(genomes), "--out", str(out), "--workers", "2"])
+    gene_cohort.main()
+
+    with open(out / "cohort.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["sample"], row["rsid"], row["category"]) for row in rows] == [
+        ("s1", "rs9939609", "homozygous_risk"), ("s2", "rs9939609", "heterozygous")]
+    with open(out / "cohort_wide.csv", newline="") as f:
+        wide = list(csv.reader(f))
+    assert wide[0] == ["rsid", "gene", "s1:category", "s1:risk_factor", "s2:category", "s2:risk_factor"]
+    assert wide[1][:3] == ["rs9939609", "FTO", "homozygous_risk"] and wide[1][4] == "heterozygous"
@@ -0,0 +1,88 @@
+import io
+import time
+
+import pytest
+
+import gene
+import genome_analysis
+import snp_kb
+from conftest import annotation
+
+GENOME = b"rs1 AA\nrs2\t1\t5\tCG\nrs3 TT\nrs2 GG\n"
+
+
+@pytest.fixture(autouse=True)
+def kb(make_kb, monkeypatch):
+    kb = make_kb([annotation("rs1", "ONE"), annotation("rs2", "TWO", "C", "G")])
+    monkeypatch.setattr(genome_analysis, "SNP_KB", kb)
+    monkeypatch.setattr(snp_kb, "is_stale", lambda *args: False)
+    gene.RESULT_CACHE.clear()
+    return kb
+
+
+@pytest.fixture
+def client():
+    return gene.app.test_client()
+
+
+def upload(client, path, data=GENOME, query=""):
+    return client.post(path + query, data={"file": (io.BytesIO(data), "genome.txt")},
+                       content_type="multipart/form-data")
+
+
+def wait_for(client, location):
+    for _ in range(200):
+        view = client.get(location).get_json()
+        if view["status"] in ("done", "error"):
+            return view
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_in_the_background_and_is_cached(client):
+    expected = genome_analysis.analyze_stream(io.BytesIO(GENOME))
+    response = upload(client, "/api/analyze-genome/jobs")
+    assert response.status_code == 202
+    assert response.get_json()["total_lines"] == 4
+    view = wait_for(client, response.headers["Location"])
+    assert view["status"] == "done" and view["progress"] == 1.0 and view["lines_processed"] == 4
+    assert view["results"] == expected
+
+    hits = gene.RESULT_CACHE.stats()["hits"]
+    again = upload(client, "/api/analyze-genome/jobs")
+    assert again.status_code == 200 and again.get_json()["results"] == expected
+    assert gene.RESULT_CACHE.stats()["hits"] == hits + 1
+    assert upload(client, "/api/analyze-genome").get_json()["results"] == expected
+
+
+def test_job_errors(client):
+    assert client.get("/api/analyze-genome/jobs/nope").status_code == 404
+    assert client.post("/api/analyze-genome/jobs").status_code == 400
+
+
+def test_new_index_invalidates_cached_results(client, make_kb, monkeypatch):
+    upload(client, "/api/analyze-genome")
+    assert len(gene.RESULT_CACHE) == 1
+    newer = make_kb([annotation("rs1", "ONE", risk_factor=3.0)], name="newer")
+    monkeypatch.setattr(snp_kb, "is_stale", lambda *args: True)
+    monkeypatch.setattr(snp_kb, "load", lambda *args: newer)
+    results = upload(client, "/api/analyze-genome").get_json()["results"]
+    assert genome_analysis.SNP_KB is newer
+    assert [r["gene"] for r in results] == ["ONE"] and results[0]["risk_factor"] == 3.0
+
+
+@pytest.mark.parametrize("query", ["", "?stream=1"])
+def test_results_are_not_cached_if_the_index_changes_mid_analysis(client, make_kb, monkeypatch, query):
+    newer = make_kb([annotation("rs1", "ONE", risk_factor=3.0)], name="newer")
+    analyze = genome_analysis.iter_analysis
+
+    def refreshed_midway(stream, progress=None):
+        for batch in analyze(stream, progress):
+            yield batch
+            genome_analysis.SNP_KB = newer  # as refresh_kb would from another request
+
+    monkeypatch.setattr(genome_analysis, "iter_analysis", refreshed_midway)
+    response = upload(client, "/api/analyze-genome", query=query)
+    assert response.status_code == 200
+    response.get_data()  # run the stream to the end
+    assert len(gene.RESULT_CACHE) == 0
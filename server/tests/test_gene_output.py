@@ -0,0 +1,80 @@
+import io
+import json
+
+import pytest
+
+import gene
+import genome_analysis
+import snp_kb
+from conftest import annotation
+
+GENOME = b"rs1 AA\nrs2 CG\nrs1 AT\nrs9 GG\nrs1 AA\nrs2 CC\n"
+
+
+@pytest.fixture(autouse=True)
+def kb(make_kb, monkeypatch):
+    kb = make_kb([annotation("rs1", "ONE"), annotation("rs2", "TWO", "C", "G")])
+    monkeypatch.setattr(genome_analysis, "SNP_KB", kb)
+    monkeypatch.setattr(snp_kb, "is_stale", lambda *args: False)
+    gene.RESULT_CACHE.clear()
+
+
+@pytest.fixture
+def client():
+    return gene.app.test_client()
+
+
+def post(client, query="", headers=None):
+    return client.post("/api/analyze-genome" + query, data={"file": (io.BytesIO(GENOME), "genome.txt")},
+                       content_type="multipart/form-data", headers=headers or {})
+
+
+def expand(annotations, rows):
+    return [{**{k: v for k, v in row.items() if k != "annotation"}, **annotations[row["annotation"]]} for row in rows]
+
+
+def same_reports(a, b):
+    key = lambda r: json.dumps(r, sort_keys=True)
+    return [key(r) for r in a] == [key(r) for r in b]
+
+
+def test_compact_response_deduplicates_annotations(client):
+    full = post(client).get_json()["results"]
+    compact = post(client, "?compact=1").get_json()
+    assert len(compact["results"]) == len(full) == 5
+    assert len(compact["annotations"]) == 4  # (ONE, TWO) x the categories that occur
+    assert set(compact["results"][0]) == {"rsid", "genotype", "category", "risk_factor", "annotation"}
+    assert same_reports(expand(compact["annotations"], compact["results"]), full)
+
+
+@pytest.mark.parametrize("query, headers", [("?stream=1", None), ("", {"Accept": "application/x-ndjson"})])
+def test_ndjson_stream(client, query, headers):
+    full = post(client).get_json()["results"]
+    response = post(client, query, headers)
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1] == {"type": "end", "count": 5}
+    assert same_reports([{k: v for k, v in line.items() if k != "type"} for line in lines[:-1]], full)
+
+
+def test_compact_ndjson_sends_each_annotation_before_its_first_use(client):
+    full = post(client).get_json()["results"]
+    annotations, rows = {}, []
+    for line in post(client, "?stream=1&compact=1").get_data(as_text=True).splitlines():
+        event = json.loads(line)
+        if event.pop("type") == "annotation":
+            annotations[event.pop("id")] = event
+        elif "rsid" in event:
+            assert event["annotation"] in annotations
+            rows.append(event)
+    assert len(annotations) == 4
+    assert same_reports(expand(annotations, rows), full)
+
+
+def test_ndjson_reports_errors_in_band():
+    def failing():
+        yield [{"rsid": "rs1"}]
+        raise ValueError("bad file")
+
+    lines = [json.loads(line) for line in gene.ndjson_lines(failing())]
+    assert lines == [{"type": "result", "rsid": "rs1"}, {"type": "error", "error": "bad file"}]
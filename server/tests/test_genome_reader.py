@@ -0,0 +1,48 @@
+import io
+
+import pytest
+
+from genome_reader import GenomeReader
+
+GENOME = (
+    b"# This data file generated by 23andMe\n"
+    b"# rsid\tchromosome\tposition\tgenotype\n"
+    b"rs1 AA\n"
+    b"\n"
+    b"rs2\t16\t53786615\tAT\n"
+    b"rsid\tchromosome\tposition\tallele1\tallele2\n"
+    b"rs3\t1\t100\tC\tG\r\n"
+    b"rs4 1 2 3 4 5 6\n"  # unknown layout
+    b"rs5 --\n"
+    b"i6000001\t1\t5\tDI\n"
+    b"rs6 T"  # no trailing newline
+)
+PAIRS = [("rs1", "AA"), ("rs2", "AT"), ("rs3", "CG"), ("rs5", "--"), ("i6000001", "DI"), ("rs6", "T")]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 16])
+def test_layouts_whatever_the_chunk_boundaries(chunk_size):
+    reader = GenomeReader(io.BytesIO(GENOME), chunk_size=chunk_size)
+    assert list(reader) == PAIRS
+    assert reader.bytes_read == len(GENOME)
+    assert reader.lines_read == GENOME.count(b"\n") + 1
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+@pytest.mark.parametrize("size", [1, 4, 65536])
+def test_batches_match_iteration(chunk_size, size):
+    batches = list(GenomeReader(io.BytesIO(GENOME), chunk_size=chunk_size).batches(size))
+    assert all(len(rsids) == len(genotypes) <= size for rsids, genotypes in batches)
+    pairs = [(r.decode(), g.decode()) for rsids, genotypes in batches for r, g in zip(rsids, genotypes)]
+    assert pairs == PAIRS
+
+
+def test_keep_filters_both_paths():
+    keep = {"rs2", "rs6"}.__contains__
+    assert list(GenomeReader(io.BytesIO(GENOME), chunk_size=5, keep=keep)) == [("rs2", "AT"), ("rs6", "T")]
+    (rsids, genotypes), = GenomeReader(io.BytesIO(GENOME), keep=keep).batches()
+    assert rsids == [b"rs2", b"rs6"] and genotypes == [b"AT", b"T"]
+
+
+def test_text_streams_are_accepted():
+    assert list(GenomeReader(io.StringIO("rs1 AA\nrs2 1 2 CT\n"))) == [("rs1", "AA"), ("rs2", "CT")]
@@ -0,0 +1,67 @@
+import io
+import random
+
+import pytest
+
+import genome_analysis
+from conftest import annotation
+from genome_reader import GenomeReader
+
+ALLELES = [("A", "T"), ("C", "G"), ("I", "D"), ("AT", "A"), ("G", "A"), ("T", "C")]
+GENOTYPES = ["AA", "AT", "TA", "TT", "CC", "CG", "GG", "AG", "GA", "--", "A", "T", "C", "G", "D", "I",
+             "II", "DI", "ID", "DD", "ATA", "AAT", "0", "NC", "é"]
+
+
+def synthetic_genome(seed, lines=3000):
+    """Mixed layouts, comments, headers, blank and malformed lines, no-calls, indels and hemizygous calls."""
+    rng = random.Random(seed)
+    out = ["# generated for the parity test"]
+    for _ in range(lines):
+        rsid = f"rs{rng.randrange(1, 10)}" if rng.random() < 0.5 else f"rs{rng.randrange(10, 10**6)}"
+        genotype = rng.choice(GENOTYPES)
+        layout = rng.random()
+        if layout < 0.02:
+            out.append(rng.choice(["", "# comment", "rsid\tchromosome\tposition\tallele1\tallele2", "garbage"]))
+        elif layout < 0.4:
+            out.append(f"{rsid} {genotype}")
+        elif layout < 0.8:
+            out.append(f"{rsid}\t1\t{rng.randrange(10**6)}\t{genotype}")
+        else:
+            first, second = (genotype[0], genotype[1:] or "-") if len(genotype) > 1 else (genotype, "-")
+            out.append(f"{rsid}\t1\t{rng.randrange(10**6)}\t{first}\t{second}")
+    return "\n".join(out).encode()
+
+
+@pytest.fixture(autouse=True)
+def kb(make_kb, monkeypatch):
+    entries = [annotation(f"rs{i + 1}", f"GENE{i + 1}", risk, normal) for i, (risk, normal) in enumerate(ALLELES)]
+    monkeypatch.setattr(genome_analysis, "SNP_KB", make_kb(entries))
+
+
+def per_line(data):
+    reports = [genome_analysis.interpret_snp(rsid, genotype) for rsid, genotype in GenomeReader(io.BytesIO(data))]
+    return [report for report in reports if report is not None]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("chunk_size, batch_size", [(1 << 16, 65536), (97, 13)])
+def test_batch_path_matches_per_line_path(seed, chunk_size, batch_size):
+    data = synthetic_genome(seed)
+    batched = []
+    for rsids, genotypes in GenomeReader(io.BytesIO(data), chunk_size=chunk_size).batches(batch_size):
+        batched += genome_analysis.interpret_batch(rsids, genotypes)
+    expected = per_line(data)
+    assert len(expected) > 100
+    assert batched == expected
+
+
+def test_every_category_is_exercised():
+    categories = {report["category"] for report in per_line(synthetic_genome(0))}
+    assert categories == {"homozygous_risk", "heterozygous", "normal"}
+
+
+def test_str_and_bytes_inputs_agree():
+    rsids, genotypes = ["rs1", "rs2", "rs404", "rs3", "rs4"], ["AT", "GG", "AA", "DI", "ATA"]
+    assert (genome_analysis.interpret_batch(rsids, genotypes)
+            == genome_analysis.interpret_batch([r.encode() for r in rsids], [g.encode() for g in genotypes])
+            == [genome_analysis.interpret_snp(r, g) for r, g in zip(rsids, genotypes) if r != "rs404"])
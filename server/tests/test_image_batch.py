@@ -0,0 +1,106 @@
+import importlib
+import io
+import zipfile
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import imageprep
+
+
+class Upload(io.BytesIO):
+    def __init__(self, data, filename, mimetype=None):
+        super().__init__(data)
+        self.filename = filename
+        self.mimetype = mimetype
+
+
+def jpeg(seed, size=(64, 48)):
+    pixels = np.random.default_rng(seed).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def archive(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        for name, data in members:
+            if name.endswith("/"):
+                z.mkdir(name)
+            else:
+                z.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_read_batch_expands_zips_in_order():
+    study = archive([("scans/", b""), ("scans/a.jpg", jpeg(1)), ("scans/.hidden", b"x"),
+                     ("__MACOSX/scans/._a.jpg", b"x"), ("scans/b.jpg", jpeg(2))])
+    uploads = imageprep.read_batch([Upload(jpeg(0), "first.jpg"), Upload(study, "study.zip"), Upload(jpeg(3), "")])
+    assert [name for name, _ in uploads] == ["first.jpg", "scans/a.jpg", "scans/b.jpg", "image-3"]
+    assert uploads[1][1] == jpeg(1)
+
+
+def test_read_batch_limits():
+    with pytest.raises(imageprep.ImageRejected, match="Too many images"):
+        imageprep.read_batch([Upload(jpeg(i), f"{i}.jpg") for i in range(3)], max_images=2)
+    with pytest.raises(imageprep.ImageRejected, match="Too many images"):
+        imageprep.read_batch([Upload(archive([(f"{i}.jpg", b"x") for i in range(3)]), "s.zip")], max_images=2)
+
+    uploads = imageprep.read_batch([Upload(archive([("big.jpg", b"x" * 50), ("ok.jpg", b"x")]), "s.zip"),
+                                    Upload(b"x" * 50, "big.jpg"), Upload(b"PK\x03\x04junk", "bad.zip")],
+                                   max_bytes=20)
+    errors = {name: str(data) for name, data in uploads if isinstance(data, Exception)}
+    assert set(errors) == {"big.jpg", "bad.zip"} and len(uploads) == 4
+    assert errors["bad.zip"] == "Invalid zip archive"
+
+
+@pytest.fixture(scope="module")
+def xray(tmp_path_factory):
+    """xray.py with a randomly initialized model (the trained weights aren't in the repo)."""
+    torch = pytest.importorskip("torch")
+    import xray_serving
+
+    weights = tmp_path_factory.mktemp("xray") / "weights.pth"
+    torch.manual_seed(0)
+    torch.save(xray_serving.build_model(None).state_dict(), weights)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("XRAY_WARMUP", "0")
+        mp.setattr(xray_serving, "WEIGHTS_PATH", str(weights))
+        mp.setattr(xray_serving.build_model, "__defaults__", (str(weights),))
+        yield importlib.import_module("xray")
+
+
+def post_batch(client, files):
+    return client.post("/api/predict/batch", data={"files": files}, content_type="multipart/form-data")
+
+
+def test_xray_batch_matches_single_predictions(xray, monkeypatch):
+    xray.prediction_cache.clear()
+    monkeypatch.setattr(xray, "BATCH_SIZE", 2)  # several forward passes
+    client = xray.app.test_client()
+    images = [jpeg(i, (300, 200)) for i in range(3)]
+    study = archive([("a.jpg", images[1]), ("broken.jpg", b"not an image")])
+    results = post_batch(client, [(io.BytesIO(images[0]), "0.jpg"), (io.BytesIO(study), "study.zip"),
+                                  (io.BytesIO(images[2]), "2.jpg")]).get_json()["results"]
+    assert [r["filename"] for r in results] == ["0.jpg", "a.jpg", "broken.jpg", "2.jpg"]
+    assert "error" in results[2] and "prediction" not in results[2]
+
+    xray.prediction_cache.clear()
+    for result, data in zip([results[0], results[1], results[3]], images):
+        single = client.post("/api/predict", data={"file": (io.BytesIO(data), "x.jpg")},
+                             content_type="multipart/form-data").get_json()
+        assert single["prediction"] == result["prediction"]
+        assert single["confidence"] == pytest.approx(result["confidence"], rel=1e-4)
+
+
+def test_xray_batch_uses_the_prediction_cache(xray):
+    xray.prediction_cache.clear()
+    client = xray.app.test_client()
+    first = post_batch(client, [(io.BytesIO(jpeg(7)), "a.jpg")]).get_json()["results"]
+    hits = xray.prediction_cache.stats()["hits"]
+    again = post_batch(client, [(io.BytesIO(jpeg(7)), "b.jpg")]).get_json()["results"]
+    assert xray.prediction_cache.stats()["hits"] == hits + 1
+    assert again[0]["prediction"] == first[0]["prediction"]
+    assert post_batch(client, []).status_code == 400
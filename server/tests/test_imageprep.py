@@ -0,0 +1,89 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, JpegImagePlugin
+
+import imageprep
+
+
+def encode(size, fmt="JPEG", mode="RGB", seed=0):
+    rng = np.random.default_rng(seed)
+    # Smooth content, so a reduced-scale decode should closely match a full one.
+    y, x = np.mgrid[0:size[1], 0:size[0]]
+    pixels = np.stack([x * 255 // size[0], y * 255 // size[1], (x + y) * 127 // sum(size)], axis=-1)
+    pixels = (pixels + rng.integers(0, 8, pixels.shape)).clip(0, 255).astype(np.uint8)
+    image = Image.fromarray(pixels).convert(mode)
+    buf = io.BytesIO()
+    image.save(buf, fmt)
+    return buf.getvalue()
+
+
+def test_rejections():
+    with pytest.raises(imageprep.ImageRejected, match="Invalid image"):
+        imageprep.open_image(b"not an image")
+    with pytest.raises(imageprep.ImageRejected, match="Unsupported image format: GIF"):
+        imageprep.open_image(encode((10, 10), "GIF", "P"))
+    with pytest.raises(imageprep.ImageRejected, match="exceeds 100 pixels"):
+        imageprep.open_image(encode((20, 10)), max_pixels=100)
+    with pytest.raises(imageprep.ImageRejected, match="more than 10 bytes"):
+        imageprep.read_upload(io.BytesIO(b"x" * 11), max_bytes=10)
+    assert imageprep.read_upload(io.BytesIO(b"x" * 10), max_bytes=10) == b"x" * 10
+
+
+def test_open_image_reads_only_the_header():
+    image = imageprep.open_image(encode((64, 48)))
+    assert image.size == (64, 48) and image.format == "JPEG"
+    assert image.tile  # not decoded yet: load() empties the tile list
+
+
+def test_large_jpegs_are_decoded_at_reduced_scale(monkeypatch):
+    scales = []
+    draft = JpegImagePlugin.JpegImageFile.draft
+
+    def spy(self, mode, size):
+        result = draft(self, mode, size)
+        scales.append(self.size)
+        return result
+
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", spy)
+    data = encode((1600, 1200))
+    pixels = imageprep.decode_rgb(imageprep.open_image(data), (224, 224))
+    assert pixels.shape == (224, 224, 3) and pixels.dtype == np.uint8
+    assert scales == [(400, 300)]  # 1/4 scale is the smallest still >= 224x224
+
+    full = np.asarray(Image.open(io.BytesIO(data)).convert("RGB").resize((224, 224), Image.BICUBIC))
+    assert np.abs(pixels.astype(int) - full).mean() < 3
+
+
+@pytest.mark.parametrize("fmt, mode", [("PNG", "RGBA"), ("PNG", "L"), ("BMP", "RGB"), ("WEBP", "RGB")])
+def test_other_formats_and_modes(fmt, mode):
+    pixels = imageprep.decode_rgb(imageprep.open_image(encode((300, 200), fmt, mode)), (180, 180))
+    assert pixels.shape == (180, 180, 3)
+
+
+def test_normalization_matches_float64_reference():
+    pixels = np.random.default_rng(1).integers(0, 256, (5, 7, 3), dtype=np.uint8)
+    mean, std = [0.485, 0.456, 0.406], [0.229, 0.224, 0.225]
+
+    unit = imageprep.scale_to_unit(pixels)
+    assert unit.dtype == np.float32
+    np.testing.assert_allclose(unit, pixels / 255.0, rtol=1e-6)
+
+    out = np.empty((3, 5, 7), dtype=np.float32)
+    chw = imageprep.normalize_chw(pixels, mean, std, out=out)
+    assert chw is out
+    reference = ((pixels / 255.0 - mean) / std).transpose(2, 0, 1)
+    np.testing.assert_allclose(chw, reference, rtol=1e-5, atol=1e-5)
+
+
+def test_prepare_batch_keeps_errors_in_their_slots():
+    uploads = [("a.jpg", encode((50, 40))), ("b.txt", b"nope"), ("c", imageprep.ImageRejected("too big"))]
+    out = np.zeros((3, 8, 8, 3), dtype=np.float32)
+
+    def prepare(image, out):
+        return imageprep.scale_to_unit(imageprep.decode_rgb(image, (8, 8)), out=out)
+
+    results = imageprep.prepare_batch(uploads, prepare, out=out)
+    assert results[0] is not None and out[0].any() and not out[1].any()
+    assert isinstance(results[1], imageprep.ImageRejected) and str(results[2]) == "too big"
@@ -0,0 +1,31 @@
+import medical_prompt
+from doctors import directory
+
+
+def result(*specialties):
+    return {"possible_conditions": [{"condition": s, "recommended_specialist": s} for s in specialties]}
+
+
+def names(doctors):
+    return {doctor["name"] for doctor in doctors}
+
+
+def test_specialties_after_general_practice_are_kept():
+    doctors = medical_prompt.attach_doctors(result("Cardiology", "General Practice", "Neurology"))["recommended_doctors"]
+    for specialty in ("Cardiology", "General Practice", "Neurology"):
+        assert names(directory.find(specialty, 1)) <= names(doctors), specialty
+
+
+def test_doctors_are_unique_and_capped():
+    specialties = directory.specializations()
+    doctors = medical_prompt.attach_doctors(result(*specialties, *specialties))["recommended_doctors"]
+    assert len(doctors) == medical_prompt.MAX_DOCTORS
+    assert len(names(doctors)) == len(doctors)
+
+
+def test_fallback_only_when_nothing_matched():
+    fallback = names(directory.find(medical_prompt.FALLBACK_SPECIALTY, medical_prompt.DOCTORS_PER_SPECIALTY))
+    assert names(medical_prompt.attach_doctors(result())["recommended_doctors"]) == fallback
+    assert names(medical_prompt.attach_doctors(result("Astrology"))["recommended_doctors"]) == fallback
+    doctors = medical_prompt.attach_doctors(result("Dermatology"))["recommended_doctors"]
+    assert not fallback & names(doctors)
@@ -0,0 +1,100 @@
+import re
+
+import pytest
+from flask import Flask, jsonify
+
+import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("t_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(("decode",), seconds)
+    histogram.observe(("a \"quoted\"\nstage",), 0.1)  # on the bound: counts as <= 0.1
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP t_seconds Test.", "# TYPE t_seconds histogram"]
+    assert 't_seconds_bucket{stage="a \\"quoted\\"\\nstage",le="0.1"} 1' in lines
+    assert lines[-5:] == [
+        't_seconds_bucket{stage="decode",le="0.1"} 1',
+        't_seconds_bucket{stage="decode",le="1"} 3',
+        't_seconds_bucket{stage="decode",le="+Inf"} 4',
+        't_seconds_sum{stage="decode"} 4.050000',
+        't_seconds_count{stage="decode"} 4',
+    ]
+
+
+def test_gauge_adds_per_label_set():
+    gauge = metrics.Gauge("t_in_flight", "Test.", ("endpoint",))
+    gauge.add(("/b",), 1)
+    gauge.add(("/a",), 2)
+    gauge.add(("/a",), -1)
+    assert gauge.render()[2:] == ['t_in_flight{endpoint="/a"} 1', 't_in_flight{endpoint="/b"} 1']
+
+
+def test_registered_stats_become_contiguous_gauges(monkeypatch):
+    stats = {
+        "hits": 3,
+        "enabled": True,
+        "mode": "lean",
+        "models": {"small-model": {"requests": 2}, "large.model": {"requests": 5}},
+        "disk": {"bytes": 10},
+        "ignored": None,
+    }
+    monkeypatch.setattr(metrics, "collectors", {"test cache": lambda: stats, "broken": lambda: 1 / 0})
+    text = metrics.render()
+    for line in [
+        "medease_test_cache_hits 3",
+        "medease_test_cache_enabled 1",
+        'medease_test_cache_mode{value="lean"} 1',
+        'medease_test_cache_models_requests{key="large.model"} 5',
+        'medease_test_cache_models_requests{key="small-model"} 2',
+        "medease_test_cache_disk_bytes 10",
+    ]:
+        assert line in text.splitlines()
+    assert "ignored" not in text and "broken" not in text
+
+    # Every sample of a metric follows its TYPE line with no other metric in between.
+    seen = set()
+    current = None
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        name = re.match(r"[a-zA-Z_:][a-zA-Z0-9_:]*", line).group()
+        name = re.sub(r"_(bucket|sum|count)$", "", name)
+        if name != current:
+            assert name not in seen, name
+            seen.add(name)
+            current = name
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(metrics, "TIMING_HEADER", True)
+    monkeypatch.setattr(metrics, "_default_service", metrics._default_service)  # instrument() may claim it
+    app = Flask(__name__)
+
+    @app.route("/items/<int:item>")
+    def item(item):
+        with metrics.stage("lookup"):
+            pass
+        return jsonify({"item": item})
+
+    return metrics.instrument(app, "test-service")
+
+
+def test_flask_requests_are_timed_by_rule(app):
+    client = app.test_client()
+    response = client.get("/items/7")
+    assert response.get_json() == {"item": 7}
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("lookup;dur=") and "serialize;dur=" in timing and "total;dur=" in timing
+    client.get("/items/8")
+    client.get("/nope")
+
+    text = client.get("/metrics")
+    assert text.content_type == metrics.CONTENT_TYPE
+    lines = text.get_data(as_text=True).splitlines()
+    assert 'medease_request_seconds_count{service="test-service",endpoint="/items/<int:item>",status="200"} 2' in lines
+    assert 'medease_request_seconds_count{service="test-service",endpoint="unmatched",status="404"} 1' in lines
+    assert 'medease_requests_in_flight{service="test-service",endpoint="/items/<int:item>"} 0' in lines
+    assert any(line.startswith('medease_stage_seconds_count{service="test-service",stage="lookup"}') for line in lines)
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, Deadline, DeadlineExceeded, Unavailable
+
+
+def test_deadline():
+    deadline = Deadline(5)
+    assert 4 < deadline.remaining() <= 5
+    deadline.check(1)
+    with pytest.raises(DeadlineExceeded) as raised:
+        deadline.check(10)
+    assert isinstance(raised.value, TimeoutError) and isinstance(raised.value, Unavailable)
+    assert Deadline(0).remaining() == 0
+
+
+def test_breaker_opens_after_consecutive_upstream_failures():
+    breaker = CircuitBreaker(failures=2, cooldown=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(TimeoutError())
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.rejected == 1 and breaker.opened == 1
+
+
+def test_breaker_ignores_errors_that_are_not_upstream_failures():
+    breaker = CircuitBreaker(failures=1, cooldown=60)
+    breaker.allow()
+    breaker.record(ValueError("bad JSON from the model"))
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failures=1, cooldown=0.01)
+    breaker.allow()
+    breaker.record(TimeoutError())
+    time.sleep(0.02)
+    assert breaker.allow()  # the probe
+    assert breaker.state == "half-open"
+    assert not breaker.allow()
+    breaker.record()
+    assert breaker.state == "closed" and breaker.consecutive == 0
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_and_release_frees_the_probe():
+    breaker = CircuitBreaker(failures=3, cooldown=0.01)
+    for _ in range(3):
+        breaker.allow()
+        breaker.record(TimeoutError())
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.release()  # cancelled probe: another one may go
+    assert breaker.allow()
+    breaker.record(TimeoutError())  # one failure is enough while half-open
+    assert breaker.state == "open"
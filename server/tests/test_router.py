@@ -0,0 +1,80 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import llm
+import router
+
+ANSWER = {
+    "possible_conditions": [{"condition": "Common cold", "likelihood": "high", "description": "A viral infection.",
+                             "general_treatment": "Rest and fluids.", "recommended_specialist": "General Practice"}],
+    "recommended_doctors": [],
+    "general_advice": "Rest.",
+    "disclaimer": "Not medical advice.",
+}
+
+
+@pytest.fixture
+def upstream(monkeypatch, tmp_path):
+    """upstream.calls: models asked, in order; upstream.replies[model]: its answer (exceptions are raised)."""
+    calls = []
+    replies = {}
+
+    async def complete_json(messages, model, temperature, max_tokens, timeout):
+        calls.append(model)
+        reply = replies[model]
+        if isinstance(reply, Exception):
+            raise reply
+        return json.loads(json.dumps(reply))
+
+    monkeypatch.setattr(llm.client, "complete_json", complete_json)
+    monkeypatch.setattr(router, "stats", router.Stats())
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "router.jsonl"))
+    return SimpleNamespace(calls=calls, replies=replies)
+
+
+def analyze(text="runny nose"):
+    return asyncio.run(router.analyze(text, [{"role": "user", "content": text}]))
+
+
+def logged():
+    with open(router.LOG_PATH) as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("invalid", [
+    ["not", "an", "object"],
+    {"possible_conditions": "Common cold"},
+    ValueError("Expecting value: line 1 column 1"),
+])
+def test_invalid_small_model_output_escalates_to_the_large_model(upstream, invalid):
+    upstream.replies.update({router.SMALL_MODEL: invalid, router.LARGE_MODEL: ANSWER})
+    assert analyze()["possible_conditions"] == ANSWER["possible_conditions"]
+    assert upstream.calls == [router.SMALL_MODEL, router.LARGE_MODEL]
+    snapshot = router.stats.snapshot()
+    assert snapshot["escalations"] == 1
+    assert snapshot["models"][router.SMALL_MODEL]["invalid"] == 1
+    assert snapshot["models"][router.LARGE_MODEL]["invalid"] == 0
+    [line] = logged()
+    assert [(a["model"], a["ok"]) for a in line["attempts"]] == [(router.SMALL_MODEL, False), (router.LARGE_MODEL, True)]
+
+
+def test_valid_small_model_output_is_returned(upstream):
+    upstream.replies[router.SMALL_MODEL] = ANSWER
+    analyze()
+    assert upstream.calls == [router.SMALL_MODEL] and router.stats.snapshot()["escalations"] == 0
+
+
+def test_other_errors_and_the_last_model_do_not_escalate(upstream):
+    upstream.replies[router.SMALL_MODEL] = RuntimeError("boom")
+    with pytest.raises(RuntimeError, match="boom"):
+        analyze()
+    assert upstream.calls == [router.SMALL_MODEL]
+
+    upstream.calls.clear()
+    upstream.replies[router.LARGE_MODEL] = {"possible_conditions": []}
+    with pytest.raises(ValueError):
+        analyze("worst headache of my life")  # red flag: large model only
+    assert upstream.calls == [router.LARGE_MODEL] and router.stats.snapshot()["escalations"] == 0
@@ -0,0 +1,80 @@
+import threading
+
+import sessions
+
+ANSWER = {
+    "possible_conditions": [
+        {"condition": "Migraine", "likelihood": "high", "recommended_specialist": "Neurology"},
+        {"condition": "Eye strain", "likelihood": "medium", "recommended_specialist": "Ophthalmology"},
+    ],
+    "general_advice": "Rest in a dark room and drink water. " * 5,
+    "recommended_doctors": [{"name": "Dr. X"}],
+    "disclaimer": "Not medical advice.",
+}
+
+
+def test_history_stays_within_budget(monkeypatch):
+    monkeypatch.setattr(sessions, "HISTORY_TOKENS", 400)
+    monkeypatch.setattr(sessions, "SUMMARY_TOKENS", 120)
+    session = sessions.Session("test-session-0001")
+    for turn in range(40):
+        session.add(f"headache behind my eyes, message {turn}", ANSWER)
+        assert session.history_tokens() <= 400 + 20  # the header lines aren't budgeted exactly
+    assert session.turns and session.summary and session.dropped
+    # The oldest exchange (usually the chief complaint) stays in the summary.
+    assert session.summary[0].startswith('- user: "headache behind my eyes, message 0"')
+    assert "Migraine (high)" in session.summary[0] and "see Neurology, Ophthalmology" in session.summary[0]
+
+
+def test_messages_insert_history_before_the_new_message():
+    session = sessions.Session("test-session-0002")
+    session.add("first question", ANSWER)
+    base = [{"role": "system", "content": "sys"}, {"role": "user", "content": "second question"}]
+    messages = session.messages(base)
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+    assert messages[-1]["content"] == "second question"
+    # Doctors and disclaimer aren't replayed to the model.
+    assert "Dr. X" not in messages[2]["content"] and "disclaimer" not in messages[2]["content"]
+
+
+def test_unknown_ids_are_not_adopted():
+    planted = "A" * 22
+    session = sessions.open_session(planted)
+    assert session.id != planted and session.empty
+    sessions.record(session, "question", ANSWER)
+    assert sessions.open_session(session.id) is session
+    assert sessions.open_session("not valid!").id != "not valid!"
+
+
+def test_concurrent_turns_and_reads_share_a_session(monkeypatch):
+    monkeypatch.setattr(sessions, "HISTORY_TOKENS", 400)
+    monkeypatch.setattr(sessions, "SUMMARY_TOKENS", 120)
+    session = sessions.open_session()
+    turns = sessions.counters["turns"]
+    errors = []
+
+    def write(worker):
+        for turn in range(50):
+            sessions.record(session, f"worker {worker} message {turn}", ANSWER)
+
+    def read():
+        try:
+            for _ in range(200):
+                roles = [m["role"] for m in session.messages([{"role": "user", "content": "new"}])]
+                if roles[0] == "system":
+                    roles = roles[1:]
+                assert roles[:-1] == ["user", "assistant"] * (len(roles) // 2)
+                assert session.history_tokens() <= 400 + 20 and session.size() > 0
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)] + \
+              [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert sessions.counters["turns"] - turns == 200
+    assert sessions.store.get(session.id) is session
+    assert sessions.store.current_bytes >= session.size()
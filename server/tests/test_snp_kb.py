@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+import snp_kb
+from conftest import annotation
+
+
+def test_round_trip(make_kb):
+    entries = [annotation("rs9939609", "FTO", risk_factor=1.67), annotation("rs1801133", "MTHFR"),
+               annotation("rs1801133", "MTHFR2", "C", "G", 2.0)]  # later lines override earlier ones
+    kb = make_kb(entries)
+
+    assert len(kb) == 2
+    for entry in (entries[0], entries[2]):
+        assert kb.get(entry["rsid"]) == {k: v for k, v in entry.items() if k != "rsid"}
+    assert "rs9939609" in kb and "rs1" not in kb and kb.get("rs1") is None
+    assert kb.positions(["rs1801133", "rs1", "rs9939609", "i5"]).tolist() == [0, -1, 1, -1]
+    risk, normal = kb.allele_codes()
+    assert bytes(risk).decode() == "CA" and bytes(normal).decode() == "GT"
+
+
+def test_version_follows_the_source(make_kb, tmp_path):
+    version = make_kb([annotation("rs9939609", "FTO", risk_factor=1.67)]).version
+    source, index = str(tmp_path / "kb.jsonl"), str(tmp_path / "kb.idx")
+    assert not snp_kb.is_stale(source, index)
+
+    make_kb([annotation("rs9939609", "FTO", risk_factor=1.7)])
+    os.utime(source, (os.path.getmtime(index) + 10,) * 2)
+    assert snp_kb.is_stale(source, index)
+    assert snp_kb.load(source, index).version != version
+
+
+def test_rejects_non_rs_identifiers(make_kb):
+    with pytest.raises(ValueError):
+        make_kb([annotation("i6000001", "X")])
@@ -0,0 +1,40 @@
+import pytest
+
+import triage
+
+
+@pytest.mark.parametrize("query", [
+    "headache on one side with numbness",
+    "one side of my body is numb",
+    "my left side feels weak",
+    "tingling down the right side of my face",
+    "half of my face is numb",
+    "weakness in one arm and a headache",
+    "Weakness on one side",
+])
+def test_one_sided_numbness_or_weakness_goes_to_the_model(query):
+    assert triage.model.classify(query) == (None, 0.0, "red_flag")
+    assert triage.answer(query) is None
+
+
+@pytest.mark.parametrize("query, condition", [
+    ("pounding headache on one side", "Migraine"),
+    ("tingling in feet", None),
+    ("numb toes", None),
+])
+def test_similar_wording_without_the_combination_is_still_answered_locally(query, condition):
+    result = triage.answer(query)
+    assert result is not None
+    if condition:
+        assert result["possible_conditions"][0]["condition"] == condition
+
+
+def test_other_red_flags_and_negations():
+    assert triage.model.classify("chest pain and a cough")[2] == "red_flag"
+    assert triage.model.classify("no fever just a cough")[2] == "negation"
+
+
+def test_router_sends_one_sided_numbness_to_the_large_model():
+    import router
+
+    assert router.route("one side of my body is numb")[0] == [router.LARGE_MODEL]
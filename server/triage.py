@@ -0,0 +1,386 @@
+"""Local fast-path triage for simple symptom queries.
+
+Short, single-complaint queries ("itchy rash", "sprained my ankle") map
+clearly onto one condition and specialty, so they are answered in-process
+instead of by the remote model. The classifier is a nearest-neighbour
+TF-IDF model (unigrams and bigrams) over a small curated corpus of
+symptom phrasings per condition, built on the directory's specializations.
+A query is only answered locally when it is confident, which rules out:
+
+    red flags      symptoms that need a careful (or urgent) answer
+    negations      "no fever" reads like "fever" to a bag of words
+    long queries   several complaints at once
+    unknown words  less than TRIAGE_MIN_COVERAGE of the words are in the corpus
+    low scores     similarity times the share of the query's words the condition
+                   accounts for below TRIAGE_THRESHOLD, or a runner-up specialty
+                   within TRIAGE_MARGIN of the best one
+
+Everything else falls back to the LLM. benchmarks/eval_triage.py measures
+agreement with the LLM and the share of traffic answered locally.
+
+    TRIAGE_ENABLED        1 (default) or 0
+    TRIAGE_THRESHOLD      minimum confidence (default 0.45)
+    TRIAGE_MARGIN         minimum lead over the next specialty (default 0.1)
+    TRIAGE_MIN_COVERAGE   minimum share of known words (default 0.6)
+"""
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+import medical_prompt
+import metrics
+
+ENABLED = os.environ.get("TRIAGE_ENABLED", "1") == "1"
+THRESHOLD = float(os.environ.get("TRIAGE_THRESHOLD", 0.45))
+MARGIN = float(os.environ.get("TRIAGE_MARGIN", 0.1))
+MIN_COVERAGE = float(os.environ.get("TRIAGE_MIN_COVERAGE", 0.6))
+MAX_WORDS = 10
+
+DISCLAIMER = ("This is a quick automated assessment, not medical advice. "
+              "Please consult a healthcare professional for a diagnosis.")
+
+# (specialty, condition, description, general treatment, advice, phrasings)
+CORPUS = [
+    ("Dermatology", "Contact dermatitis",
+     "Skin inflammation caused by contact with an irritant or allergen.",
+     "Avoid the trigger, use fragrance-free moisturizers and a mild hydrocortisone cream.",
+     "Keep the area clean and avoid scratching.",
+     ["itchy rash", "red itchy skin", "rash after using new soap", "skin irritation and redness",
+      "itchy red patches on arms", "rash from new detergent", "eczema flare", "dry itchy flaky skin"]),
+    ("Dermatology", "Acne",
+     "Blocked hair follicles causing pimples, blackheads and inflamed spots.",
+     "Gentle cleansing, benzoyl peroxide or salicylic acid products; prescription treatment if severe.",
+     "Avoid picking or squeezing spots.",
+     ["acne", "pimples on face", "breakouts", "blackheads and whiteheads", "spots on my face and back",
+      "cystic acne"]),
+    ("Dermatology", "Fungal skin infection",
+     "A fungal infection such as ringworm or athlete's foot.",
+     "Over-the-counter antifungal cream, keeping the area clean and dry.",
+     "Don't share towels or footwear while it clears.",
+     ["ringworm", "athletes foot", "itchy scaly ring on skin", "itchy peeling skin between toes",
+      "circular rash", "fungal infection on skin"]),
+    ("Dermatology", "Hives (urticaria)",
+     "Raised, itchy welts, often an allergic reaction.",
+     "Non-drowsy antihistamines and avoiding known triggers.",
+     "Note what you ate or touched before the welts appeared.",
+     ["hives", "itchy welts", "raised itchy bumps", "itchy bumps all over", "welts on skin"]),
+    ("ENT", "Sinusitis",
+     "Inflammation of the sinuses, often after a cold.",
+     "Saline nasal rinses, decongestants, steam inhalation and pain relief.",
+     "Rest and drink plenty of fluids.",
+     ["sinus pressure", "blocked nose and facial pain", "stuffy nose for weeks", "sinus infection",
+      "pain around nose and forehead", "congested sinuses", "post nasal drip"]),
+    ("ENT", "Ear infection",
+     "Infection of the middle or outer ear.",
+     "Pain relief, warm compresses; antibiotics or ear drops if prescribed.",
+     "Keep the ear dry.",
+     ["earache", "ear pain", "ear infection", "fluid coming out of ear", "pain inside ear",
+      "blocked ear", "ear discharge"]),
+    ("ENT", "Pharyngitis",
+     "Inflammation of the throat, usually from a viral infection.",
+     "Warm fluids, throat lozenges, salt water gargles and pain relief.",
+     "Rest your voice and stay hydrated.",
+     ["sore throat", "scratchy throat", "painful swallowing", "throat pain", "hoarse voice and sore throat",
+      "tonsils swollen"]),
+    ("ENT", "Tinnitus",
+     "Hearing ringing or buzzing without an outside sound.",
+     "Hearing check, avoiding loud noise, sound therapy.",
+     "Protect your ears from loud noise.",
+     ["ringing in ears", "buzzing in ears", "tinnitus", "ears ringing"]),
+    ("Ophthalmology", "Conjunctivitis",
+     "Inflammation of the eye's outer membrane (pink eye).",
+     "Cool compresses, artificial tears; antibiotic drops if bacterial.",
+     "Avoid touching your eyes and don't share towels.",
+     ["pink eye", "red itchy eyes", "eye discharge", "crusty eyelids in the morning", "red watery eye",
+      "sticky eyes", "conjunctivitis"]),
+    ("Ophthalmology", "Dry eye",
+     "The eyes don't make enough tears or they evaporate too fast.",
+     "Lubricating eye drops, screen breaks, a humidifier.",
+     "Follow the 20-20-20 rule when using screens.",
+     ["dry eyes", "gritty eyes", "burning eyes from screen", "eyes feel dry and tired", "eye strain"]),
+    ("Ophthalmology", "Refractive error",
+     "Nearsightedness, farsightedness or astigmatism affecting focus.",
+     "An eye examination and glasses or contact lenses.",
+     "Book an eye test.",
+     ["blurry vision when reading", "trouble seeing far away", "squinting to see", "hard to read small print",
+      "need glasses", "blurry vision"]),
+    ("Orthopedics", "Lower back strain",
+     "Strained muscles or ligaments in the lower back.",
+     "Staying active, heat, pain relief and gentle stretching; physiotherapy if it persists.",
+     "Avoid heavy lifting until it settles.",
+     ["lower back pain", "back ache after lifting", "stiff back", "back pain", "pulled a muscle in my back",
+      "back hurts when bending"]),
+    ("Orthopedics", "Sprain",
+     "A stretched or torn ligament, usually from a twist or fall.",
+     "Rest, ice, compression and elevation (RICE) and pain relief.",
+     "Keep weight off the joint for a few days.",
+     ["sprained ankle", "twisted ankle", "swollen ankle after fall", "sprained wrist", "rolled my ankle",
+      "twisted knee"]),
+    ("Orthopedics", "Osteoarthritis",
+     "Wear of the cartilage in a joint causing pain and stiffness.",
+     "Exercise, weight management, pain relief and physiotherapy.",
+     "Low-impact exercise such as swimming helps.",
+     ["knee pain", "stiff joints in the morning", "joint pain when walking", "aching knees", "hip pain",
+      "joint stiffness"]),
+    ("Orthopedics", "Tendinitis",
+     "Inflammation of a tendon from overuse.",
+     "Rest, ice, anti-inflammatories and physiotherapy.",
+     "Avoid the movement that causes the pain.",
+     ["shoulder pain when lifting arm", "tennis elbow", "elbow pain", "heel pain", "pain in wrist from typing",
+      "tendon pain", "shoulder pain"]),
+    ("Gastroenterology", "Gastroesophageal reflux (GERD)",
+     "Stomach acid flowing back into the esophagus.",
+     "Antacids, smaller meals, avoiding trigger foods and late meals.",
+     "Avoid lying down right after eating.",
+     ["heartburn", "acid reflux", "burning after eating", "sour taste in mouth after meals", "indigestion",
+      "acid coming up"]),
+    ("Gastroenterology", "Gastroenteritis",
+     "An infection of the stomach and intestines (stomach flu).",
+     "Fluids and oral rehydration, rest, bland food.",
+     "Drink small amounts of fluid often.",
+     ["diarrhea", "vomiting and diarrhea", "stomach flu", "upset stomach", "nausea and vomiting",
+      "food poisoning", "stomach bug"]),
+    ("Gastroenterology", "Irritable bowel syndrome",
+     "A common disorder of the gut causing cramps, bloating and changed bowel habits.",
+     "Dietary changes, fiber, stress management; antispasmodics if needed.",
+     "A food and symptom diary helps find triggers.",
+     ["bloating", "stomach cramps and gas", "bloated stomach", "constipation", "alternating constipation and diarrhea",
+      "abdominal cramps", "stomach ache"]),
+    ("Pulmonology", "Asthma",
+     "Inflamed, narrowed airways causing wheezing and breathlessness.",
+     "Inhalers (relievers and preventers) and avoiding triggers.",
+     "Avoid smoke and known triggers.",
+     ["wheezing", "asthma", "wheezing when exercising", "whistling sound when breathing", "asthma attack"]),
+    ("Pulmonology", "Bronchitis",
+     "Inflammation of the airways, usually after a cold.",
+     "Rest, fluids, humidified air and cough relief.",
+     "Avoid smoking and smoky places.",
+     ["cough with phlegm", "coughing up mucus", "chest congestion", "persistent cough", "cough for weeks",
+      "dry cough", "cough at night", "cough"]),
+    ("Cardiology", "Hypertension",
+     "Blood pressure that is consistently higher than normal.",
+     "Lifestyle changes (salt, exercise, weight) and medication if prescribed.",
+     "Check your blood pressure regularly.",
+     ["high blood pressure", "blood pressure readings high", "hypertension", "elevated blood pressure"]),
+    ("Cardiology", "Palpitations",
+     "Noticeable heartbeats that feel fast, fluttering or irregular.",
+     "Reduce caffeine and alcohol; an ECG to check the rhythm.",
+     "Note when they happen and how long they last.",
+     ["heart racing", "heart palpitations", "fluttering heartbeat", "skipped heartbeats", "irregular heartbeat",
+      "heart pounding"]),
+    ("Neurology", "Tension headache",
+     "A common headache felt as pressure or tightness around the head.",
+     "Pain relief, rest, hydration and stress management.",
+     "Take regular breaks from screens and stay hydrated.",
+     ["headache", "pressure around my head", "stress headache", "tight band around head", "head hurts",
+      "dull headache"]),
+    ("Neurology", "Migraine",
+     "Recurring headaches, often throbbing and with nausea or sensitivity to light.",
+     "Pain relief or triptans, rest in a dark quiet room, avoiding triggers.",
+     "Keep a headache diary to identify triggers.",
+     ["migraine", "throbbing headache", "headache with sensitivity to light", "headache with nausea",
+      "headache with aura", "pounding headache on one side"]),
+    ("Neurology", "Vertigo",
+     "A spinning sensation, often from an inner ear problem.",
+     "Repositioning maneuvers, vestibular exercises; medication for symptoms.",
+     "Get up slowly and avoid sudden head movements.",
+     ["dizziness when turning head", "room spinning", "vertigo", "dizzy when standing up", "feeling dizzy",
+      "dizziness"]),
+    ("Neurology", "Peripheral neuropathy",
+     "Damaged nerves in the hands or feet.",
+     "Treating the cause (e.g. blood sugar), pain relief, foot care.",
+     "Check your feet daily for injuries.",
+     ["tingling in feet", "pins and needles in hands", "numb toes", "burning feet", "tingling hands"]),
+    ("Endocrinology", "Hypothyroidism",
+     "An underactive thyroid gland slowing the metabolism.",
+     "Blood tests and thyroid hormone replacement if confirmed.",
+     "Ask for a thyroid blood test.",
+     ["always tired and cold", "weight gain and tiredness", "thyroid problem", "hair thinning and fatigue",
+      "underactive thyroid", "feeling cold all the time"]),
+    ("Endocrinology", "Diabetes",
+     "High blood sugar from too little insulin or insulin resistance.",
+     "Blood sugar testing, diet and exercise, medication if confirmed.",
+     "Get your blood sugar checked.",
+     ["excessive thirst", "frequent urination and thirst", "high blood sugar", "diabetes", "always thirsty",
+      "peeing a lot"]),
+    ("Psychiatry", "Anxiety",
+     "Persistent worry or nervousness that is hard to control.",
+     "Talking therapy (CBT), relaxation techniques; medication if needed.",
+     "Breathing exercises and regular activity can help.",
+     ["anxiety", "feeling anxious", "constant worry", "panic attacks", "nervous all the time", "cant relax",
+      "stressed and anxious"]),
+    ("Psychiatry", "Depression",
+     "Persistent low mood and loss of interest in things.",
+     "Talking therapy, support, and antidepressants if needed.",
+     "Talk to someone you trust and keep a daily routine.",
+     ["feeling sad", "low mood", "lack of motivation", "feeling depressed", "lost interest in things", "depression",
+      "feeling down"]),
+    ("Psychiatry", "Insomnia",
+     "Trouble falling or staying asleep.",
+     "Sleep hygiene, cognitive behavioral therapy for insomnia.",
+     "Keep regular sleep times and avoid screens before bed.",
+     ["cant sleep", "trouble falling asleep", "insomnia", "waking up at night", "poor sleep"]),
+    ("General Practice", "Common cold",
+     "A viral infection of the nose and throat.",
+     "Rest, fluids, and over-the-counter cold remedies.",
+     "Rest and drink plenty of fluids.",
+     ["runny nose", "sneezing", "common cold", "cold symptoms", "runny nose and sneezing", "caught a cold"]),
+    ("General Practice", "Urinary tract infection",
+     "A bacterial infection of the bladder or urethra.",
+     "A urine test and antibiotics if confirmed; plenty of fluids.",
+     "Drink plenty of water and don't hold in urine.",
+     ["burning when peeing", "painful urination", "burning when urinating", "uti", "bladder infection",
+      "needing to pee often and it burns"]),
+    ("General Practice", "Influenza",
+     "A viral infection causing fever, aches and tiredness.",
+     "Rest, fluids, fever reducers; antivirals if started early.",
+     "Stay home and rest until the fever is gone.",
+     ["fever", "flu", "body aches and chills", "fever and body aches", "chills", "flu symptoms"]),
+]
+
+# Substrings that always go to the model.
+RED_FLAGS = [
+    "chest pain", "chest pressure", "chest tightness", "tight chest", "short of breath", "shortness of breath",
+    "cant breathe", "difficulty breathing", "trouble breathing", "faint", "passed out", "unconscious", "seizure",
+    "suicid", "kill myself", "self harm", "hurt myself", "overdose", "slurred", "drooping", "worst headache", "sudden", "blood in",
+    "bloody", "up blood", "vomiting blood", "bleeding", "black stool", "pregnan", "baby", "infant", "newborn",
+    "child", "stiff neck", "high fever", "confus", "anaphyla", "swollen tongue", "throat swelling",
+    "vision loss", "lost vision", "cant see", "paralys", "severe",
+]
+# Numbness, weakness or tingling on one side is a stroke sign however it's worded
+# ("headache on one side with numbness", "one side of my body is numb").
+FOCAL_SYMPTOMS = ("numb", "weak", "tingl")
+ONE_SIDED = ["one side", "left side", "right side", "half of", "half my", "one arm", "one leg"]
+NEGATIONS = {"no", "not", "without", "never", "dont", "doesnt", "didnt", "isnt", "arent", "wasnt"}
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "i", "im", "ive", "me", "my", "have", "has", "had", "having", "am", "is", "are",
+    "been", "with", "also", "some", "of", "please", "analyze", "these", "symptoms", "symptom", "feel", "feeling",
+    "experiencing", "got", "getting", "since", "what", "could", "it", "be", "for", "in", "on", "lot", "very",
+    "really", "bit", "little", "days", "day", "week", "weeks", "today", "yesterday", "hi", "hello", "doctor", "do",
+    "should", "from", "to", "at", "when", "after", "all", "this", "that", "there", "its", "so", "like", "keep",
+}
+
+
+def stem(word):
+    return re.sub(r"(ing|ed|es|s)$", "", word) if len(word) > 4 else word
+
+
+def words(text):
+    return re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+
+
+def red_flag(tokens):
+    lowered = " ".join(tokens)
+    if any(flag in lowered for flag in RED_FLAGS):
+        return True
+    return any(t.startswith(FOCAL_SYMPTOMS) for t in tokens) and any(side in lowered for side in ONE_SIDED)
+
+
+def features(text):
+    terms = [stem(w) for w in words(text) if w not in STOPWORDS]
+    return terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+
+
+class TriageModel:
+    """Nearest-neighbour TF-IDF classifier over CORPUS's phrasings.
+
+    A condition scores the cosine similarity of its closest phrasing, so an
+    exact match ("earache") scores 1 however many phrasings the condition has.
+    """
+
+    def __init__(self, corpus=CORPUS):
+        self.corpus = corpus
+        phrases = [(i, features(p)) for i, entry in enumerate(corpus) for p in entry[5]]
+        self.vocabulary = {t: i for i, t in enumerate(sorted({t for _, terms in phrases for t in terms}))}
+        df = Counter(t for _, terms in phrases for t in set(terms))
+        self.idf = np.array([np.log((1 + len(phrases)) / (1 + df[t])) + 1 for t in self.vocabulary], np.float32)
+        self.phrases = np.stack([self.vector(terms) for _, terms in phrases])
+        self.phrase_condition = np.array([i for i, _ in phrases])
+        self.condition_terms = [set() for _ in corpus]
+        for i, terms in phrases:
+            self.condition_terms[i].update(terms)
+        self.specialties = [entry[0] for entry in corpus]
+
+    def vector(self, terms):
+        v = np.zeros(len(self.vocabulary), np.float32)
+        for t in terms:
+            i = self.vocabulary.get(t)
+            if i is not None:
+                v[i] += 1
+        v *= self.idf
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def classify(self, text):
+        """(corpus index or None, confidence, reason); reason is None when confident."""
+        tokens = words(text)
+        if red_flag(tokens):
+            return None, 0.0, "red_flag"
+        if NEGATIONS.intersection(tokens):
+            return None, 0.0, "negation"
+        terms = features(text)
+        unigrams = [t for t in terms if " " not in t]
+        if not unigrams:
+            return None, 0.0, "unknown_words"
+        if len(unigrams) > MAX_WORDS:
+            return None, 0.0, "too_long"
+        coverage = sum(t in self.vocabulary for t in unigrams) / len(unigrams)
+        if coverage < MIN_COVERAGE:
+            return None, 0.0, "unknown_words"
+        scores = np.zeros(len(self.corpus), np.float32)
+        np.maximum.at(scores, self.phrase_condition, self.phrases @ self.vector(terms))
+        best = int(np.argmax(scores))
+        runner_up = max((s for s, sp in zip(scores, self.specialties) if sp != self.specialties[best]), default=0.0)
+        # Scaled by the share of the query the condition accounts for, so a
+        # second complaint ("rash and headache") pulls the confidence down.
+        explained = sum(t in self.condition_terms[best] for t in unigrams) / len(unigrams)
+        confidence = float(scores[best]) * explained
+        if confidence < THRESHOLD or scores[best] - runner_up < MARGIN:
+            return best, confidence, "low_confidence"
+        return best, confidence, None
+
+
+model = TriageModel()
+handled = 0
+fallbacks = Counter()
+
+
+def answer(text):
+    """A complete analysis of `text` if it can be triaged locally, else None (ask the LLM)."""
+    global handled
+    if not ENABLED:
+        return None
+    with metrics.stage("triage"):
+        index, confidence, reason = model.classify(text)
+    if reason is not None:
+        fallbacks[reason] += 1
+        return None
+    handled += 1
+    specialty, condition, description, treatment, advice, _ = model.corpus[index]
+    result = {
+        "possible_conditions": [{
+            "condition": condition,
+            "likelihood": "medium",
+            "description": description,
+            "general_treatment": treatment,
+            "recommended_specialist": specialty,
+        }],
+        "general_advice": f"{advice} If your symptoms persist or get worse, book an appointment with one of "
+                          f"the recommended doctors.",
+        "disclaimer": DISCLAIMER,
+    }
+    return medical_prompt.attach_doctors(result)
+
+
+def stats():
+    total = handled + sum(fallbacks.values())
+    return {
+        "handled": handled,
+        "fallbacks": dict(fallbacks),
+        "offload_ratio": handled / total if total else 0.0,
+    }
+
+
+metrics.register("triage", stats)
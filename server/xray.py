@@ -1,60 +1,48 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS  # Enable CORS
-from PIL import Image
+import hashlib
+import os
+import numpy as np
 import torch
-import torchvision.transforms as transforms
-from torchvision import models
-import torch.nn as nn
+import cache
+import imageprep
+import metrics
+import xray_serving
+from xray_serving import CLASS_NAMES as class_names, transform
 
 app = Flask(__name__)
 CORS(app)  # Allow all origins for CORS
+metrics.instrument(app, "xray")  # per-stage timings and GET /metrics
 
-# Class names used during training
-class_names = [
-    'BIOIMPIANTI K mod', 'DJO 3D Knee', 'Exatech Opterak Logic', 'Link Gemini SL',
-    'Meril life FREEDOM KNEE', 'Microport MEDIAPIVOT', 'Smith and Nephew GENESIS II',
-    'Smith and Nephew Gensis PS', 'Stryker NRG', 'Stryker TRIATHLON',
-    'Zimmer Oxford', 'Zimmer UKS (ZUK)', 'Zimmer Vanguard', 'Zimmer persona'
-]
-
-def load_model():
-    model = models.resnet50(pretrained=False)
-    num_classes = len(class_names)
-    model.fc = nn.Linear(model.fc.in_features, num_classes)
-    model.load_state_dict(torch.load("resnet_knee_model.pth", map_location=torch.device('cpu')))
-    model.eval()
-    return model
-
-model = load_model()
-
-# Image transform: same as used during training.
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize([0.485, 0.456, 0.406],
-                         [0.229, 0.224, 0.225])
-])
+# Build the model for the configured serving mode (XRAY_MODE etc., see
+# xray_serving.py); warmup passes run here so the first request isn't slow.
+model, model_info = xray_serving.load()
+print("X-ray model ready:", model_info)
 
-@app.route("/api/predict", methods=["POST"])
-def predict():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part in the request'}), 400
+# Finished predictions keyed by model version and sha256 of the upload, so
+# re-posted images skip decoding and inference. XRAY_CACHE_DIR adds a disk tier
+# that survives restarts (see cache.tiered_from_env).
+prediction_cache = cache.tiered_from_env("XRAY")
+metrics.register("xray_cache", prediction_cache.stats)
 
-    file = request.files['file']
-    if file.filename == "":
-        return jsonify({'error': 'No file selected'}), 400
+# Images per forward pass for /api/predict/batch; bounds the input tensor and
+# activation memory of one batch.
+BATCH_SIZE = int(os.environ.get("XRAY_BATCH_SIZE", 8))
 
-    try:
-        image = Image.open(file).convert('RGB')
-    except Exception:
-        return jsonify({'error': 'Invalid image file'}), 400
+def cache_key(data):
+    return f"{model_info['version']}:{hashlib.sha256(data).hexdigest()}"
 
-    img_tensor = transform(image).unsqueeze(0)
-    with torch.no_grad():
+def run_model(img_tensor):
+    """Softmax probabilities for a (N, 3, 224, 224) batch."""
+    if model_info["channels_last"]:
+        img_tensor = img_tensor.contiguous(memory_format=torch.channels_last)
+    with torch.inference_mode():
         outputs = model(img_tensor)
-        probabilities = torch.nn.functional.softmax(outputs, dim=1)[0]
-        confidence, predicted = torch.max(probabilities, 0)
-        class_idx = predicted.item()
+        return torch.nn.functional.softmax(outputs, dim=1)
+
+def format_prediction(probabilities):
+    confidence, predicted = torch.max(probabilities, 0)
+    class_idx = predicted.item()
 
     # Get top 3 predictions for additional context.
     topk = torch.topk(probabilities, k=3)
@@ -65,12 +53,99 @@ def predict():
             'confidence': conf.item() * 100  # Convert to percentage.
         })
 
-    result = {
+    return {
         'prediction': class_names[class_idx],
         'confidence': confidence.item() * 100,
         'top_predictions': top_preds
     }
-    return jsonify(result)
+
+@app.route("/api/predict", methods=["POST"])
+def predict():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part in the request'}), 400
+
+    file = request.files['file']
+    if file.filename == "":
+        return jsonify({'error': 'No file selected'}), 400
+
+    try:
+        with metrics.stage('upload_read'):
+            data = imageprep.read_upload(file.stream)
+        key = cache_key(data)
+        with metrics.stage('cache_lookup'):
+            cached = prediction_cache.get(key)
+        if cached is not None:
+            response = jsonify(cached)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+        with metrics.stage('decode'):
+            image = imageprep.open_image(data)
+        with metrics.stage('preprocess'):
+            img_tensor = transform(image).unsqueeze(0)
+    except imageprep.ImageRejected as e:
+        return jsonify({'error': str(e)}), 400
+
+    with metrics.stage('inference'):
+        probabilities = run_model(img_tensor)[0]
+    result = format_prediction(probabilities)
+    prediction_cache.put(key, result)
+
+    response = jsonify(result)
+    response.headers['X-Cache'] = 'MISS'
+    return response
+
+@app.route("/api/predict/batch", methods=["POST"])
+def predict_batch():
+    """Predict a whole study in one request: repeated "files" parts and/or zip archives.
+
+    Returns {"results": [...]} in input order; an image that fails gets an
+    "error" entry instead of predictions and doesn't fail the others.
+    """
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not files:
+        return jsonify({'error': 'No files in the request'}), 400
+    try:
+        with metrics.stage('upload_read'):
+            uploads = imageprep.read_batch(files)
+    except imageprep.ImageRejected as e:
+        return jsonify({'error': str(e)}), 400
+
+    results = [None] * len(uploads)
+    keys = {}
+    todo = []
+    for i, (_, data) in enumerate(uploads):
+        if not isinstance(data, Exception):
+            keys[i] = cache_key(data)
+            results[i] = prediction_cache.get(keys[i])
+        if results[i] is None:
+            todo.append(i)
+
+    # BATCH_SIZE images at a time: decode in parallel straight into the rows
+    # of one preallocated input array, then a single forward pass.
+    buffer = np.empty((BATCH_SIZE,) + xray_serving.INPUT_SHAPE[1:], dtype=np.float32)
+    for start in range(0, len(todo), BATCH_SIZE):
+        chunk = todo[start:start + BATCH_SIZE]
+        with metrics.stage('preprocess'):
+            prepared = imageprep.prepare_batch([uploads[i] for i in chunk], transform, out=buffer)
+        rows = [row for row, tensor in enumerate(prepared) if not isinstance(tensor, Exception)]
+        for row, error in enumerate(prepared):
+            if isinstance(error, Exception):
+                results[chunk[row]] = {'error': str(error)}
+        if not rows:
+            continue
+        batch = torch.from_numpy(buffer[:len(chunk)] if len(rows) == len(chunk) else buffer[rows])
+        with metrics.stage('inference'):
+            probabilities = run_model(batch)
+        for probs, row in zip(probabilities, rows):
+            i = chunk[row]
+            results[i] = format_prediction(probs)
+            prediction_cache.put(keys[i], results[i])
+
+    return jsonify({'results': [{'filename': name, **result} for (name, _), result in zip(uploads, results)]})
+
+@app.route("/api/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify({'model_version': model_info['version'], **prediction_cache.stats()})
 
 if __name__ == "__main__":
     app.run(debug=True)
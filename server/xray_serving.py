@@ -0,0 +1,144 @@
+"""CPU serving options for the knee-implant X-ray ResNet50.
+
+Configured through the environment:
+
+    XRAY_MODE              eager (default) | torchscript | compile | int8_dynamic | int8_static
+    XRAY_CHANNELS_LAST     1 to run in channels_last memory format (default 1 except eager)
+    XRAY_INTRA_OP_THREADS  torch.set_num_threads (default: torch's choice)
+    XRAY_INTER_OP_THREADS  torch.set_num_interop_threads (default: torch's choice)
+    XRAY_WARMUP            forward passes run at load time (default 3)
+    XRAY_WEIGHTS           fp32 state dict (default resnet_knee_model.pth)
+    XRAY_INT8_PATH         TorchScript model written by calibrate_xray.py
+
+"eager" is the original float32 nn.Module. "torchscript" traces and freezes
+it, "compile" uses torch.compile, "int8_dynamic" quantizes the classifier
+head's Linear layer on the fly, and "int8_static" loads the fully quantized
+model produced by calibrate_xray.py.
+"""
+import os
+import time
+
+import torch
+import torch.nn as nn
+from PIL import Image
+from torchvision import models
+
+import cache
+import imageprep
+
+# Class names used during training
+CLASS_NAMES = [
+    'BIOIMPIANTI K mod', 'DJO 3D Knee', 'Exatech Opterak Logic', 'Link Gemini SL',
+    'Meril life FREEDOM KNEE', 'Microport MEDIAPIVOT', 'Smith and Nephew GENESIS II',
+    'Smith and Nephew Gensis PS', 'Stryker NRG', 'Stryker TRIATHLON',
+    'Zimmer Oxford', 'Zimmer UKS (ZUK)', 'Zimmer Vanguard', 'Zimmer persona'
+]
+
+# Preprocessing as used during training: Resize((224, 224)), ToTensor() and
+# Normalize(MEAN, STD), done by imageprep without torchvision's intermediates.
+INPUT_SIZE = (224, 224)
+MEAN = [0.485, 0.456, 0.406]
+STD = [0.229, 0.224, 0.225]
+
+
+def transform(image, out=None):
+    """PIL image (from imageprep.open_image) -> float32 tensor of shape (3, 224, 224)."""
+    pixels = imageprep.decode_rgb(image, INPUT_SIZE, resample=Image.BILINEAR)
+    return torch.from_numpy(imageprep.normalize_chw(pixels, MEAN, STD, out=out))
+
+MODES = ("eager", "torchscript", "compile", "int8_dynamic", "int8_static")
+INPUT_SHAPE = (1, 3, 224, 224)
+
+WEIGHTS_PATH = os.environ.get("XRAY_WEIGHTS", "resnet_knee_model.pth")
+INT8_PATH = os.environ.get("XRAY_INT8_PATH", "resnet_knee_model_int8.pt")
+
+
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def configure_threads(intra_op=None, inter_op=None):
+    """Set torch's thread pools; must run before the first parallel op."""
+    intra_op = intra_op or _env_int("XRAY_INTRA_OP_THREADS")
+    inter_op = inter_op or _env_int("XRAY_INTER_OP_THREADS")
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            pass  # already started; only settable once per process
+
+
+def build_model(weights_path=WEIGHTS_PATH):
+    """The float32 eager ResNet50 exactly as trained."""
+    model = models.resnet50(weights=None)
+    model.fc = nn.Linear(model.fc.in_features, len(CLASS_NAMES))
+    if weights_path is not None:
+        model.load_state_dict(torch.load(weights_path, map_location=torch.device("cpu")))
+    model.eval()
+    return model
+
+
+def optimize(model, mode, channels_last=False):
+    """Return a callable for `mode` built from the eager fp32 `model`."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown XRAY_MODE {mode!r}; choose from {', '.join(MODES)}")
+    if mode == "int8_static":
+        if "x86" in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = "x86"  # what calibrate_xray.py targets
+        return torch.jit.load(INT8_PATH, map_location="cpu")
+
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+    model = model.to(memory_format=memory_format)
+    if mode == "int8_dynamic":
+        return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    if mode == "torchscript":
+        example = torch.randn(INPUT_SHAPE).to(memory_format=memory_format)
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example)
+        return torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+    if mode == "compile":
+        return torch.compile(model)
+    return model
+
+
+def warmup(model, iterations, channels_last=False):
+    """Run a few dummy passes so lazy init, JIT and allocator costs aren't paid by users."""
+    example = torch.randn(INPUT_SHAPE)
+    if channels_last:
+        example = example.contiguous(memory_format=torch.channels_last)
+    with torch.inference_mode():
+        for _ in range(iterations):
+            model(example)
+
+
+def load(mode=None, channels_last=None, warmup_iterations=None):
+    """Build the serving model from the environment settings.
+
+    Returns (model, info) where info records what was loaded and how long it took.
+    """
+    mode = mode or os.environ.get("XRAY_MODE", "eager")
+    if channels_last is None:
+        channels_last = os.environ.get("XRAY_CHANNELS_LAST", "0" if mode == "eager" else "1") == "1"
+    if warmup_iterations is None:
+        warmup_iterations = int(os.environ.get("XRAY_WARMUP", 3))
+    configure_threads()
+
+    start = time.perf_counter()
+    eager = None if mode == "int8_static" else build_model()
+    model = optimize(eager, mode, channels_last)
+    loaded = time.perf_counter()
+    warmup(model, warmup_iterations, channels_last)
+    info = {
+        "mode": mode,
+        # Prediction cache key prefix: changes with the mode and the model file.
+        "version": f"{mode}:{cache.file_version(INT8_PATH if mode == 'int8_static' else WEIGHTS_PATH)[:16]}",
+        "channels_last": channels_last,
+        "threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+        "load_s": loaded - start,
+        "warmup_s": time.perf_counter() - loaded,
+    }
+    return model, info
@@ -13,6 +13,34 @@ type Message = {
   timestamp: Date;
 };
 
+// Build a response text from the (possibly partial) answer object
+function formatResponse(data: any): string {
+  if (data.error) {
+    return data.error;
+  }
+  let text = "";
+  if (data.possible_conditions && data.possible_conditions.length) {
+    text += "Possible Conditions:\n";
+    data.possible_conditions.forEach((cond: any) => {
+      text += `${cond.condition} (${cond.likelihood})\nDescription: ${cond.description}\nTreatment: ${cond.general_treatment}\nRecommended Specialist: ${cond.recommended_specialist}\n\n`;
+    });
+  }
+  if (data.recommended_doctors && data.recommended_doctors.length) {
+    text += "Recommended Doctors:\n";
+    data.recommended_doctors.forEach((doc: any) => {
+      text += `${doc.name} – ${doc.specialization} (Experience: ${doc.experience}) Contact: ${doc.contact}\n`;
+    });
+    text += "\n";
+  }
+  if (data.general_advice) {
+    text += `Advice: ${data.general_advice}\n`;
+  }
+  if (data.disclaimer) {
+    text += `Disclaimer: ${data.disclaimer}`;
+  }
+  return text.trim() || "Analyzing...";
+}
+
 export default function ChatbotPage() {
   const [messages, setMessages] = useState<Message[]>(() => {
     const savedMessages = localStorage.getItem('chatMessages');
@@ -37,6 +65,8 @@ export default function ChatbotPage() {
     ];
   });
   
+  // Server-side conversation memory: sent with each message so follow-ups have context
+  const [sessionId, setSessionId] = useState<string | null>(() => localStorage.getItem('chatSessionId'));
   const [input, setInput] = useState("");
   const [loading, setLoading] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
@@ -46,6 +76,14 @@ export default function ChatbotPage() {
     localStorage.setItem('chatMessages', JSON.stringify(messages));
   }, [messages]);
   
+  useEffect(() => {
+    if (sessionId) {
+      localStorage.setItem('chatSessionId', sessionId);
+    } else {
+      localStorage.removeItem('chatSessionId');
+    }
+  }, [sessionId]);
+  
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
@@ -67,53 +105,75 @@ export default function ChatbotPage() {
     setInput("");
     setLoading(true);
     
+    // Placeholder bot message, filled in as the streamed answer arrives
+    const botMessageId = (Date.now() + 1).toString();
+    const answer: any = { possible_conditions: [], recommended_doctors: [] };
+    const showAnswer = () => {
+      setMessages((prev) => prev.map((msg) =>
+        msg.id === botMessageId ? { ...msg, text: formatResponse(answer) } : msg
+      ));
+    };
+    
     try {
-      // Send a POST request to the Flask chatbot API
-      const response = await fetch("http://localhost:5003/api/chat", {
+      // Server-Sent Events from the Flask chatbot API: each condition and the
+      // advice are shown as soon as the model has written them
+      const response = await fetch("http://localhost:5003/api/chat/stream", {
         method: "POST",
         headers: {
           "Content-Type": "application/json"
         },
-        body: JSON.stringify({ query: currentInput })
+        body: JSON.stringify({ query: currentInput, ...(sessionId ? { session_id: sessionId } : {}) })
       });
       
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error("Error from server");
       }
       
-      const data = await response.json();
-      
-      // Build a response text from the returned JSON object
-      let botResponseText = "";
-      
-      if (data.error) {
-        botResponseText = data.error;
-      } else {
-        // Assemble a summary from the response object; you can adjust this formatting
-        if (data.possible_conditions && data.possible_conditions.length) {
-          botResponseText += "Possible Conditions:\n";
-          data.possible_conditions.forEach((cond: any) => {
-            botResponseText += `${cond.condition} (${cond.likelihood})\nDescription: ${cond.description}\nTreatment: ${cond.general_treatment}\nRecommended Specialist: ${cond.recommended_specialist}\n\n`;
-          });
-        }
-        if (data.recommended_doctors && data.recommended_doctors.length) {
-          botResponseText += "Recommended Doctors:\n";
-          data.recommended_doctors.forEach((doc: any) => {
-            botResponseText += `${doc.name} – ${doc.specialization} (Experience: ${doc.experience}) Contact: ${doc.contact}\n`;
-          });
-          botResponseText += "\n";
-        }
-        botResponseText += `Advice: ${data.general_advice}\nDisclaimer: ${data.disclaimer}`;
-      }
-      
-      const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        text: botResponseText,
+      setMessages((prev) => [...prev, {
+        id: botMessageId,
+        text: "",
         sender: "bot",
         timestamp: new Date(),
-      };
+      }]);
       
-      setMessages((prev) => [...prev, botMessage]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let finished = false;
+      while (!finished) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const frames = buffer.split("\n\n");
+        buffer = frames.pop() ?? "";
+        for (const frame of frames) {
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = frame.match(/^data: (.*)$/m)?.[1];
+          if (!event || data === undefined || event === "token") continue;
+          const payload = JSON.parse(data);
+          if (event === "session") {
+            setSessionId(payload.session_id);
+            continue;
+          } else if (event === "condition") {
+            answer.possible_conditions.push(payload);
+          } else if (event === "field") {
+            answer[payload.name] = payload.value;
+          } else if (event === "doctors") {
+            answer.recommended_doctors = payload;
+          } else if (event === "retry") {
+            // The answer is being regenerated by a larger model; start over
+            for (const key of Object.keys(answer)) delete answer[key];
+            Object.assign(answer, { possible_conditions: [], recommended_doctors: [] });
+          } else if (event === "done") {
+            Object.assign(answer, payload);
+            finished = true;
+          } else if (event === "error") {
+            answer.error = payload.error;
+            finished = true;
+          }
+          showAnswer();
+        }
+      }
     } catch (error: any) {
       console.error("Error analyzing query:", error);
       toast({
@@ -134,6 +194,7 @@ export default function ChatbotPage() {
       timestamp: new Date(),
     };
     setMessages([initialMessage]);
+    setSessionId(null);
     toast({
       title: "Chat cleared",
       description: "All previous messages have been cleared."